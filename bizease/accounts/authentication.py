@@ -0,0 +1,115 @@
+"""
+JWT authentication that doesn't load the user row on every request.
+
+Tokens carry the user's token version. The authenticated user is cached (per process with the default locmem cache,
+shared with a shared backend) under the user id and that version for AUTH_USER_CACHE_TIMEOUT seconds. Saving or
+deleting a user drops its cached copy (see accounts/signals.py) and CustomUser.revoke_tokens() bumps the version, so
+every token issued before it is rejected, by every authentication class here and by token refreshes. Code that changes
+users with queryset.update() has to call invalidate_cached_user() itself. VersionedJWTAuthentication does the same
+checks on a user loaded from the db on every request, for views that write the user row like the profile.
+
+ClaimsJWTAuthentication goes one step further for views that only need the user's id: when AUTH_TRUST_TOKEN_CLAIMS
+is on, their read-only requests are authenticated from the signed claims alone, without the cache or the db. A token
+then stays usable for reads until it expires, even after its user is deactivated or its tokens are revoked.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .blacklist import is_blacklisted
+
+TOKEN_VERSION_CLAIM = "token_version"
+# Secrets aren't copied into the cache. Nothing reads them from request.user
+UNCACHED_FIELDS = ["password", "email_verification_token", "passwd_reset_otp_with_time_created"]
+
+
+class VersionedRefreshToken(RefreshToken):
+    """
+    Refresh token with the user's token version. Access tokens made from it copy the claim.
+    The blacklist is checked against the in-process copy from accounts/blacklist.py
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+def user_cache_key(user_id, token_version):
+    return f"auth_user:{user_id}:{token_version}"
+
+
+def invalidate_cached_user(user_id, token_version):
+    """
+    Drops the cached copies of a user for its current version and the one before it (revoke_tokens() bumps the
+    version by one). Done again when the current transaction commits, like invalidate_tenant()
+    """
+    keys = [user_cache_key(user_id, version) for version in (token_version, token_version - 1) if version >= 0]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class VersionedJWTAuthentication(JWTAuthentication):
+    """ Loads the user from the db on every request and rejects tokens issued before its current token version """
+    def get_user(self, validated_token):
+        return self.load_user(validated_token)
+
+    def load_user(self, validated_token, deferred_fields=()):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        try:
+            user = self.user_model.objects.defer(*deferred_fields).get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        # tokens issued before versions were added count as version 0
+        if user.token_version != validated_token.get(TOKEN_VERSION_CLAIM, 0):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+class CachedJWTAuthentication(VersionedJWTAuthentication):
+    def get_user(self, validated_token):
+        timeout = getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 60)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = user_cache_key(user_id, validated_token.get(TOKEN_VERSION_CLAIM, 0))
+        user = cache.get(key) if timeout else None
+        if user is None:
+            user = self.load_user(validated_token, UNCACHED_FIELDS)
+            if timeout:
+                cache.set(key, user, timeout)
+        return user
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """
+    For views that only use request.user.id on reads. GET/HEAD/OPTIONS requests get a TokenUser built from the token
+    when AUTH_TRUST_TOKEN_CLAIMS is on, other requests load the user like CachedJWTAuthentication
+    """
+    def authenticate(self, request):
+        self.trust_claims = request.method in SAFE_METHODS and getattr(settings, "AUTH_TRUST_TOKEN_CLAIMS", False)
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self.trust_claims:
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise InvalidToken(_("Token contained no recognizable user identification"))
+            return TokenUser(validated_token)
+        return super().get_user(validated_token)
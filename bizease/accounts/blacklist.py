@@ -0,0 +1,82 @@
+"""
+In-process copy of the refresh token blacklist, so refreshing a token doesn't query the blacklist table.
+
+Each process keeps the jti of every blacklisted token that hasn't expired yet. A version stored in the cache is bumped
+whenever a token is blacklisted (see accounts/signals.py) and a process whose copy is older than the version loads the
+tokens blacklisted since its last load, like the tenant cache. That only works when every process sees the same version,
+so with a per-process cache (the default LocMemCache) the blacklist table is queried on every refresh instead.
+Expired tokens are rejected before the blacklist matters, so the 'purge_tokens' command can delete them.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from bizease.tenant_cache import bump_version, new_version
+from datetime import timedelta
+import threading
+import time
+
+VERSION_KEY = "token_blacklist:version"
+# caches that aren't shared between processes, so a version bumped by one process isn't seen by the others
+LOCAL_CACHE_BACKENDS = {"django.core.cache.backends.locmem.LocMemCache", "django.core.cache.backends.dummy.DummyCache"}
+# rows get their blacklisted_at before their transaction commits, so each load also rereads the ones from just before
+# the previous load in case they were committed after it
+RELOAD_OVERLAP = timedelta(seconds=60)
+
+_lock = threading.Lock()
+_loaded = {"version": None, "loaded_at": None, "jtis": {}} # jtis: jti -> expiry time
+
+
+def has_shared_cache():
+    return settings.CACHES["default"]["BACKEND"] not in LOCAL_CACHE_BACKENDS
+
+
+def get_blacklist_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, new_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def blacklist_changed():
+    bump_version(VERSION_KEY)
+    transaction.on_commit(lambda: bump_version(VERSION_KEY))
+
+
+def is_blacklisted(jti):
+    if not has_shared_cache():
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    version = get_blacklist_version()
+    with _lock:
+        if _loaded["version"] != version:
+            now = timezone.now()
+            rows = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+            if _loaded["loaded_at"] is not None:
+                rows = rows.filter(blacklisted_at__gte=_loaded["loaded_at"] - RELOAD_OVERLAP)
+            jtis = {token_jti: expires_at for token_jti, expires_at in _loaded["jtis"].items() if expires_at > now}
+            jtis.update(rows.values_list("token__jti", "token__expires_at"))
+            _loaded.update(version=version, loaded_at=now, jtis=jtis)
+        expires_at = _loaded["jtis"].get(jti)
+    return expires_at is not None and expires_at > timezone.now()
+
+
+def purge_expired_tokens(chunk_size=1000, pause=0):
+    """
+    Deletes the outstanding (and with them the blacklisted) tokens that expired, chunk_size rows per transaction
+    so the tables aren't locked for long. Waits pause seconds between chunks. Returns the number of tokens deleted
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(OutstandingToken.objects.filter(expires_at__lte=now).order_by("id").values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            break
+        OutstandingToken.objects.filter(id__in=ids).delete() # their blacklist rows go in the same transaction
+        deleted += len(ids)
+        if len(ids) < chunk_size:
+            break
+        time.sleep(pause)
+    return deleted
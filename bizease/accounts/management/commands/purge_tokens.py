@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from accounts.blacklist import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired refresh tokens from the outstanding and blacklisted token tables in small chunks. "
+        "Schedule it (e.g. daily from cron), nothing else removes those rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Tokens deleted per transaction")
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to wait between chunks")
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_tokens(options["chunk_size"], options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired tokens"))
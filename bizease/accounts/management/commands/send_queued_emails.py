@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from accounts.outbox import send_queued_emails, purge_emails, MAX_ATTEMPTS
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends the queued verification and password reset emails in batches over one SMTP connection per batch. "
+        "Failed emails are retried with exponential backoff. Run it from cron or keep it running with --loop"
+    )
+    purge_interval = 3600 # seconds between purges with --loop
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Maximum number of emails sent over one connection")
+        parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="Attempts after which an email is marked Failed")
+        parser.add_argument("--loop", action="store_true", help="Keep checking the queue instead of exiting once it's empty")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds to wait between checks of an empty queue with --loop")
+        parser.add_argument(
+            "--purge-days", type=int, default=None,
+            help="Also delete the Sent and Failed emails queued more than this many days ago (hourly with --loop)"
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        last_purge = None
+        while True:
+            if options["purge_days"] is not None and (last_purge is None or time.monotonic() - last_purge >= self.purge_interval):
+                self.stdout.write(f"Purged {purge_emails(options['purge_days'])} old emails")
+                last_purge = time.monotonic()
+            sent, failed = send_queued_emails(options["batch_size"], options["max_attempts"])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed")
+                # a full batch means more emails might be due right away
+                if sent + failed == options["batch_size"]:
+                    continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(f"Done. {total_sent} emails sent, {total_failed} failed"))
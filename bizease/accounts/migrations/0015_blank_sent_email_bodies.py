@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def blank_sent_email_bodies(apps, schema_editor):
+    # emails sent before bodies were blanked on send still hold their codes
+    OutboundEmail = apps.get_model("accounts", "OutboundEmail")
+    OutboundEmail.objects.filter(status="Sent").update(body="", html_body="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_customuser_token_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_sent_email_bodies, migrations.RunPython.noop),
+    ]
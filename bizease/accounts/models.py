@@ -54,6 +54,7 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 	is_active = models.BooleanField(default=False)
 	email_verification_token = models.CharField(max_length=64, null=True) # The time created in iso utc format is also appended to the token
 	passwd_reset_otp_with_time_created = models.CharField(max_length=64, null=True)
+	token_version = models.PositiveIntegerField(default=0) # tokens carry it, see accounts/authentication.py
 
 	USERNAME_FIELD = 'email'
 	REQUIRED_FIELDS = []
@@ -63,4 +64,29 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 		constraints = [models.CheckConstraint(condition=models.Q(low_stock_threshold__gte=0), name="low_stock_threshold_gte_0")]
 
 	def __str__(self):
-		return self.email
\ No newline at end of file
+		return self.email
+
+	def revoke_tokens(self):
+		""" Invalidates every token issued to the user so far. Takes effect when the user is saved """
+		self.token_version += 1
+
+class OutboundEmail(models.Model):
+	""" An email waiting to be sent (or already sent) by the 'send_queued_emails' command. See accounts/outbox.py """
+	subject = models.CharField(max_length=255)
+	body = models.TextField()
+	html_body = models.TextField(blank=True)
+	from_email = models.CharField(max_length=150, null=True)
+	recipients = models.JSONField(default=list)
+	status = models.CharField(choices={"Pending": "Pending", "Sent": "Sent", "Failed": "Failed"}, default="Pending", max_length=10)
+	attempts = models.PositiveIntegerField(default=0)
+	next_attempt_at = models.DateTimeField(default=timezone.now) # also pushed forward while a worker is sending the email
+	last_error = models.TextField(blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	sent_at = models.DateTimeField(null=True)
+
+	class Meta:
+		ordering = ["next_attempt_at", "id"]
+		indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbound_email_due_idx")]
+
+	def __str__(self):
+		return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
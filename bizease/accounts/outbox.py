@@ -0,0 +1,111 @@
+"""
+Database backed queue of outgoing emails, so requests never wait on (or fail because of) the SMTP server.
+
+Requests call queue_email(), which only inserts a row. The 'send_queued_emails' command sends due emails in batches
+over one reused SMTP connection. Failed sends are retried with exponential backoff until MAX_ATTEMPTS is reached.
+Emails are leased to a worker (next_attempt_at is pushed CLAIM_TIMEOUT forward) before being sent, so several
+workers can run at once and the emails of a worker that died are picked up again once the lease runs out.
+The bodies of sent emails are blanked since they hold one-time codes, and purge_emails() deletes old Sent and Failed
+rows.
+"""
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+from .models import OutboundEmail
+from datetime import timedelta
+import os
+
+MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = timedelta(minutes=1) # doubled after every failed attempt
+MAX_RETRY_DELAY = timedelta(hours=1)
+CLAIM_TIMEOUT = timedelta(minutes=10)
+EMAIL_RETENTION_DAYS = 7
+
+
+def queue_email(subject, body, recipients, html_body="", from_email=None):
+    """ Adds an email to the queue. It's sent by the next run of 'send_queued_emails' """
+    return OutboundEmail.objects.create(
+        subject=subject, body=body, html_body=html_body, recipients=list(recipients),
+        from_email=from_email or os.getenv("EMAIL_HOST_USER")
+    )
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def claim_due_emails(batch_size):
+    """ Leases up to batch_size due emails to the caller. Rows other workers are claiming are skipped """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status="Pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.id for email in emails]).update(next_attempt_at=now + CLAIM_TIMEOUT)
+    return emails
+
+
+def to_message(email, connection):
+    message = EmailMultiAlternatives(email.subject, email.body, email.from_email, email.recipients, connection=connection)
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def send_queued_emails(batch_size=100, max_attempts=MAX_ATTEMPTS):
+    """
+    Sends one batch of due emails over a single connection. Returns the number of emails (sent, failed), where failed
+    ones are either scheduled for another attempt or, after max_attempts, marked Failed.
+    """
+    emails = claim_due_emails(batch_size)
+    if not emails:
+        return 0, 0
+
+    sent, failed = [], []
+    connection = get_connection(fail_silently=False)
+    try:
+        for i, email in enumerate(emails):
+            try:
+                connection.open() # does nothing while the connection is open
+            except Exception as err:
+                # the server can't be reached, the rest of the batch is retried later
+                failed += [(email, err) for email in emails[i:]]
+                break
+            try:
+                connection.send_messages([to_message(email, connection)])
+                sent.append(email)
+            except Exception as err:
+                failed.append((email, err))
+                connection.close() # the connection might be broken, it's reopened for the next email
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    for email in sent:
+        email.status = "Sent"
+        email.attempts += 1
+        email.sent_at = now
+        email.last_error = ""
+        email.body = email.html_body = "" # verification and reset codes aren't kept once they're delivered
+    for email, err in failed:
+        email.attempts += 1
+        email.last_error = f"{type(err).__name__}: {err}"
+        if email.attempts >= max_attempts:
+            email.status = "Failed"
+        else:
+            email.next_attempt_at = now + retry_delay(email.attempts)
+    OutboundEmail.objects.bulk_update(
+        sent + [email for email, _ in failed],
+        ["status", "attempts", "sent_at", "last_error", "next_attempt_at", "body", "html_body"]
+    )
+    return len(sent), len(failed)
+
+
+def purge_emails(days=EMAIL_RETENTION_DAYS):
+    """ Deletes the Sent and Failed emails queued more than 'days' days ago. Returns the number deleted """
+    deleted, _ = OutboundEmail.objects.filter(
+        status__in=["Sent", "Failed"], created_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
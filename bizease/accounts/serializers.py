@@ -1,5 +1,9 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer, TokenBlacklistSerializer
 from .models import CustomUser
+from .authentication import VersionedRefreshToken, TOKEN_VERSION_CLAIM
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
 
 
 class ProfileDataSerializer(serializers.ModelSerializer):
@@ -56,8 +60,21 @@ class LoginDataSerializer(serializers.Serializer):
     email = serializers.CharField(max_length=150)
     password = serializers.CharField(max_length=50)
 
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = VersionedRefreshToken
 
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    """ Doesn't refresh tokens issued before the user's current token version, see CustomUser.revoke_tokens() """
+    token_class = VersionedRefreshToken
 
+    def validate(self, attrs):
+        # only read here, the token is verified (signature, expiry and blacklist) by super().validate()
+        refresh = self.token_class(attrs["refresh"], verify=False)
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        token_version = CustomUser.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list("token_version", flat=True).first()
+        if token_version is not None and token_version != refresh.payload.get(TOKEN_VERSION_CLAIM, 0):
+            raise AuthenticationFailed("Token has been revoked", "token_revoked")
+        return super().validate(attrs)
 
-
-
+class VersionedTokenBlacklistSerializer(TokenBlacklistSerializer):
+    token_class = VersionedRefreshToken
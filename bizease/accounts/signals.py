@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from .models import CustomUser
+from .authentication import invalidate_cached_user
+from .blacklist import blacklist_changed
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_authenticated_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.id, instance.token_version)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def reload_blacklist(sender, instance, created, **kwargs):
+    if created:
+        blacklist_changed()
@@ -6,6 +6,19 @@ from rest_framework import status
 from .views import get_tokens_for_user
 from .serializers import ProfileDataSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
+from .models import OutboundEmail
+from .outbox import queue_email, send_queued_emails, retry_delay
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+from unittest.mock import patch
+from io import StringIO
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from datetime import timedelta
+import tempfile
 
 class AccountsViewsTest(APITestCase):
     @classmethod
@@ -153,4 +166,269 @@ class AccountsViewsTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertRaises(CustomUser.DoesNotExist, CustomUser.objects.get, pk=self.last_user.id)
 
-        
+
+class OutboundEmailTest(APITestCase):
+    def test_signup_only_queues_the_verification_email(self):
+        data = {
+            "business_name": "New business", "full_name": "New User",
+            "email": "newuser@testmail.com", "currency": "NGN",
+            "business_type": "Nonprofit", "password": "neworek",
+            "country": "Nigeria", "state": "Lagos"
+        }
+        response = self.client.post(reverse('signup', args=["v1"]), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.recipients, ["newuser@testmail.com"])
+        self.assertEqual(queued.status, "Pending")
+
+        out = StringIO()
+        call_command("send_queued_emails", stdout=out)
+        self.assertIn("Done. 1 emails sent, 0 failed", out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["newuser@testmail.com"])
+        self.assertEqual(len(mail.outbox[0].alternatives), 1)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, "Sent")
+        self.assertEqual(queued.attempts, 1)
+        self.assertIsNotNone(queued.sent_at)
+        # the verification code isn't kept
+        self.assertEqual((queued.body, queued.html_body), ("", ""))
+
+    def test_batch_is_sent_over_one_connection(self):
+        for i in range(3):
+            queue_email("Subject", "Body", [f"user{i}@testmail.com"])
+        with patch("accounts.outbox.get_connection", wraps=mail.get_connection) as get_connection:
+            self.assertEqual(send_queued_emails(), (3, 0))
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+        # sent emails aren't picked up again
+        self.assertEqual(send_queued_emails(), (0, 0))
+
+    def test_failed_sends_are_retried_with_backoff(self):
+        email = queue_email("Subject", "Body", ["user@testmail.com"])
+        with patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=OSError("refused")):
+            before = timezone.now()
+            self.assertEqual(send_queued_emails(max_attempts=2), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, "Pending")
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.last_error, "OSError: refused")
+            self.assertGreaterEqual(email.next_attempt_at, before + retry_delay(1))
+
+            # not due yet
+            self.assertEqual(send_queued_emails(max_attempts=2), (0, 0))
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(send_queued_emails(max_attempts=2), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, "Failed")
+        self.assertEqual(email.attempts, 2)
+        self.assertEqual(send_queued_emails(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertLess(retry_delay(1), retry_delay(2))
+
+
+    def test_old_sent_and_failed_emails_are_purged(self):
+        sent = queue_email("Subject", "Body", ["sent@testmail.com"])
+        failed = queue_email("Subject", "Body", ["failed@testmail.com"])
+        pending = queue_email("Subject", "Body", ["pending@testmail.com"])
+        recent = queue_email("Subject", "Body", ["recent@testmail.com"])
+        OutboundEmail.objects.filter(pk=sent.id).update(status="Sent")
+        OutboundEmail.objects.filter(pk__in=[failed.id, recent.id]).update(status="Failed")
+        OutboundEmail.objects.exclude(pk=recent.id).update(
+            created_at=timezone.now() - timedelta(days=8), next_attempt_at=timezone.now() + timedelta(hours=1)
+        )
+
+        out = StringIO()
+        call_command("send_queued_emails", purge_days=7, stdout=out)
+        self.assertIn("Purged 2 old emails", out.getvalue())
+        self.assertEqual(set(OutboundEmail.objects.values_list("id", flat=True)), {pending.id, recent.id})
+
+        out = StringIO()
+        call_command("send_queued_emails", stdout=out)
+        self.assertNotIn("Purged", out.getvalue())
+
+
+class CachedAuthenticationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            business_name="Cache Biz", full_name="Cache User", email="cacheuser@testmail.com", is_active=True
+        )
+        cls.user.set_password("oldpassword")
+        cls.user.save()
+
+    def setUp(self):
+        self.tokens = get_tokens_for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.tokens["access"])
+
+    def user_queries(self, method="get", url_name="inventory", data=None):
+        """ Returns the response and the number of queries made on the user table """
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(reverse(url_name, args=["v1"]), data, format="json")
+        return response, len([query for query in queries if 'FROM "accounts_customuser"' in query["sql"]])
+
+    def test_user_is_loaded_once(self):
+        response, count = self.user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(count, 1)
+        response, count = self.user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(count, 0)
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        self.user_queries()
+        response, count = self.user_queries()
+        self.assertEqual(count, 1)
+
+    def test_profile_update_and_deactivation_invalidate_the_cached_user(self):
+        self.user_queries()
+        response = self.client.put(reverse("user-account-details", args=["v1"]), {"full_name": "New Name"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response, count = self.user_queries()
+        self.assertEqual(count, 1)
+
+        self.user.refresh_from_db()
+        self.user.is_active = False
+        self.user.save()
+        response, count = self.user_queries()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_reset_revokes_issued_tokens(self):
+        self.user_queries()
+        self.client.post("/v1/accounts/password-reset/", {"email": self.user.email}, format="json")
+        otp = CustomUser.objects.get(pk=self.user.pk).passwd_reset_otp_with_time_created.split("_")[0]
+        response = self.client.post(
+            "/v1/accounts/password-reset-confirm/", {"email": self.user.email, "otp": otp, "password": "newpassword"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response, count = self.user_queries()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data["code"], "token_revoked")
+        refreshed = self.client.post(reverse("token_refresh", args=["v1"]), {"refresh": self.tokens["refresh"]}, format="json")
+        self.assertEqual(refreshed.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(refreshed.data["code"], "token_revoked")
+
+        self.client.credentials()
+        login = self.client.post(reverse("login", args=["v1"]), {"email": self.user.email, "password": "newpassword"}, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + login.data["data"]["access"])
+        self.assertEqual(self.user_queries()[0].status_code, status.HTTP_200_OK)
+
+    def test_profile_rejects_revoked_tokens(self):
+        url = reverse("user-account-details", args=["v1"])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.revoke_tokens()
+        user.save()
+
+        for method, data in [("get", None), ("put", {"full_name": "New Name"}), ("delete", None)]:
+            response = getattr(self.client, method)(url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(response.data["code"], "token_revoked")
+        self.assertTrue(CustomUser.objects.filter(pk=self.user.pk, full_name="Cache User").exists())
+
+        response = self.client.post(reverse("token_refresh", args=["v1"]), {"refresh": self.tokens["refresh"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data["code"], "token_revoked")
+
+        tokens = get_tokens_for_user(user)
+        response = self.client.post(reverse("token_refresh", args=["v1"]), {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data["access"])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTH_TRUST_TOKEN_CLAIMS=True, AUTH_USER_CACHE_TIMEOUT=0)
+    def test_reads_can_trust_token_claims(self):
+        response, count = self.user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(count, 0)
+        response, count = self.user_queries("get", "inventory-stats")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(count, 0)
+
+        # writes still load the user
+        data = {"product_name": "Helmet", "price": 6000, "stock_level": 45, "date_added": "2025-07-20"}
+        response, count = self.user_queries("post", "inventory", data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(count, 1)
+
+
+class TokenBlacklistTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            business_name="Token Biz", full_name="Token User", email="tokenuser@testmail.com", is_active=True
+        )
+
+    def refresh(self, refresh_token):
+        """ Returns the response and the queries made on the blacklist table """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("token_refresh", args=["v1"]), {"refresh": refresh_token}, format="json")
+        return response, [query["sql"] for query in queries if "token_blacklist_blacklistedtoken" in query["sql"]]
+
+    def logout(self, tokens):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + tokens["access"])
+        response = self.client.delete("/v1/accounts/logout/", headers={"x-session-refresh-token": tokens["refresh"]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.credentials()
+
+    def test_blacklisted_tokens_are_checked_in_process(self):
+        # every process has to see the blacklist version, so this needs a cache shared between processes
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir}}
+        ):
+            tokens = get_tokens_for_user(self.user)
+            other_tokens = get_tokens_for_user(self.user)
+            response, queries = self.refresh(tokens["refresh"])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response, queries = self.refresh(tokens["refresh"])
+            self.assertEqual(queries, [])
+
+            self.logout(tokens)
+            # the tokens blacklisted since the last load are loaded once after the blacklist changed
+            response, queries = self.refresh(tokens["refresh"])
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(len(queries), 1)
+            self.assertIn("blacklisted_at", queries[0])
+            response, queries = self.refresh(tokens["refresh"])
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(queries, [])
+            response, queries = self.refresh(other_tokens["refresh"])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(queries, [])
+
+            self.logout(other_tokens)
+            response, queries = self.refresh(other_tokens["refresh"])
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            response, queries = self.refresh(tokens["refresh"])
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(queries, [])
+
+    def test_blacklist_is_queried_without_a_shared_cache(self):
+        tokens = get_tokens_for_user(self.user)
+        response, queries = self.refresh(tokens["refresh"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+
+        self.logout(tokens)
+        for _ in range(2):
+            response, queries = self.refresh(tokens["refresh"])
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(len(queries), 1)
+
+    def test_purge_deletes_expired_tokens_in_chunks(self):
+        for _ in range(5):
+            get_tokens_for_user(self.user)
+        expired_ids = list(OutstandingToken.objects.order_by("id").values_list("id", flat=True)[:3])
+        OutstandingToken.objects.filter(id__in=expired_ids).update(expires_at=timezone.now() - timedelta(minutes=1))
+        BlacklistedToken.objects.create(token_id=expired_ids[0])
+        BlacklistedToken.objects.create(token_id=OutstandingToken.objects.order_by("id").last().id)
+
+        out = StringIO()
+        call_command("purge_tokens", chunk_size=2, stdout=out)
+        self.assertIn("Purged 3 expired tokens", out.getvalue())
+        self.assertFalse(OutstandingToken.objects.filter(id__in=expired_ids).exists())
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
@@ -6,17 +6,17 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status,generics
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.tokens import TokenError
 from rest_framework.views import APIView
-from django.core.mail import EmailMultiAlternatives
-import os
+from .outbox import queue_email
+from .authentication import VersionedRefreshToken, VersionedJWTAuthentication
 import random
 from datetime import datetime, timezone, timedelta
 import string
 
 
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = VersionedRefreshToken.for_user(user)
 
     return {
         'refresh': str(refresh),
@@ -56,9 +56,7 @@ def send_email_verification_code(base_url, email):
             f"Here's the otp to verify your email address: <strong>{otp}</strong>. It expires in the next 24 hours.\n"
             "If you didn't create this account, just ignore this email."
         )
-        mail = EmailMultiAlternatives(subject, text_content, os.getenv("EMAIL_HOST_USER"), [email])
-        mail.attach_alternative(html_content, "text/html")
-        mail.send()
+        queue_email(subject, text_content, [email], html_body=html_content) # sent by the 'send_queued_emails' command
         user.email_verification_token = str(otp) + "_" + datetime.now(timezone.utc).isoformat()
         user.save()
 
@@ -119,6 +117,8 @@ class LoginView(APIView):
 
 
 class ProfileView(APIView):
+    # The profile is read and written from the db row, never from a cached user
+    authentication_classes = [VersionedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     parser_classes = [JSONParser]
 
@@ -159,7 +159,7 @@ class LogoutView(APIView):
             )
 
         try:
-            token_to_blacklist = RefreshToken(token_str)
+            token_to_blacklist = VersionedRefreshToken(token_str)
             token_to_blacklist.blacklist()
         except TokenError as err:
             return Response(
@@ -185,9 +185,7 @@ class PasswordResetRequestView(APIView):
                 f"Here's the otp to reset your password: {otp}. It expires in the next 1 hour.\n"
                 "If you didn't request for a password reset, please ignore this email"
             )
-            mail = EmailMultiAlternatives(subject, text_content, os.getenv("EMAIL_HOST_USER"), [email])
-            mail.attach_alternative(html_content, "text/html")
-            mail.send()
+            queue_email(subject, text_content, [email], html_body=html_content) # sent by the 'send_queued_emails' command
             user.passwd_reset_otp_with_time_created = str(otp) + "_" + datetime.now(timezone.utc).isoformat()
             user.save()
 
@@ -210,6 +208,7 @@ class PasswordResetConfirmView(APIView):
             new_password = request.data.get("password")
             user.set_password(new_password)
             user.passwd_reset_otp_with_time_created = None
+            user.revoke_tokens() # logs out every session that used the old password
             user.save()
             return Response({"detail": "Password has been reset."}, status=200)
         return Response({"detail": "Invalid or expired otp"}, status=400)
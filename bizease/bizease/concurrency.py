@@ -0,0 +1,54 @@
+"""
+Runs the independent queries of the dashboard and reports either one after another (the default) or concurrently
+on a bounded pool of threads, so that on a networked database the round trips overlap instead of adding up.
+
+The mode is set per deployment with the QUERY_EXECUTION_MODE setting ("sequential" or "threaded") and the pool size
+with QUERY_THREADS. Every thread uses its own database connection, which is closed after each query unless the
+connections are pooled (the default on postgres, see DATABASES in settings.py) or persistent (CONN_MAX_AGE). Without
+either, the threaded mode opens a new connection for every query and is slower than the sequential one. Inside a
+transaction the queries always run on the current connection, other connections couldn't see its uncommitted writes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connection
+import threading
+
+EXECUTION_MODES = ["sequential", "threaded"]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.QUERY_THREADS, thread_name_prefix="bizease-query")
+        return _executor
+
+
+def run_in_thread(query):
+    """ Connections of pool threads are closed (or returned to the pool) when they're too old or unusable, like after a request """
+    close_old_connections()
+    try:
+        return query()
+    finally:
+        close_old_connections()
+
+
+def run_queries(queries):
+    """
+    Calls every callable in the 'queries' dict and returns a dict of their results under the same keys.
+    The callables must not depend on each other and must return evaluated results (e.g. lists, not lazy querysets)
+    since the querysets would otherwise be evaluated later on the calling thread. Exceptions are re-raised.
+    """
+    mode = settings.QUERY_EXECUTION_MODE
+    if mode not in EXECUTION_MODES:
+        raise ImproperlyConfigured(f"QUERY_EXECUTION_MODE must be one of {', '.join(EXECUTION_MODES)}, not '{mode}'")
+
+    if mode == "sequential" or len(queries) < 2 or connection.in_atomic_block:
+        return {name: query() for name, query in queries.items()}
+
+    futures = {name: get_executor().submit(run_in_thread, query) for name, query in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
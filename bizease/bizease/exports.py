@@ -0,0 +1,69 @@
+"""
+Helpers for streaming a queryset to the client as CSV or NDJSON (one json object per line) without loading
+the whole table into memory. Rows are fetched in chunks with QuerySet.iterator() and written out as they're read.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from datetime import datetime
+import csv
+import json
+
+EXPORT_FILE_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """ File-like object that returns what's written to it instead of storing it, for use with csv.writer """
+    def write(self, value):
+        return value
+
+
+def get_export_file_type(request):
+    """ Returns the requested file type (csv by default) or None if it's invalid """
+    file_type = request.GET.get("file_type", "csv")
+    if file_type not in EXPORT_FILE_TYPES or len(request.GET.getlist("file_type")) > 1:
+        return None
+    return file_type
+
+
+def get_export_date_range(request):
+    """
+    Returns a dict with the optional 'start_date' and 'end_date' parameters as dates or an 'error' key
+    if either of them is invalid
+    """
+    date_range = {}
+    for param in ["start_date", "end_date"]:
+        value = request.GET.get(param)
+        if value is None:
+            continue
+        try:
+            if len(request.GET.getlist(param)) != 1:
+                raise ValueError
+            date_range[param] = datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            return {"error": "Invalid date format. Use YYYY-MM-DD"}
+    return date_range
+
+
+def csv_lines(rows, fieldnames):
+    writer = csv.DictWriter(Echo(), fieldnames=fieldnames, extrasaction="ignore")
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def export_response(rows, file_type, fieldnames, filename):
+    """
+    rows should be a generator of dicts so nothing is read from the db before the response is streamed.
+    fieldnames are the csv columns and are ignored for ndjson
+    """
+    lines = csv_lines(rows, fieldnames) if file_type == "csv" else ndjson_lines(rows)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FILE_TYPES[file_type])
+    response["Content-Disposition"] = f'attachment; filename="{filename}-{timezone.now().date().isoformat()}.{file_type}"'
+    return response
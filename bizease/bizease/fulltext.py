@@ -0,0 +1,141 @@
+"""
+Prefix-matching, relevance-ranked full text search over some text columns of a tenant's rows.
+
+On Postgres, rows are matched with to_tsvector(...) @@ to_tsquery(...) and the migrations add a GIN index on the
+same SearchVector expression. On SQLite, the migrations add a contentless FTS5 table (<table>_fts) with an extra
+'tenant' column and triggers that keep it in sync with every insert, update and delete of the table, so writes
+through the ORM, QuerySet.update() and raw sql are all indexed. Other databases (or SQLite builds without FTS5)
+fall back to icontains filters.
+
+SQLite drops a table's triggers whenever a migration has to rebuild the table (e.g. to add a generated column), so
+such migrations drop the search index first and create it again afterwards.
+"""
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from functools import cache
+import re
+import sqlite3
+
+SEARCH_CONFIG = "simple" # no stemming or stop words, product and client names aren't english prose
+
+
+def fts_table_name(table):
+    return f"{table}_fts"
+
+
+def search_terms(query):
+    """ Only word characters are kept so the terms can't inject query syntax """
+    return re.findall(r"\w+", query.lower())
+
+
+def search_vector(fields):
+    return SearchVector(*fields, config=SEARCH_CONFIG)
+
+
+def gin_index(fields, name):
+    return GinIndex(search_vector(fields), name=name)
+
+
+def create_search_index(schema_editor, model, fields, tenant_field, index_name):
+    """ For use in a RunPython migration. Creates the index of the database in use and indexes the existing rows """
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.add_index(model, gin_index(fields, index_name))
+    elif connection.vendor == "sqlite":
+        table = model._meta.db_table
+        fts_table = fts_table_name(table)
+        tenant_column = model._meta.get_field(tenant_field).column
+        columns = [model._meta.get_field(field).column for field in fields]
+        column_list = ", ".join(columns)
+
+        def values(row):
+            return ", ".join([f"'tenant' || {row}.{tenant_column}"] + [f"coalesce({row}.{column}, '')" for column in columns])
+
+        delete_old = f"INSERT INTO {fts_table}({fts_table}, rowid, tenant, {column_list}) VALUES ('delete', old.id, {values('old')});"
+        insert_new = f"INSERT INTO {fts_table}(rowid, tenant, {column_list}) VALUES (new.id, {values('new')});"
+        if not sqlite_has_fts5():
+            return # searches fall back to icontains
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {fts_table} USING fts5(tenant, {column_list}, content='', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        schema_editor.execute(f"CREATE TRIGGER {fts_table}_ai AFTER INSERT ON {table} BEGIN {insert_new} END")
+        schema_editor.execute(f"CREATE TRIGGER {fts_table}_ad AFTER DELETE ON {table} BEGIN {delete_old} END")
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts_table}_au AFTER UPDATE OF {tenant_column}, {column_list} ON {table} BEGIN {delete_old} {insert_new} END"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {fts_table}(rowid, tenant, {column_list}) SELECT id, {values(table)} FROM {table}"
+        )
+
+
+def drop_search_index(schema_editor, model, fields, tenant_field, index_name):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.remove_index(model, gin_index(fields, index_name))
+    elif connection.vendor == "sqlite":
+        fts_table = fts_table_name(model._meta.db_table)
+        for suffix in ["ai", "ad", "au"]:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {fts_table}")
+
+
+@cache
+def sqlite_has_fts5():
+    # checked on a throwaway in-memory db, so no query runs on the django connection
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.execute("CREATE VIRTUAL TABLE fts5_check USING fts5(text)")
+    except sqlite3.Error:
+        return False
+    finally:
+        connection.close()
+    return True
+
+
+def fulltext_available(alias):
+    """ The migrations create the search index of every database that's supported here """
+    vendor = connections[alias].vendor
+    return vendor == "postgresql" or (vendor == "sqlite" and sqlite_has_fts5())
+
+
+def full_text_search(queryset, query, fields, tenant_field, tenant_id, weights=None, then_order_by=()):
+    """
+    Filters queryset (which should already be limited to the tenant) to the rows whose fields contain words
+    starting with every term in query, ordered from the most relevant. weights are the relative weights of the
+    fields on SQLite. then_order_by breaks ties between equally relevant rows
+    """
+    terms = search_terms(query)
+    table = queryset.model._meta.db_table
+    if not terms or not fulltext_available(queryset.db):
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f"{field}__icontains": query})
+        return queryset.filter(condition)
+
+    if connections[queryset.db].vendor == "postgresql":
+        vector = search_vector(fields)
+        tsquery = SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config=SEARCH_CONFIG)
+        return (
+            queryset.alias(search_document=vector).filter(search_document=tsquery)
+            .annotate(search_rank=SearchRank(vector, tsquery)).order_by("-search_rank", *then_order_by)
+        )
+
+    fts_table = fts_table_name(table)
+    columns = " ".join(queryset.model._meta.get_field(field).column for field in fields)
+    match = f'tenant : "tenant{int(tenant_id)}" AND {{{columns}}} : (' + " AND ".join(f'"{term}"*' for term in terms) + ")"
+    bm25_weights = ", ".join(str(float(weight)) for weight in [0] + list(weights or [1] * len(fields)))
+    # The rows are restricted to the rowids the fts index matches, so the index drives the count and the page queries.
+    # Joining the fts table (for the rank) on "id = rowid" alone would let SQLite walk the tenant's rows and run the
+    # MATCH again for each of them, which the unary + on the rowid rules out
+    matched_ids = RawSQL(f'SELECT rowid FROM "{fts_table}" WHERE "{fts_table}" MATCH %s', [match])
+    # extra() is the only way to join the fts table (on its rowid) without a model for it
+    return queryset.filter(pk__in=matched_ids).extra(
+        tables=[fts_table],
+        where=[f'"{table}"."id" = +"{fts_table}".rowid', f'"{fts_table}" MATCH %s'],
+        params=[match],
+        select={"search_rank": f'bm25("{fts_table}", {bm25_weights})'}, # lower is more relevant
+    ).order_by("search_rank", *then_order_by)
@@ -0,0 +1,45 @@
+"""
+Helpers for the bulk import endpoints, which take the rows either as a JSON array or as a CSV upload (the format
+of the exports, so an export can be imported again). CSV bodies are parsed lazily, line by line from the request
+stream, so the raw upload is never held in memory as a whole.
+"""
+from rest_framework.parsers import BaseParser
+import codecs
+import csv
+
+IMPORT_MAX_ROWS = 10000
+IMPORT_BATCH_SIZE = 1000
+
+
+class CSVParser(BaseParser):
+    """ Parses a text/csv body with a header row into an iterator of dicts """
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return csv.DictReader(codecs.iterdecode(stream, "utf-8-sig")) # utf-8-sig drops the BOM spreadsheet apps add
+
+
+def read_import_rows(data, ignored_fields=()):
+    """
+    Returns (rows, error) where rows is a list of dicts and error a message for the response if the body is invalid.
+    ignored_fields (e.g. the read-only columns of an export) are dropped, and so are empty csv cells so the
+    model's defaults apply to them
+    """
+    from_csv = isinstance(data, csv.DictReader)
+    if not from_csv and not isinstance(data, list):
+        return None, "Expected a JSON array or a CSV file of rows"
+
+    rows = []
+    try:
+        for row in data:
+            if len(rows) == IMPORT_MAX_ROWS:
+                return None, f"A request can't have more than {IMPORT_MAX_ROWS} rows"
+            if isinstance(row, dict):
+                row = {
+                    key: value for key, value in row.items()
+                    if key not in ignored_fields and not (from_csv and value in ("", None))
+                }
+            rows.append(row)
+    except (csv.Error, UnicodeDecodeError):
+        return None, "Invalid CSV file"
+    return rows, None
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     'orders',
     'dashboard',
     'reports',
+    'operations',
     "corsheaders",
     'rest_framework',
     'rest_framework_simplejwt',
@@ -83,14 +84,17 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
  ] 
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1), # change to 1 hour in the final release
     "REFRESH_TOKEN_LIFETIME": timedelta(days=5),
-    "ROTATE_REFRESH_TOKENS": False
+    "ROTATE_REFRESH_TOKENS": False,
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.serializers.VersionedTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.VersionedTokenRefreshSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "accounts.serializers.VersionedTokenBlacklistSerializer",
 }
 
 MIDDLEWARE = [
@@ -107,6 +111,7 @@ MIDDLEWARE = [
 CORS_ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
 CORS_ALLOWED_ORIGIN_REGEXES = [r"^http://localhost:\d+$"]
 CORS_ALLOW_METHODS = ("DELETE", "GET", "OPTIONS", "POST", "PUT")
+CORS_EXPOSE_HEADERS = ["X-Cache"]
 
 ROOT_URLCONF = 'bizease.urls'
 
@@ -142,9 +147,39 @@ DATABASES = {
         "PASSWORD": os.getenv('PASSWORD'),
         "HOST": os.getenv('HOST'),
         "PORT": os.getenv('PORT'),
-        "pool": True,
+        # seconds a connection is kept open for reuse. Can't be combined with the postgres pool below
+        "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", 0)),
     }
 }
+# Postgres connections come from a pool (needs psycopg[pool]) unless DB_POOL=false, e.g. to use CONN_MAX_AGE instead
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql" and os.getenv("DB_POOL", "True").lower() in ("true", "1"):
+    DATABASES["default"]["OPTIONS"] = {"pool": True}
+
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache) when running more than one process
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "bizease"),
+    }
+}
+
+# Seconds the dashboard, reports and stats responses are cached for. 0 disables the cache. Off by default with a per
+# process cache, as a write only invalidates the cached responses of the process that handled it
+SHARED_CACHE = CACHES["default"]["BACKEND"] not in (
+    "django.core.cache.backends.locmem.LocMemCache", "django.core.cache.backends.dummy.DummyCache"
+)
+TENANT_CACHE_TIMEOUT = int(os.getenv("TENANT_CACHE_TIMEOUT", 300 if SHARED_CACHE else 0))
+
+# Seconds an authenticated user is cached for (see accounts/authentication.py). 0 loads it from the db on every request
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", 60))
+# Lets the read-only requests of the list, stats and reports endpoints skip the user lookup and trust the token's claims.
+# Deactivating a user or revoking its tokens then only stops those requests once the access token expires
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "False").lower() in ("true", "1")
+
+# "threaded" runs the independent queries of the dashboard and reports concurrently on QUERY_THREADS threads
+# (see bizease/concurrency.py). Worth it with a networked database, "sequential" otherwise
+QUERY_EXECUTION_MODE = os.getenv("QUERY_EXECUTION_MODE", "sequential")
+QUERY_THREADS = int(os.getenv("QUERY_THREADS", 4))
 
 
 # Password validation
@@ -0,0 +1,71 @@
+"""
+Helpers for the sync endpoints, which return only the records of a user that changed or were deleted since a change
+token so clients can stay current without downloading the whole list again.
+
+A token is the server time of the sync request that returned it, in microseconds. Records are matched on their
+modification time, which is set before their transaction commits, so a write that commits just after a sync read the
+table can have a modification time before the token. Each sync therefore also returns the records changed in the
+SYNC_OVERLAP before the token: clients can get a record they already have again, but don't miss one unless its
+transaction ran for longer than that. Deletes are read from reports.models.Tombstone, which the 'purge_tombstones'
+command trims to the last SYNC_TOMBSTONE_DAYS days, so older tokens are rejected and the client has to download the
+full list again.
+"""
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework import status
+from reports.models import Tombstone
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+SYNC_OVERLAP = timedelta(seconds=60)
+SYNC_TOMBSTONE_DAYS = 30
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def make_sync_token(time):
+    return str((time - EPOCH) // timedelta(microseconds=1))
+
+
+def parse_sync_token(token):
+    """ Returns the time of a token or None if it's invalid """
+    if not (token.isascii() and token.isdigit()): # isdigit() alone also accepts digits like '²' that int() doesn't
+        return None
+    try:
+        return EPOCH + timedelta(microseconds=int(token))
+    except OverflowError:
+        return None
+
+
+def sync_response(request, queryset, time_field, resource, serializer_class):
+    """
+    Response with the records of queryset (already limited to the user) whose time_field is after the 'since' token,
+    the ids of the user's records of resource deleted since then and the token for the next sync. Without 'since'
+    every record is returned and nothing is reported deleted
+    """
+    now = timezone.now()
+    since = request.GET.get("since")
+    deleted = []
+    if since is not None:
+        since_time = parse_sync_token(since) if len(request.GET.getlist("since")) == 1 else None
+        if since_time is None:
+            return Response({"detail": "Invalid sync token"}, status=status.HTTP_400_BAD_REQUEST)
+        start = since_time - SYNC_OVERLAP
+        if start < now - timedelta(days=SYNC_TOMBSTONE_DAYS):
+            return Response(
+                {"detail": "The sync token has expired. Download the full list again"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = queryset.filter(**{f"{time_field}__gt": start})
+        deleted = list(
+            Tombstone.objects.filter(owner=request.user.id, resource=resource, deleted_at__gt=start)
+            .values_list("object_id", flat=True)
+        )
+
+    changed = serializer_class(list(queryset.order_by(time_field, "id")), many=True).data
+    data = {"next": make_sync_token(now), "changed": changed, "deleted": deleted}
+    return Response({"data": data}, status=status.HTTP_200_OK)
+
+
+def purge_tombstones():
+    """ Deletes the tombstones no valid sync token can ask for any more. Returns the number deleted """
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=SYNC_TOMBSTONE_DAYS)).delete()
+    return deleted
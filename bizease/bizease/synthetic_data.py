@@ -0,0 +1,57 @@
+from django.utils import timezone
+from inventory.models import Inventory
+from orders.models import Order, OrderedProduct
+from reports.rollups import rebuild_rollups, reconcile_tenant_stats
+from datetime import timedelta
+from decimal import Decimal
+import random
+
+
+def seed_tenant(owner, product_count=200, order_count=100, lines_per_order=3, days=365, delivered_ratio=0.7, rng=None, batch_size=1000):
+    """
+    Fills a user's inventory and orders with synthetic data using bulk inserts. Orders are spread over the last
+    'days' days and each has 'lines_per_order' distinct ordered products. Stock levels aren't decremented by the
+    generated orders but everything derived from them (the sales rollups and tenant stats) is rebuilt for the user.
+    """
+    rng = rng or random.Random()
+    today = timezone.now().date()
+    lines_per_order = min(lines_per_order, product_count)
+
+    products = Inventory.objects.bulk_create(
+        [
+            Inventory(
+                owner=owner, product_name=f"Product {i}", description=f"Synthetic product number {i}", category=f"Category {i % 10}",
+                stock_level=rng.randint(0, 500), low_stock_threshold=rng.randint(0, 20), price=Decimal(rng.randint(100, 10000000)) / 100,
+                date_added=today - timedelta(days=rng.randint(0, days))
+            )
+            for i in range(product_count)
+        ],
+        batch_size=batch_size
+    )
+
+    orders = []
+    orders_products = []
+    for i in range(order_count if products else 0):
+        order_date = today - timedelta(days=rng.randint(0, days))
+        delivered = rng.random() < delivered_ratio
+        ordered_products = [
+            OrderedProduct(name=product.product_name, price=product.price, quantity=quantity, cummulative_price=product.price * quantity)
+            for product, quantity in ((product, rng.randint(1, 10)) for product in rng.sample(products, lines_per_order))
+        ]
+        orders.append(Order(
+            product_owner_id=owner, client_name=f"Client {i}", client_email=f"client{i}@example.com", client_phone=f"0800000{i:04d}",
+            status="Delivered" if delivered else "Pending", order_date=order_date, delivery_date=order_date if delivered else None,
+            total_price=sum(product.cummulative_price for product in ordered_products),
+            ordered_product_names="\n".join(product.name for product in ordered_products)
+        ))
+        orders_products.append(ordered_products)
+
+    orders = Order.objects.bulk_create(orders, batch_size=batch_size)
+    for order, ordered_products in zip(orders, orders_products):
+        for product in ordered_products:
+            product.order_id = order
+    OrderedProduct.objects.bulk_create([product for products in orders_products for product in products], batch_size=batch_size)
+
+    rebuild_rollups(owner.id)
+    reconcile_tenant_stats(owner.id)
+    return products, orders
@@ -0,0 +1,118 @@
+"""
+Versioned cache for the responses of the read-heavy aggregate endpoints (dashboard, reports and stats).
+
+Every user (tenant) has a data version stored in the cache. Cached responses are keyed by the owner, the endpoint,
+the normalised query parameters, the current date (for periods relative to today) and that version, so bumping
+the version makes all of a tenant's cached responses unreachable at once and they expire on their own.
+The version is bumped whenever a tenant's inventory, orders or account change (see dashboard/signals.py).
+Code that writes with queryset.update()/bulk_create() doesn't trigger those signals and has to call
+invalidate_tenant() itself.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework import status
+from urllib.parse import urlencode
+from functools import wraps
+import hashlib
+import time
+
+GLOBAL_VERSION_KEY = "tenant_cache:version"
+HITS_KEY = "tenant_cache:hits"
+MISSES_KEY = "tenant_cache:misses"
+
+
+def version_key(owner_id):
+    return f"tenant_cache:{owner_id}:version"
+
+
+def new_version():
+    # Versions start from the current time so a version key that was evicted from the cache can't be recreated
+    # with a value some stale cached responses are still stored under
+    return time.time_ns()
+
+
+def get_data_version(owner_id):
+    keys = [GLOBAL_VERSION_KEY, version_key(owner_id)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return f"{versions[GLOBAL_VERSION_KEY]}.{versions[version_key(owner_id)]}"
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), timeout=None)
+
+
+def invalidate_tenant(owner_id):
+    """
+    Makes all cached responses of a user stale. The version is bumped right away and again when the current
+    transaction commits so responses computed from uncommitted (or not yet visible) data aren't reused
+    """
+    key = version_key(owner_id)
+    bump_version(key)
+    transaction.on_commit(lambda: bump_version(key))
+
+
+def invalidate_all_tenants():
+    bump_version(GLOBAL_VERSION_KEY)
+    transaction.on_commit(lambda: bump_version(GLOBAL_VERSION_KEY))
+
+
+def count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_cache_stats():
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {"hits": stats.get(HITS_KEY, 0), "misses": stats.get(MISSES_KEY, 0)}
+
+
+def reset_cache_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+def get_response_key(request, endpoint, owner_id):
+    params = urlencode(sorted((name, value) for name, values in request.GET.lists() for value in values))
+    raw_key = f"{endpoint}:{request.version}:{params}:{timezone.now().date().isoformat()}:{get_data_version(owner_id)}"
+    return f"tenant_cache:{owner_id}:response:{hashlib.md5(raw_key.encode()).hexdigest()}"
+
+
+def cache_tenant_response(get_method):
+    """
+    Decorator for the get method of APIViews whose response only depends on the user's data and the query
+    parameters. Only successful responses are cached. The X-Cache header tells if a response came from the cache
+    """
+    @wraps(get_method)
+    def wrapper(self, request, *args, **kwargs):
+        timeout = getattr(settings, "TENANT_CACHE_TIMEOUT", 0)
+        if not timeout:
+            return get_method(self, request, *args, **kwargs)
+
+        key = get_response_key(request, type(self).__name__, request.user.id)
+        data = cache.get(key)
+        if data is not None:
+            count(HITS_KEY)
+            response = Response(data, status=status.HTTP_200_OK)
+            response["X-Cache"] = "HIT"
+            return response
+
+        count(MISSES_KEY)
+        response = get_method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # pickling evaluates any queryset in the data, so the cached copy never queries the db
+            cache.set(key, response.data, timeout)
+        response["X-Cache"] = "MISS"
+        return response
+    return wrapper
@@ -0,0 +1,16 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from contextlib import contextmanager
+
+
+class QueryBudgetMixin:
+	""" For tests asserting that an endpoint never runs more than a fixed number of SQL queries """
+
+	@contextmanager
+	def assertMaxQueries(self, max_queries):
+		with CaptureQueriesContext(connection) as context:
+			yield context
+		executed = len(context.captured_queries)
+		if executed > max_queries:
+			queries = "\n".join(f"{i}. {query['sql']}" for i, query in enumerate(context.captured_queries, start=1))
+			self.fail(f"{executed} queries executed, the budget is {max_queries}. Queries:\n{queries}")
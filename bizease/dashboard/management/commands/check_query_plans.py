@@ -0,0 +1,124 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from accounts.authentication import VersionedRefreshToken
+from .run_benchmarks import BENCHMARK_CASES, Command as BenchmarkCommand
+import re
+
+# Tables that are always read by primary key or are too small to matter
+IGNORED_TABLES = {"accounts_customuser", "token_blacklist_outstandingtoken", "token_blacklist_blacklistedtoken", "django_session"}
+
+# Flag columns with a partial index. Queries filtering on them should go through that index, not a wider one
+PARTIAL_INDEXES = {
+    "is_low_stock": "inventory_owner_low_stock_idx",
+}
+
+EXPORT_CASES = [
+    ("inventory-export", "inventory-export", {}),
+    ("orders-export", "orders-export", {"status": "delivered"}),
+]
+
+
+def explain(sql):
+    """ Returns the lines of the query plan of sql """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            with transaction.atomic():
+                # the tables of a test db are small enough for postgres to prefer scanning them even when a suitable
+                # index exists. With sequential scans discouraged, any left in the plan have no index to use instead
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+                return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def sequential_scans(plan):
+    """ Names of the tables the plan reads in full """
+    tables = set()
+    for line in plan:
+        if connection.vendor == "postgresql":
+            match = re.search(r"Seq Scan on (\w+)", line)
+        else:
+            # "SCAN <table>" without an index is a full table scan. Full text (virtual) tables are searched, not scanned
+            match = re.match(r"\s*SCAN (\w+)(?: AS \w+)?$", line)
+        if match and match.group(1) not in IGNORED_TABLES:
+            tables.add(match.group(1))
+    return tables
+
+
+def full_text_match_per_row(plan):
+    """
+    True if the plan runs a full text MATCH once per row of another table. A SQLite fts5 table given the rowid as a
+    constraint (an '=' in the index string, e.g. 'INDEX 0:=M3') is searched again for every row it's joined to,
+    instead of once with the other table looked up by the rowids it matched
+    """
+    return any(re.search(r"VIRTUAL TABLE INDEX \d+:\S*=", line) for line in plan)
+
+
+def unindexed_sort(sql, plan):
+    """
+    True if a query that returns a page of rows sorts every matching row first because no index has them in order.
+    Sorting grouped rows and full text search results by relevance can't be avoided so those are allowed
+    """
+    if " LIMIT " not in sql or "GROUP BY" in sql or any("VIRTUAL TABLE" in line or "ts_rank" in line for line in plan):
+        return False
+    if connection.vendor == "postgresql":
+        return any(re.match(r"\s*(->\s*)?Sort\b", line) for line in plan)
+    return any("USE TEMP B-TREE FOR ORDER BY" in line for line in plan)
+
+
+def unused_partial_indexes(sql, plan):
+    """ Names of the partial indexes for the flags sql filters on that the plan doesn't use """
+    where_clause = sql.partition(" WHERE ")[2]
+    return {
+        index for column, index in PARTIAL_INDEXES.items()
+        if f'"{column}"' in where_clause and not any(index in line for line in plan)
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Calls the api endpoints as a user, runs EXPLAIN on every query they make and fails if any of them scans "
+        "a whole table, sorts all of a user's rows to return a page or runs a full text search once per row, instead of "
+        "using an index. Run it against a database with data, e.g. from 'generate_tenants'"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", help="Email of the user to make requests as. Defaults to the user with the most orders")
+
+    @override_settings(TENANT_CACHE_TIMEOUT=0)
+    def handle(self, *args, **options):
+        user = BenchmarkCommand().get_user(options["email"])
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {VersionedRefreshToken.for_user(user).access_token}")
+
+        problems = []
+        for name, url_name, params in BENCHMARK_CASES + EXPORT_CASES:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(reverse(url_name, args=["v1"]), params)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+            if response.status_code != 200:
+                raise CommandError(f"Request to {url_name} with {params} failed with status code {response.status_code}")
+
+            for query in queries.captured_queries:
+                if not query["sql"].lstrip().upper().startswith("SELECT"):
+                    continue
+                plan = explain(query["sql"])
+                scanned_tables = sequential_scans(plan)
+                skipped_indexes = unused_partial_indexes(query["sql"], plan)
+                if scanned_tables:
+                    problems.append(f"{name}: full scan of {', '.join(sorted(scanned_tables))} in\n{query['sql']}\n" + "\n".join(plan))
+                elif full_text_match_per_row(plan):
+                    problems.append(f"{name}: the full text search runs once per row in\n{query['sql']}\n" + "\n".join(plan))
+                elif unindexed_sort(query["sql"], plan):
+                    problems.append(f"{name}: every matching row is sorted to return a page in\n{query['sql']}\n" + "\n".join(plan))
+                elif skipped_indexes:
+                    problems.append(f"{name}: {', '.join(sorted(skipped_indexes))} not used in\n{query['sql']}\n" + "\n".join(plan))
+            self.stdout.write(f"{name}: {len(queries.captured_queries)} queries checked")
+
+        if problems:
+            raise CommandError("Queries without a usable index:\n\n" + "\n\n".join(problems))
+        self.stdout.write(self.style.SUCCESS("Every query uses an index"))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from accounts.models import CustomUser
+from bizease.synthetic_data import seed_tenant
+import random
+
+
+class Command(BaseCommand):
+    help = "Generates users (tenants) with synthetic inventory and orders for load testing and benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenants", type=int, default=1, help="Number of users to generate")
+        parser.add_argument("--products", type=int, default=1000, help="Number of inventory items per user")
+        parser.add_argument("--orders", type=int, default=5000, help="Number of orders per user")
+        parser.add_argument("--lines-per-order", type=int, default=3, help="Number of ordered products per order")
+        parser.add_argument("--days", type=int, default=365, help="Orders are spread over this many days before today")
+        parser.add_argument("--email-prefix", default="tenant", help="Generated users get the emails <prefix><n>@bizease.test")
+        parser.add_argument("--password", default="benchmark-password", help="Password of every generated user")
+        parser.add_argument("--seed", type=int, help="Seed for the random generator to get reproducible data")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        prefix = options["email_prefix"]
+        first_number = CustomUser.objects.filter(email__startswith=prefix, email__endswith="@bizease.test").count() + 1
+        password = make_password(options["password"]) # hashing is slow so it's only done once
+
+        with transaction.atomic():
+            users = CustomUser.objects.bulk_create([
+                CustomUser(
+                    email=f"{prefix}{n}@bizease.test", business_name=f"{prefix.title()} {n} Stores", full_name=f"{prefix.title()} {n}",
+                    password=password, is_active=True
+                )
+                for n in range(first_number, first_number + options["tenants"])
+            ])
+
+        for user in users:
+            with transaction.atomic():
+                seed_tenant(
+                    user, product_count=options["products"], order_count=options["orders"], lines_per_order=options["lines_per_order"],
+                    days=options["days"], rng=rng
+                )
+            self.stdout.write(f"{user.email}: {options['products']} products, {options['orders']} orders")
+        self.stdout.write(self.style.SUCCESS(f"Generated {len(users)} tenant(s)"))
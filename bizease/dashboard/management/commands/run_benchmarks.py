@@ -0,0 +1,183 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import CustomUser
+from accounts.authentication import VersionedRefreshToken
+from statistics import quantiles, mean
+import json
+import time
+
+
+# (name, url name, query parameters)
+BENCHMARK_CASES = [
+    ("inventory", "inventory", {}),
+    ("inventory-page", "inventory", {"page": 1}),
+    ("inventory-cursor", "inventory", {"cursor": ""}),
+    ("inventory-search", "inventory", {"query": "product 1", "page": 1}),
+    ("inventory-low-stock", "inventory", {"low_stock": "", "page": 1}),
+    ("inventory-stats", "inventory-stats", {}),
+    ("orders", "orders", {}),
+    ("orders-page", "orders", {"page": 1}),
+    ("orders-search", "orders", {"query": "client 1", "page": 1}),
+    ("orders-stats", "orders-stats", {}),
+    ("dashboard-data", "dashboard-data", {}),
+    ("dashboard-data-all-time", "dashboard-data", {"period": "all-time"}),
+    ("reports", "reports", {}),
+    ("reports-last-month", "reports", {"period": "last-month"}),
+    ("reports-summary", "reports-summary", {}),
+    ("reports-summary-last-year", "reports-summary", {"period": "last-year"}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Calls each api endpoint as a user and records p50/p95/p99 latency and query counts to a json baseline. "
+        "Use --compare to check a run against a previously saved baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", help="Email of the user to make requests as. Defaults to the user with the most orders")
+        parser.add_argument("--iterations", type=int, default=50, help="Number of timed requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=5, help="Number of untimed requests per endpoint before timing")
+        parser.add_argument("--live-server", help="Base url (e.g. http://localhost:8000) of a running server to benchmark instead of the test client")
+        parser.add_argument(
+            "--with-cache", action="store_true",
+            help="Let the dashboard, reports and stats endpoints serve cached responses. By default every request computes its response"
+        )
+        parser.add_argument("--only", nargs="+", help="Only run the benchmark cases with these names")
+        parser.add_argument("--output", help="Path of the json file to write the results to")
+        parser.add_argument("--compare", help="Path of a baseline json file to compare the results with")
+        parser.add_argument(
+            "--threshold", type=float, default=20,
+            help="Percentage by which p95 latency can exceed the baseline's before it's reported as a regression"
+        )
+
+    def get_user(self, email):
+        if email:
+            try:
+                return CustomUser.objects.get(email=email)
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"No user with the email '{email}'")
+
+        from django.db.models import Count
+        user = CustomUser.objects.annotate(order_count=Count("order")).order_by("-order_count", "id").first()
+        if user is None:
+            raise CommandError("There are no users to benchmark with. Create some with the 'generate_tenants' command")
+        return user
+
+    def make_request_function(self, live_server, access_token):
+        if live_server:
+            import requests
+            session = requests.Session()
+            session.headers["Authorization"] = f"Bearer {access_token}"
+            return lambda path, params: session.get(live_server.rstrip("/") + path, params=params).status_code
+
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {access_token}")
+        return lambda path, params: client.get(path, params).status_code
+
+    def run_case(self, request, path, params, iterations, warmup, count_queries):
+        for _ in range(warmup):
+            request(path, params)
+
+        timings = []
+        query_counts = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                status_code = request(path, params)
+                timings.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(queries.captured_queries))
+            if status_code != 200:
+                raise CommandError(f"Request to {path} with {params} failed with status code {status_code}")
+
+        cut_points = quantiles(timings, n=100, method="inclusive") if len(timings) > 1 else timings * 99
+        return {
+            "p50_ms": round(cut_points[49], 3),
+            "p95_ms": round(cut_points[94], 3),
+            "p99_ms": round(cut_points[98], 3),
+            "mean_ms": round(mean(timings), 3),
+            "queries": max(query_counts) if count_queries else None,
+        }
+
+    def slow_plans(self, request, path, params):
+        """ Descriptions of the queries of one request whose plan runs a full text search once per row """
+        from .check_query_plans import explain, full_text_match_per_row
+
+        with CaptureQueriesContext(connection) as queries:
+            request(path, params)
+        return [
+            f"the full text search runs once per row in\n{query['sql']}" for query in queries.captured_queries
+            if query["sql"].lstrip().upper().startswith("SELECT") and full_text_match_per_row(explain(query["sql"]))
+        ]
+
+    def compare(self, results, baseline_path, threshold):
+        try:
+            with open(baseline_path) as baseline_file:
+                baseline = json.load(baseline_file)["results"]
+        except (OSError, ValueError, KeyError) as err:
+            raise CommandError(f"Couldn't read baseline file '{baseline_path}': {err}")
+
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                self.stdout.write(f"{name}: not in baseline")
+                continue
+            change = ((result["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100) if previous["p95_ms"] else 0
+            self.stdout.write(
+                f"{name}: p95 {previous['p95_ms']}ms -> {result['p95_ms']}ms ({change:+.1f}%), queries {previous['queries']} -> {result['queries']}"
+            )
+            if change > threshold:
+                regressions.append(f"{name}: p95 latency is {change:.1f}% higher than the baseline")
+            if None not in (result["queries"], previous["queries"]) and result["queries"] > previous["queries"]:
+                regressions.append(f"{name}: {result['queries']} queries, the baseline ran {previous['queries']}")
+        return regressions
+
+    def handle(self, *args, **options):
+        if options["with_cache"] or options["live_server"]:
+            return self.run(options)
+        with override_settings(TENANT_CACHE_TIMEOUT=0):
+            return self.run(options)
+
+    def run(self, options):
+        user = self.get_user(options["email"])
+        access_token = str(VersionedRefreshToken.for_user(user).access_token)
+        request = self.make_request_function(options["live_server"], access_token)
+        iterations = max(options["iterations"], 1)
+
+        cases = [case for case in BENCHMARK_CASES if not options["only"] or case[0] in options["only"]]
+        results = {}
+        plan_problems = []
+        for name, url_name, params in cases:
+            results[name] = self.run_case(
+                request, reverse(url_name, args=["v1"]), params, iterations, options["warmup"], count_queries=not options["live_server"]
+            )
+            if not options["live_server"]: # the queries of a live server can't be captured
+                plan_problems += [f"{name}: {problem}" for problem in self.slow_plans(request, reverse(url_name, args=["v1"]), params)]
+            result = results[name]
+            self.stdout.write(
+                f"{name}: p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, p99 {result['p99_ms']}ms, queries {result['queries']}"
+            )
+
+        if options["output"]:
+            report = {
+                "created": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "user": user.email,
+                "iterations": iterations,
+                "live_server": options["live_server"],
+                "with_cache": options["with_cache"],
+                "results": results,
+            }
+            with open(options["output"], "w") as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        regressions = self.compare(results, options["compare"], options["threshold"]) if options["compare"] else []
+        if regressions or plan_problems:
+            raise CommandError("Performance regressions found:\n" + "\n".join(regressions + plan_problems))
+        if options["compare"]:
+            self.stdout.write(self.style.SUCCESS("No regressions compared to the baseline"))
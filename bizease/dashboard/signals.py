@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from accounts.models import CustomUser
+from inventory.models import Inventory
+from orders.models import Order, OrderedProduct
+from bizease.tenant_cache import invalidate_tenant
+
+
+def deleted_with_parent(instance, origin):
+    """ Rows deleted by a cascade from an order or a user are covered by the signal of that order/user """
+    return origin is not None and origin is not instance and isinstance(origin, (Order, CustomUser))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_tenant(instance.id)
+
+
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def invalidate_inventory_owner_cache(sender, instance, origin=None, **kwargs):
+    if not deleted_with_parent(instance, origin):
+        invalidate_tenant(instance.owner_id)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_order_owner_cache(sender, instance, origin=None, **kwargs):
+    if not deleted_with_parent(instance, origin):
+        invalidate_tenant(instance.product_owner_id_id)
+
+
+@receiver(post_save, sender=OrderedProduct)
+@receiver(post_delete, sender=OrderedProduct)
+def invalidate_ordered_product_owner_cache(sender, instance, origin=None, **kwargs):
+    if not deleted_with_parent(instance, origin):
+        invalidate_tenant(instance.order_id.product_owner_id_id)
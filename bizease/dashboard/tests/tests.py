@@ -78,6 +78,22 @@ class DashboardViewTest(APITransactionTestCase):
 
 		self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+	def test_get_all_time_dashboard_data_of_user_without_data(self):
+		user = CustomUser.objects.create(business_name="Empty llc", full_name="Empty User", email="empty@gmail.com", password="12345678", is_active=True)
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(user).access_token))
+		response = self.client.get(reverse("dashboard-data", args=["v1"]), query_params={"period": "all-time"}, format="json")
+
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"], {
+			"business_name": "Empty llc", "currency": user.currency, "language": user.language, "top_selling_product": None,
+			"revenue": None, "revenue_change": None, "pending_orders": [], "low_stock_items": []
+		})
+
+		# the other periods have no revenue instead
+		response = self.client.get(reverse("dashboard-data", args=["v1"]), format="json")
+		self.assertEqual(response.data["data"]["revenue"], 0)
+		self.assertEqual(response.data["data"]["revenue_change"], None)
+
 
 	@patch("dashboard.views.datetime", mock_datetime)
 	def test_get_last_30_days_dashboard_data_with_credentials(self):
@@ -153,6 +169,35 @@ class DashboardViewTest(APITransactionTestCase):
 
 		self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+	def test_get_date_range_dashboard_data_with_credentials(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("dashboard-data", args=["v1"]), query_params={"start_date": "2025-03-01", "end_date": "2025-03-31"}, format="json")
+
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["top_selling_product"], "Helmet")
+		self.assertEqual(response.data["data"]["revenue"], 206000)
+		self.assertEqual(response.data["data"]["revenue_change"], Decimal('37.33')) # compared with 2025-01-29 to 2025-02-28
+		self.assertEqual(len(response.data["data"]["pending_orders"]), 0)
+		self.assertEqual(len(response.data["data"]["low_stock_items"]), 1)
+
+		response = self.client.get(reverse("dashboard-data", args=["v1"]), query_params={"start_date": "2025-02-01", "end_date": "2025-04-30"}, format="json")
+		self.assertEqual(response.data["data"]["revenue"], 356000)
+		self.assertEqual(response.data["data"]["revenue_change"], None)
+		self.assertEqual([order["client_name"] for order in response.data["data"]["pending_orders"]], ["customer 2", "bob"])
+
+	def test_get_dashboard_data_with_invalid_date_range(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		invalid_params = [
+			({"start_date": "2025-03-01"}, "start_date and end_date must both be given once"),
+			({"start_date": "2025-03-01", "end_date": "31-03-2025"}, "Invalid date format. Use YYYY-MM-DD"),
+			({"start_date": "2025-03-31", "end_date": "2025-03-01"}, "start_date can't be later than end_date"),
+			({"start_date": "2025-03-01", "end_date": "2025-03-31", "period": "all-time"}, "Invalid GET parameters. Only period or a combination of start_date and end_date is allowed"),
+		]
+		for params, detail in invalid_params:
+			response = self.client.get(reverse("dashboard-data", args=["v1"]), query_params=params, format="json")
+			self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertEqual(response.data["detail"], detail)
+
 	def test_get_dashboard_data_with_credentials_zero_and_null(self):
 
 		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
@@ -0,0 +1,90 @@
+from rest_framework.test import APITestCase
+from accounts.models import CustomUser
+from inventory.models import Inventory
+from orders.models import Order, OrderedProduct
+from bizease.tenant_cache import get_cache_stats, reset_cache_stats, invalidate_all_tenants
+from accounts.authentication import VersionedRefreshToken
+from django.core.cache import cache
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework import status
+
+
+@override_settings(TENANT_CACHE_TIMEOUT=300) # off by default with the per process test cache
+class TenantCacheTest(APITestCase):
+	@classmethod
+	def setUpTestData(cls):
+		cls.test_user = CustomUser.objects.create(business_name="Random sales llc", full_name="Random User", email="randomuser@gmail.com", password="12345678", is_active=True)
+		cls.other_user = CustomUser.objects.create(business_name="Other sales llc", full_name="Other User", email="otheruser@gmail.com", password="12345678", is_active=True)
+		cls.item = Inventory.objects.create(owner=cls.test_user, product_name="Helmet", price=6000, stock_level=45, date_added="2025-01-20")
+		Inventory.objects.create(owner=cls.other_user, product_name="Helmet", price=6000, stock_level=45, date_added="2025-01-20")
+
+	def setUp(self):
+		cache.clear()
+		reset_cache_stats()
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(VersionedRefreshToken.for_user(self.test_user).access_token))
+
+	def get_stats(self):
+		return self.client.get(reverse("inventory-stats", args=["v1"]))
+
+	def test_responses_are_cached_per_query_params(self):
+		response = self.get_stats()
+		self.assertEqual(response["X-Cache"], "MISS")
+		self.assertEqual(response.data["data"]["total_products"], 1)
+
+		with self.assertNumQueries(0): # the user is cached too
+			response = self.get_stats()
+		self.assertEqual(response["X-Cache"], "HIT")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["total_products"], 1)
+
+		response = self.client.get(reverse("reports-summary", args=["v1"]), query_params={"period": "last-week"})
+		self.assertEqual(response["X-Cache"], "MISS")
+		response = self.client.get(reverse("reports-summary", args=["v1"]), query_params={"period": "last-month"})
+		self.assertEqual(response["X-Cache"], "MISS")
+		response = self.client.get(reverse("reports-summary", args=["v1"]), query_params={"period": "last-week"})
+		self.assertEqual(response["X-Cache"], "HIT")
+
+		self.assertEqual(get_cache_stats(), {"hits": 2, "misses": 3})
+
+	def test_failed_responses_arent_cached(self):
+		for _ in range(2):
+			response = self.client.get(reverse("reports", args=["v1"]), query_params={"period": "yesterday"})
+			self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertEqual(response["X-Cache"], "MISS")
+
+	def test_tenant_writes_invalidate_cache(self):
+		self.get_stats()
+		Inventory.objects.create(owner=self.test_user, product_name="Tape", price=4000, stock_level=60, date_added="2025-02-19")
+		response = self.get_stats()
+		self.assertEqual(response["X-Cache"], "MISS")
+		self.assertEqual(response.data["data"]["total_products"], 2)
+
+		self.client.get(reverse("orders-stats", args=["v1"]))
+		order = Order(product_owner_id=self.test_user, client_name="bob", client_email="bob@gmail.com", status="Delivered", order_date="2025-03-14")
+		order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=5, price=6000), OrderedProduct(name="Tape", quantity=2, price=4000)]
+		order.save()
+		response = self.client.get(reverse("orders-stats", args=["v1"]))
+		self.assertEqual(response["X-Cache"], "MISS")
+		self.assertEqual(response.data["data"]["total_orders"], 1)
+
+		self.client.get(reverse("reports", args=["v1"]))
+		order.ordered_products.get(name="Tape").delete()
+		response = self.client.get(reverse("reports", args=["v1"]))
+		self.assertEqual(response["X-Cache"], "MISS")
+		self.assertEqual(response.data["data"]["total_revenue"], 30000)
+
+		self.client.get(reverse("dashboard-data", args=["v1"]))
+		self.test_user.business_name = "Renamed llc"
+		self.test_user.save()
+		response = self.client.get(reverse("dashboard-data", args=["v1"]))
+		self.assertEqual(response["X-Cache"], "MISS")
+		self.assertEqual(response.data["data"]["business_name"], "Renamed llc")
+
+	def test_other_tenant_writes_dont_invalidate_cache(self):
+		self.get_stats()
+		Inventory.objects.create(owner=self.other_user, product_name="Tape", price=4000, stock_level=60, date_added="2025-02-19")
+		self.assertEqual(self.get_stats()["X-Cache"], "HIT")
+
+		invalidate_all_tenants()
+		self.assertEqual(self.get_stats()["X-Cache"], "MISS")
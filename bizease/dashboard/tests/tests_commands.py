@@ -0,0 +1,95 @@
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from accounts.models import CustomUser
+from inventory.models import Inventory
+from orders.models import Order, OrderedProduct
+from reports.models import DailySales
+from bizease.fulltext import full_text_search, fulltext_available
+from dashboard.management.commands.check_query_plans import explain, full_text_match_per_row
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from unittest import skipUnless
+from io import StringIO
+import tempfile
+import json
+import os
+
+
+class BenchmarkCommandsTest(TestCase):
+	@classmethod
+	def setUpTestData(cls):
+		call_command(
+			"generate_tenants", tenants=2, products=20, orders=15, lines_per_order=2, days=30, seed=1, stdout=StringIO()
+		)
+
+	def setUp(self):
+		self.tmp_dir = tempfile.TemporaryDirectory()
+		self.addCleanup(self.tmp_dir.cleanup)
+
+	def test_generate_tenants(self):
+		users = CustomUser.objects.filter(email__in=["tenant1@bizease.test", "tenant2@bizease.test"])
+		self.assertEqual(users.count(), 2)
+		for user in users:
+			self.assertTrue(user.check_password("benchmark-password"))
+			self.assertEqual(Inventory.objects.filter(owner=user).count(), 20)
+			self.assertEqual(Order.objects.filter(product_owner_id=user).count(), 15)
+			self.assertEqual(OrderedProduct.objects.filter(order_id__product_owner_id=user).count(), 30)
+		self.assertTrue(DailySales.objects.exists())
+
+		# numbering continues after existing tenants
+		call_command("generate_tenants", products=1, orders=1, stdout=StringIO())
+		self.assertTrue(CustomUser.objects.filter(email="tenant3@bizease.test").exists())
+
+	def test_run_benchmarks(self):
+		output_path = os.path.join(self.tmp_dir.name, "baseline.json")
+		call_command("run_benchmarks", iterations=2, warmup=0, output=output_path, stdout=StringIO())
+		with open(output_path) as output_file:
+			report = json.load(output_file)
+
+		self.assertEqual(report["iterations"], 2)
+		self.assertIn("inventory-cursor", report["results"])
+		for result in report["results"].values():
+			self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+			self.assertGreater(result["queries"], 0)
+
+		call_command("run_benchmarks", iterations=2, warmup=0, only=["orders"], compare=output_path, threshold=1000000, stdout=StringIO())
+
+		# a baseline that ran fewer queries is reported as a regression
+		report["results"]["orders"]["queries"] = 0
+		with open(output_path, "w") as output_file:
+			json.dump(report, output_file)
+		with self.assertRaisesRegex(CommandError, "orders: .* queries"):
+			call_command("run_benchmarks", iterations=2, warmup=0, only=["orders"], compare=output_path, threshold=1000000, stdout=StringIO())
+
+	def test_run_benchmarks_unknown_user(self):
+		with self.assertRaises(CommandError):
+			call_command("run_benchmarks", email="nobody@bizease.test", iterations=1, stdout=StringIO())
+
+	def test_check_query_plans(self):
+		output = StringIO()
+		call_command("check_query_plans", email="tenant1@bizease.test", stdout=output)
+		self.assertIn("Every query uses an index", output.getvalue())
+
+	@skipUnless(connection.vendor == "sqlite" and fulltext_available("default"), "checks the plans of the SQLite full text index")
+	def test_full_text_search_runs_from_the_index(self):
+		user = CustomUser.objects.get(email="tenant1@bizease.test")
+		searches = [
+			full_text_search(Inventory.objects.filter(owner=user), "product 1", Inventory.search_fields, "owner", user.id, weights=[10, 1]),
+			full_text_search(Order.objects.filter(product_owner_id=user), "client 1", Order.search_fields, "product_owner_id", user.id),
+		]
+		for queryset in searches:
+			with CaptureQueriesContext(connection) as queries:
+				self.assertGreater(queryset.count(), 0)
+				list(queryset[:20])
+			for query in queries.captured_queries:
+				plan = explain(query["sql"])
+				# the fts table is searched once, first, and the rows are looked up by the rowids it matched
+				self.assertRegex(plan[0], r"SCAN \w+_fts VIRTUAL TABLE INDEX \d+:M")
+				self.assertFalse(full_text_match_per_row(plan), plan)
+
+		# the plan the search had when the fts table was joined on its rowid alone
+		self.assertTrue(full_text_match_per_row([
+			"SEARCH inventory_inventory USING COVERING INDEX inventory_inventory_owner_id_02462b7b (owner_id=?)",
+			"SCAN inventory_inventory_fts VIRTUAL TABLE INDEX 0:=M5",
+		]))
@@ -0,0 +1,55 @@
+from rest_framework.test import APITransactionTestCase
+from accounts.models import CustomUser
+from bizease.concurrency import run_queries
+from bizease.synthetic_data import seed_tenant
+from accounts.authentication import VersionedRefreshToken
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+import random
+import threading
+
+
+# Queries run on other threads use their own connections, which only see committed data, hence the transaction test case
+@override_settings(TENANT_CACHE_TIMEOUT=0)
+class ConcurrentQueriesTest(APITransactionTestCase):
+	def setUp(self):
+		self.test_user = CustomUser.objects.create(business_name="Big Shop", full_name="Big Shop", email="bigshop@gmail.com", password="12345678", is_active=True)
+		seed_tenant(self.test_user, product_count=40, order_count=60, lines_per_order=3, days=90, rng=random.Random(1))
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(VersionedRefreshToken.for_user(self.test_user).access_token))
+
+	def test_run_queries_uses_the_thread_pool(self):
+		queries = {name: threading.get_ident for name in ["a", "b", "c"]}
+		with override_settings(QUERY_EXECUTION_MODE="sequential"):
+			self.assertEqual(set(run_queries(queries).values()), {threading.get_ident()})
+		with override_settings(QUERY_EXECUTION_MODE="threaded"):
+			self.assertNotIn(threading.get_ident(), run_queries(queries).values())
+
+	def test_run_queries_reraises_errors(self):
+		def failing_query():
+			raise ValueError("query failed")
+
+		with override_settings(QUERY_EXECUTION_MODE="threaded"):
+			with self.assertRaisesMessage(ValueError, "query failed"):
+				run_queries({"count": lambda: 1, "failing": failing_query})
+		with override_settings(QUERY_EXECUTION_MODE="parallel"):
+			self.assertRaises(ImproperlyConfigured, run_queries, {"count": lambda: 1})
+
+	def test_threaded_responses_match_sequential_responses(self):
+		today = timezone.now().date()
+		requests = [
+			("dashboard-data", {}), ("dashboard-data", {"period": "all-time"}), ("dashboard-data", {"period": today.isoformat()}),
+			("dashboard-data", {"start_date": "2025-01-01", "end_date": today.isoformat()}),
+			("reports", {}), ("reports", {"period": "last-month"}), ("reports", {"period": "last-year", "granularity": "auto"}),
+			("reports", {"start_date": "2025-01-01", "end_date": today.isoformat()}),
+		]
+		for url_name, params in requests:
+			with override_settings(QUERY_EXECUTION_MODE="sequential"):
+				sequential_response = self.client.get(reverse(url_name, args=["v1"]), query_params=params)
+			with override_settings(QUERY_EXECUTION_MODE="threaded"):
+				threaded_response = self.client.get(reverse(url_name, args=["v1"]), query_params=params)
+			self.assertEqual(sequential_response.status_code, status.HTTP_200_OK)
+			self.assertEqual(threaded_response.status_code, status.HTTP_200_OK)
+			self.assertEqual(threaded_response.content, sequential_response.content, f"{url_name} {params}")
@@ -0,0 +1,36 @@
+from rest_framework.test import APITestCase
+from accounts.models import CustomUser
+from bizease.synthetic_data import seed_tenant
+from bizease.testing import QueryBudgetMixin
+from accounts.authentication import VersionedRefreshToken
+from django.urls import reverse
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+import random
+
+
+@override_settings(TENANT_CACHE_TIMEOUT=0) # budgets are for computing the responses, not reading them from the cache
+class DashboardQueryBudgetTest(QueryBudgetMixin, APITestCase):
+	""" Endpoints must run a fixed number of queries regardless of how much data a user has """
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.test_user = CustomUser.objects.create(business_name="Big Shop", full_name="Big Shop", email="bigshop@gmail.com", password="12345678", is_active=True)
+		other_user = CustomUser.objects.create(business_name="Other Shop", full_name="Other Shop", email="othershop@gmail.com", password="12345678", is_active=True)
+		seed_tenant(cls.test_user, product_count=300, order_count=300, lines_per_order=4, days=60, rng=random.Random(1))
+		seed_tenant(other_user, product_count=100, order_count=50, rng=random.Random(2))
+
+	def setUp(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(VersionedRefreshToken.for_user(self.test_user).access_token))
+
+	def test_dashboard_query_budget(self):
+		# user lookup + revenue of both ranges + top product + pending orders (with their ordered products) + low stock items
+		budgets = [
+			({}, 6), ({"period": "all-time"}, 6), ({"period": timezone.now().date().isoformat()}, 6),
+			({"start_date": "2025-01-01", "end_date": timezone.now().date().isoformat()}, 6)
+		]
+		for params, budget in budgets:
+			with self.assertMaxQueries(budget):
+				response = self.client.get(reverse("dashboard-data", args=["v1"]), query_params=params)
+			self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -1,199 +1,120 @@
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from orders.models import Order, OrderedProduct
+from orders.models import Order
 from inventory.models import Inventory
+from reports.models import DailySales, DailyProductSales
 from rest_framework import status
-from django.db.models import Sum, F
+from django.db.models import Sum, Q
 from orders.serializers import OrderSerializer
 from inventory.serializers import InventoryItemSerializer
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import JSONParser
+from bizease.tenant_cache import cache_tenant_response
+from bizease.concurrency import run_queries
 from datetime import timedelta, datetime
 
 
+def get_dashboard_range(request):
+    """
+    The date range of the dashboard data: start_date to end_date, a single day (period=YYYY-MM-DD), all time
+    (period=all-time, start_date and end_date are None) or the last 30 days by default. Ranges also get the range of
+    the same length right before them (prev_start_date to prev_end_date), whose revenue the revenue is compared with
+    """
+    period = request.GET.get('period')
+    start_date_str = request.GET.get('start_date')
+    end_date_str = request.GET.get('end_date')
+
+    if start_date_str or end_date_str:
+        if period:
+            return {"error": "Invalid GET parameters. Only period or a combination of start_date and end_date is allowed"}
+        if not (start_date_str and end_date_str) or len(request.GET.getlist('start_date')) != 1 or len(request.GET.getlist('end_date')) != 1:
+            return {"error": "start_date and end_date must both be given once"}
+        try:
+            start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+            end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+        except ValueError:
+            return {"error": "Invalid date format. Use YYYY-MM-DD"}
+        if start_date > end_date:
+            return {"error": "start_date can't be later than end_date"}
+    elif period and (len(request.GET.getlist('period')) == 1) and period == "all-time":
+        return {"start_date": None, "end_date": None}
+    else:
+        try:
+            start_date = end_date = datetime.strptime(period, "%Y-%m-%d").date()
+        except (ValueError, TypeError): # get last 30 days dashboard data
+            end_date = datetime.now().date()
+            start_date = end_date - timedelta(days=30)
+
+    days_num = (end_date - start_date).days + 1
+    return {
+        "start_date": start_date, "end_date": end_date,
+        "prev_start_date": start_date - timedelta(days=days_num), "prev_end_date": start_date - timedelta(days=1)
+    }
+
+
 class DashBoardView(APIView):
     parser_classes = [JSONParser]
     permission_classes = [IsAuthenticated]
 
+    @cache_tenant_response
     def get(self, request, **kwargs):
+        range_dict = get_dashboard_range(request)
+        if range_dict.get("error"):
+            return Response({"detail": range_dict["error"]}, status=status.HTTP_400_BAD_REQUEST)
+        start_date = range_dict["start_date"]
+        end_date = range_dict["end_date"]
+
         dashboard_data = {}
         dashboard_data["business_name"] = request.user.business_name
         dashboard_data["currency"] = request.user.currency
         dashboard_data["language"] = request.user.language
 
-        period = request.GET.get('period')
-
-        try:
-            period_date = datetime.strptime(period, "%Y-%m-%d").date()
-        except (ValueError, TypeError):
-            # "Invalid date format. Use YYYY-MM-DD"
-            period_date = None
-
-        if period_date:
-            prev_date = period_date - timedelta(days=1)
-
-            products_orders = (
-                OrderedProduct.objects
-                .filter(order_id__product_owner_id=request.user.id)
-                .filter(order_id__order_date=(period_date))
-                .filter(order_id__status="Delivered")
-                .values("name").annotate(total_units_sold=Sum("quantity"))
-                .order_by("-total_units_sold")
-            )
-
-            # top selling product - ordered product with the max sum of quantity
-            if len(products_orders) == 0:
-                dashboard_data["top_selling_product"] = None
-            else:
-                dashboard_data["top_selling_product"] = products_orders[0]['name']
-
-            prev_revenue = (
-                Order.objects
-                .filter(product_owner_id=request.user.id)
-                .filter(order_date=(prev_date))
-                .filter(status="Delivered")
-                .aggregate(Sum("total_price"))['total_price__sum']
-            )
-
-            # revenue - sum of total_price in orders
-            dashboard_data["revenue"] = (
-                Order.objects
-                .filter(product_owner_id=request.user.id)
-                .filter(order_date=(period_date))
-                .filter(status="Delivered")
-                .aggregate(Sum("total_price"))['total_price__sum']
-            )
-
-            if (dashboard_data["revenue"] is None):
-                dashboard_data["revenue"] = 0
-            if prev_revenue is None:
-                prev_revenue = 0
-
-            change = dashboard_data["revenue"] - prev_revenue
-            if prev_revenue == 0:
-                change_percentage = None
-            else:
-                change_percentage = round((change/prev_revenue) * 100, 2)
-
-            dashboard_data["revenue_change"] = change_percentage
-
-            orders_serializer = OrderSerializer(
-                list(
-                    Order.objects
-                    .filter(product_owner_id=request.user.id)
-                    .filter(order_date=(period_date))
-                    .filter(status="Pending")
-                    .order_by("-order_date")[:6]
-                ),
-                many=True
-            )
-            inventory_serializer = InventoryItemSerializer(
-                list(Inventory.objects.filter(owner=request.user.id).filter(stock_level__lte=F("low_stock_threshold")).order_by("-last_updated")[:6]),
-                many=True
-            )
-            dashboard_data["pending_orders"] = orders_serializer.data
-            dashboard_data["low_stock_items"] = inventory_serializer.data
-            return Response({"data": dashboard_data}, status=status.HTTP_200_OK)
-
-        elif period and (len(request.GET.getlist('period')) == 1) and period == "all-time":
-
-            products_orders = (
-                OrderedProduct.objects
-                .filter(order_id__product_owner_id=request.user.id)
-                .filter(order_id__status="Delivered").values("name")
-                .annotate(total_units_sold=Sum("quantity")).order_by("-total_units_sold")
-            )
-
-            # top selling product - ordered product with the max sum of quantity
-            if len(products_orders) == 0:
-                dashboard_data["top_selling_product"] = None
-            else:
-                dashboard_data["top_selling_product"] = products_orders[0]['name']
-
-            # revenue - sum of total_price in orders
-            dashboard_data["revenue"] = (
-                Order.objects.filter(product_owner_id=request.user.id).filter(status="Delivered").aggregate(Sum("total_price"))['total_price__sum']
+        sales = DailySales.objects.filter(owner=request.user.id)
+        product_sales = DailyProductSales.objects.filter(owner=request.user.id)
+        pending_orders = Order.objects.filter(product_owner_id=request.user.id).filter(status="Pending")
+        if start_date is None:
+            revenue_totals = lambda: sales.aggregate(current_revenue=Sum("revenue"))
+        else:
+            # current and previous revenue are summed in one pass over both ranges
+            revenue_totals = lambda: (
+                sales.filter(date__range=(range_dict["prev_start_date"], end_date))
+                .aggregate(
+                    current_revenue=Sum("revenue", filter=Q(date__gte=start_date)),
+                    prev_revenue=Sum("revenue", filter=Q(date__lte=range_dict["prev_end_date"]))
+                )
             )
+            product_sales = product_sales.filter(date__range=(start_date, end_date))
+            pending_orders = pending_orders.filter(order_date__range=(start_date, end_date))
+
+        # the queries don't depend on each other so they can run concurrently, see bizease/concurrency.py
+        results = run_queries({
+            "totals": revenue_totals,
+            # top selling product - ordered product with the max sum of quantity. Only that row is fetched
+            "top_selling_product": (
+                product_sales.values("product_name").annotate(total_units_sold=Sum("units_sold"))
+                .order_by("-total_units_sold", "product_name").values_list("product_name", flat=True).first
+            ),
+            "pending_orders": lambda: list(pending_orders.prefetch_related("ordered_products").order_by("-order_date")[:6]),
+            "low_stock_items": lambda: list(Inventory.objects.filter(owner=request.user.id).filter(is_low_stock=True).order_by("-last_updated")[:6]),
+        })
+        dashboard_data["top_selling_product"] = results["top_selling_product"]
+
+        # revenue - sum of total_price in delivered orders
+        totals = results["totals"]
+        if start_date is None:
+            # all time revenue has nothing to be compared with and is null when nothing has been delivered
+            dashboard_data["revenue"] = totals["current_revenue"]
             dashboard_data["revenue_change"] = None
-
-            orders_serializer = OrderSerializer(
-                list(Order.objects.filter(product_owner_id=request.user.id).filter(status="Pending").order_by("-order_date")[:6]),
-                many=True
-            )
-            inventory_serializer = InventoryItemSerializer(
-                list(Inventory.objects.filter(owner=request.user.id).filter(stock_level__lte=F("low_stock_threshold")).order_by("-last_updated")[:6]),
-                many=True
-            )
-            dashboard_data["pending_orders"] = orders_serializer.data
-            dashboard_data["low_stock_items"] = inventory_serializer.data
-            return Response({"data": dashboard_data}, status=status.HTTP_200_OK)
-
-        else: # get last 30 days dashboard data
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=30)
-
-            prev_start_date = start_date - timedelta(days=31)
-            prev_end_date = start_date - timedelta(days=1)
-
-            products_orders = (
-                OrderedProduct.objects
-                .filter(order_id__product_owner_id=request.user.id)
-                .filter(order_id__order_date__range=(start_date, end_date))
-                .filter(order_id__status="Delivered")
-                .values("name").annotate(total_units_sold=Sum("quantity"))
-                .order_by("-total_units_sold")
-            )
-
-            # top selling product - ordered product with the max sum of quantity
-            if len(products_orders) == 0:
-                dashboard_data["top_selling_product"] = None
-            else:
-                dashboard_data["top_selling_product"] = products_orders[0]['name']
-
-            prev_revenue = (
-                Order.objects
-                .filter(product_owner_id=request.user.id)
-                .filter(order_date__range=(prev_start_date, prev_end_date))
-                .filter(status="Delivered")
-                .aggregate(Sum("total_price"))['total_price__sum']
-            )
-
-            # revenue - sum of total_price in orders
-            dashboard_data["revenue"] = (
-                Order.objects
-                .filter(product_owner_id=request.user.id)
-                .filter(order_date__range=(start_date, end_date))
-                .filter(status="Delivered")
-                .aggregate(Sum("total_price"))['total_price__sum']
-            )
-
-            if (dashboard_data["revenue"] is None):
-                dashboard_data["revenue"] = 0
-            if prev_revenue is None:
-                prev_revenue = 0
-
-            change = dashboard_data["revenue"] - prev_revenue
+        else:
+            dashboard_data["revenue"] = totals["current_revenue"] or 0
+            prev_revenue = totals["prev_revenue"] or 0
             if prev_revenue == 0:
-                change_percentage = None
+                dashboard_data["revenue_change"] = None
             else:
-                change_percentage = round((change/prev_revenue) * 100, 2)
+                dashboard_data["revenue_change"] = round(((dashboard_data["revenue"] - prev_revenue)/prev_revenue) * 100, 2)
 
-            dashboard_data["revenue_change"] = change_percentage
-
-            orders_serializer = OrderSerializer(
-                list(
-                    Order.objects
-                    .filter(product_owner_id=request.user.id)
-                    .filter(order_date__range=(start_date, end_date))
-                    .filter(status="Pending")
-                    .order_by("-order_date")[:6]
-                ),
-                many=True
-            )
-            inventory_serializer = InventoryItemSerializer(
-                list(Inventory.objects.filter(owner=request.user.id).filter(stock_level__lte=F("low_stock_threshold")).order_by("-last_updated")[:6]),
-                many=True
-            )
-            dashboard_data["pending_orders"] = orders_serializer.data
-            dashboard_data["low_stock_items"] = inventory_serializer.data
-            return Response({"data": dashboard_data}, status=status.HTTP_200_OK)
+        orders_serializer = OrderSerializer(results["pending_orders"], many=True)
+        inventory_serializer = InventoryItemSerializer(results["low_stock_items"], many=True)
+        dashboard_data["pending_orders"] = orders_serializer.data
+        dashboard_data["low_stock_items"] = inventory_serializer.data
+        return Response({"data": dashboard_data}, status=status.HTTP_200_OK)
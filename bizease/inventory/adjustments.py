@@ -0,0 +1,73 @@
+from django.db import models, transaction
+from django.db.models import Q, Case, When, Value
+from django.utils import timezone
+from bizease.imports import IMPORT_BATCH_SIZE
+from bizease.tenant_cache import invalidate_tenant
+from reports.rollups import update_tenant_stats
+from .models import Inventory
+from .serializers import STOCK_LEVEL_MAX
+
+
+def adjust_stock_levels(owner_id, adjustments):
+	"""
+	Applies validated StockAdjustmentSerializer entries to a user's inventory items in one transaction. The items are
+	read and locked first, so the new stock levels are computed from values nobody else can change before the
+	'UPDATE ... SET stock_level = CASE ...' that writes them. Both are done IMPORT_BATCH_SIZE ids or names at a time to
+	stay within the db's limit on query parameters. Nothing is written if any entry is invalid. Returns (items, errors):
+	the id, product_name and new stock_level of every adjusted item in the order of the entries, or the rejected
+	entries (1-based) and their errors
+	"""
+	ids = [adjustment["id"] for adjustment in adjustments if "id" in adjustment]
+	names = [adjustment["product_name"] for adjustment in adjustments if "product_name" in adjustment]
+
+	lookups = [Q(pk__in=ids[start:start + IMPORT_BATCH_SIZE]) for start in range(0, len(ids), IMPORT_BATCH_SIZE)]
+	lookups += [Q(product_name__in=names[start:start + IMPORT_BATCH_SIZE]) for start in range(0, len(names), IMPORT_BATCH_SIZE)]
+
+	with transaction.atomic():
+		items_by_id = {}
+		for lookup in lookups:
+			items_by_id.update(
+				(item["id"], item) for item in
+				Inventory.objects.select_for_update().filter(lookup, owner=owner_id)
+				.order_by("id").values("id", "product_name", "stock_level", "low_stock_threshold", "price")
+			)
+		items_by_name = {item["product_name"]: item for item in items_by_id.values()}
+
+		errors, new_levels, results = [], {}, []
+		for number, adjustment in enumerate(adjustments, start=1):
+			key = "id" if "id" in adjustment else "product_name"
+			item = (items_by_id if key == "id" else items_by_name).get(adjustment[key])
+			if item is None:
+				errors.append({"row": number, "errors": {key: ["Item not found"]}})
+				continue
+			if item["id"] in new_levels:
+				errors.append({"row": number, "errors": {key: ["The item is adjusted more than once"]}})
+				continue
+			new_level = adjustment["stock_level"] if "stock_level" in adjustment else item["stock_level"] + adjustment["delta"]
+			if new_level < 0:
+				errors.append({"row": number, "errors": {"delta": [f"Not enough stock. Only {item['stock_level']} left"]}})
+				continue
+			if new_level > STOCK_LEVEL_MAX:
+				errors.append({"row": number, "errors": {"delta": [f"The stock level can't be more than {STOCK_LEVEL_MAX}"]}})
+				continue
+			new_levels[item["id"]] = new_level
+			results.append({"id": item["id"], "product_name": item["product_name"], "stock_level": new_level})
+		if errors or not new_levels:
+			return (None, errors) if errors else ([], [])
+
+		now = timezone.now()
+		changes = list(new_levels.items())
+		for start in range(0, len(changes), IMPORT_BATCH_SIZE):
+			batch = changes[start:start + IMPORT_BATCH_SIZE]
+			Inventory.objects.filter(owner=owner_id, pk__in=[item_id for item_id, _ in batch]).update(
+				stock_level=Case(*[When(pk=item_id, then=Value(level)) for item_id, level in batch], output_field=models.IntegerField()),
+				last_updated=now
+			)
+		stats = {"total_stock_value": 0, "low_stock_count": 0}
+		for item_id, level in new_levels.items():
+			item = items_by_id[item_id]
+			stats["total_stock_value"] += (level - item["stock_level"]) * item["price"]
+			stats["low_stock_count"] += int(level <= item["low_stock_threshold"]) - int(item["stock_level"] <= item["low_stock_threshold"])
+		update_tenant_stats(owner_id, **stats)
+		invalidate_tenant(owner_id) # queryset.update() doesn't send the signals that invalidate the cached responses
+	return results, []
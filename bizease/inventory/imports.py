@@ -0,0 +1,97 @@
+from django.db import transaction
+from django.utils import timezone
+from bizease.imports import IMPORT_BATCH_SIZE
+from bizease.tenant_cache import invalidate_tenant
+from reports.rollups import update_tenant_stats
+from .models import Inventory
+from .serializers import InventoryImportSerializer
+
+DUPLICATE_PRODUCT_ERROR = "Multiple inventory items with the same 'product_name' are not allowed"
+PRICE_ERROR = "An inventory item's price must be greater than zero"
+
+
+def validate_row(row, partial):
+	""" Returns (validated data, errors) of one imported row, with the same normalization as InventoryItemSerializer.save """
+	if not isinstance(row, dict):
+		return None, {"non_field_errors": ["Expected an object"]}
+	serializer = InventoryImportSerializer(data=dict(row), partial=partial)
+	if not serializer.is_valid():
+		return None, serializer.errors
+	data = dict(serializer.validated_data)
+	if data.get("field_errors"):
+		return None, data["field_errors"]
+	if "price" in data and data["price"] <= 0:
+		return None, {"price": [PRICE_ERROR]}
+	if partial and not data.get("product_name"):
+		return None, {"product_name": ["This field is required."]}
+	data["product_name"] = data["product_name"].title()
+	if data.get("category"):
+		data["category"] = data["category"].title()
+	return data, None
+
+
+def import_inventory_items(owner, rows, upsert=False):
+	"""
+	Creates the inventory items of rows in bulk. With upsert, rows whose product_name already exists update that
+	item (only the given fields) instead of being reported as duplicates. Rows are validated in memory, the existing
+	names are looked up and the items written in batches of IMPORT_BATCH_SIZE, and the tenant stats are updated once.
+	Returns (number created, number updated, errors) where errors lists the rejected rows (1-based) and their errors
+	"""
+	errors = []
+	valid_rows = {} # product_name -> (row number, data)
+	for number, row in enumerate(rows, start=1):
+		# with upsert, fields only required for new items are checked once it's known which rows are new
+		data, row_errors = validate_row(row, partial=upsert)
+		if data and data["product_name"] in valid_rows:
+			row_errors = {"product_name": ["Duplicate 'product_name' in the imported rows"]}
+		if row_errors:
+			errors.append({"row": number, "errors": row_errors})
+		else:
+			valid_rows[data["product_name"]] = (number, data)
+
+	with transaction.atomic():
+		names = list(valid_rows)
+		existing = {}
+		for start in range(0, len(names), IMPORT_BATCH_SIZE): # keeps the IN list under the database's parameter limit
+			existing.update(
+				(item.product_name, item) for item in
+				Inventory.objects.select_for_update().filter(owner=owner, product_name__in=names[start:start + IMPORT_BATCH_SIZE])
+			)
+		to_create, to_update, updated_fields = [], [], {"last_updated"}
+		stats = {"total_products": 0, "total_stock_value": 0, "low_stock_count": 0}
+		now = timezone.now()
+		for name, (number, data) in valid_rows.items():
+			item = existing.get(name)
+			if item is None:
+				if upsert:
+					data, row_errors = validate_row(rows[number - 1], partial=False)
+					if row_errors:
+						errors.append({"row": number, "errors": row_errors})
+						continue
+				item = Inventory(owner=owner, **data)
+				to_create.append(item)
+				prev_state = (0, False)
+				stats["total_products"] += 1
+			elif upsert:
+				prev_state = item.get_stats_state()
+				for field, value in data.items():
+					setattr(item, field, value)
+				item.last_updated = now # bulk_update doesn't apply auto_now
+				updated_fields.update(data)
+				to_update.append(item)
+			else:
+				errors.append({"row": number, "errors": {"product_name": [DUPLICATE_PRODUCT_ERROR]}})
+				continue
+			curr_state = item.get_stats_state()
+			stats["total_stock_value"] += curr_state[0] - prev_state[0]
+			stats["low_stock_count"] += int(curr_state[1]) - int(prev_state[1])
+
+		Inventory.objects.bulk_create(to_create, batch_size=IMPORT_BATCH_SIZE)
+		if to_update:
+			Inventory.objects.bulk_update(to_update, sorted(updated_fields), batch_size=IMPORT_BATCH_SIZE)
+		if to_create or to_update:
+			update_tenant_stats(owner.id, **stats)
+			invalidate_tenant(owner.id) # bulk writes don't send the signals that invalidate the cached responses
+
+	errors.sort(key=lambda error: error["row"])
+	return len(to_create), len(to_update), errors
@@ -0,0 +1,23 @@
+from django.db import migrations
+from bizease.fulltext import create_search_index, drop_search_index
+
+SEARCH_FIELDS = ["product_name", "description"]
+
+
+def create_index(apps, schema_editor):
+    create_search_index(schema_editor, apps.get_model("inventory", "Inventory"), SEARCH_FIELDS, "owner", "inventory_search_idx")
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor, apps.get_model("inventory", "Inventory"), SEARCH_FIELDS, "owner", "inventory_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_alter_inventory_date_added'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:17
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_inventory_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['owner', '-last_updated'], name='inventory_owner_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['owner', 'price'], name='inventory_owner_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(models.F('owner'), django.db.models.functions.text.Lower('category'), name='inventory_owner_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['owner', 'date_added'], name='inventory_owner_added_idx'),
+        ),
+    ]
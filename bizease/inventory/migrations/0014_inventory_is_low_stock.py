@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:19
+
+from django.conf import settings
+from django.db import migrations, models
+from bizease.fulltext import create_search_index, drop_search_index
+
+SEARCH_FIELDS = ["product_name", "description"]
+
+
+# sqlite can't add a stored generated column, so the table is rebuilt and that drops the search index triggers.
+# The search index is dropped before and recreated (and refilled) after the new column is added.
+def create_index(apps, schema_editor):
+    create_search_index(schema_editor, apps.get_model("inventory", "Inventory"), SEARCH_FIELDS, "owner", "inventory_search_idx")
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor, apps.get_model("inventory", "Inventory"), SEARCH_FIELDS, "owner", "inventory_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_inventory_inventory_owner_updated_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_index, create_index),
+        migrations.AddField(
+            model_name='inventory',
+            name='is_low_stock',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('stock_level__lte', models.F('low_stock_threshold'))), output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('is_low_stock', True)), fields=['owner', '-last_updated'], name='inventory_owner_low_stock_idx'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
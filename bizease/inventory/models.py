@@ -1,6 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from accounts.models import CustomUser
-from django.db.models import Q
+from django.db.models import Q, F, Case, When, Value
+from django.db.models.functions import Lower
+from django.utils import timezone
+from reports.rollups import update_tenant_stats
+from reports.models import Tombstone
 
 class Inventory(models.Model):
 	owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
@@ -12,10 +16,23 @@ class Inventory(models.Model):
 	price = models.DecimalField(default=0, max_digits=14, decimal_places=2)
 	last_updated = models.DateTimeField(auto_now=True)
 	date_added = models.DateField()
-
+	# kept up to date by the database, so it's also right after queryset.update() calls like the one in decrement_stock_levels
+	is_low_stock = models.GeneratedField(
+		expression=Q(stock_level__lte=F("low_stock_threshold")), output_field=models.BooleanField(), db_persist=True
+	)
+	search_fields = ["product_name", "description"] # full text search index columns, see bizease/fulltext.py
 
 	class Meta:
 		ordering = ["-last_updated"]
+		# every query is limited to one owner, so each index starts with it followed by a column that's sorted or filtered on
+		indexes = [
+			models.Index(fields=["owner", "-last_updated"], name="inventory_owner_updated_idx"),
+			models.Index(fields=["owner", "price"], name="inventory_owner_price_idx"),
+			models.Index(F("owner"), Lower("category"), name="inventory_owner_category_idx"), # for case-insensitive category filters
+			models.Index(fields=["owner", "date_added"], name="inventory_owner_added_idx"),
+			# a column-to-column comparison can't use an index, so low stock lookups go through this partial one instead
+			models.Index(fields=["owner", "-last_updated"], condition=Q(is_low_stock=True), name="inventory_owner_low_stock_idx"),
+		]
 		constraints = [
 			models.UniqueConstraint(fields=["owner", "product_name"], name="user_unique_product"), # More than one product should not have the same name
 			models.CheckConstraint(condition=Q(price__gt=0), name="price_greater_than_zero")
@@ -23,3 +40,85 @@ class Inventory(models.Model):
 
 	def __str__(self):
 		return f"{self.product_name} - {self.price}"
+
+	def get_stats_state(self):
+		""" (stock value, is low stock) of the item as counted in the tenant stats """
+		price = self._meta.get_field("price").to_python(self.price)
+		return (self.stock_level * price, self.stock_level <= self.low_stock_threshold)
+
+	def get_saved_stats_state(self):
+		"""
+		get_stats_state() of the row currently in the db, which is locked until the end of the transaction so the
+		stats change can't be computed from a stale instance or a value another writer is about to change
+		"""
+		saved = Inventory.objects.select_for_update().only("stock_level", "low_stock_threshold", "price").get(pk=self.pk)
+		return saved.get_stats_state()
+
+	@transaction.atomic
+	def save(self, **kwargs):
+		adding = self._state.adding
+		prev_state = (0, False) if adding else self.get_saved_stats_state()
+		super().save(**kwargs)
+		curr_state = self.get_stats_state()
+		update_tenant_stats(
+			self.owner_id, total_products=int(adding), total_stock_value=curr_state[0] - prev_state[0],
+			low_stock_count=int(curr_state[1]) - int(prev_state[1])
+		)
+
+	@transaction.atomic
+	def delete(self, **kwargs):
+		state = self.get_saved_stats_state()
+		Tombstone.objects.create(owner_id=self.owner_id, resource="inventory", object_id=self.id)
+		deleted = super().delete(**kwargs)
+		# after the delete, as a missing stats row is computed from the table
+		update_tenant_stats(self.owner_id, total_products=-1, total_stock_value=-state[0], low_stock_count=-int(state[1]))
+		return deleted
+
+
+def decrement_stock_levels(stock_changes):
+	"""
+	Subtracts quantities from the stock levels of inventory items. 'stock_changes' maps inventory item ids to the
+	quantity to subtract (negative quantities return items to stock).
+
+	Every change is applied by one conditional 'UPDATE ... SET stock_level = stock_level - n WHERE stock_level >= n'
+	so concurrent orders can neither oversell an item nor overwrite each other's changes. The items are read first
+	for the tenant stats and, where the database supports it, locked in id order so that orders touching the same
+	items can't deadlock. Returns the ids of the items that don't have enough stock. Nothing is written if there is any.
+	"""
+	if not stock_changes:
+		return []
+
+	with transaction.atomic():
+		items = list(
+			Inventory.objects.select_for_update().filter(pk__in=stock_changes).order_by("id")
+			.values_list("id", "owner_id", "stock_level", "low_stock_threshold", "price")
+		)
+
+		enough_stock = Q()
+		for item_id, quantity in stock_changes.items():
+			enough_stock |= Q(pk=item_id, stock_level__gte=quantity)
+
+		updated_count = Inventory.objects.filter(enough_stock).update(
+			stock_level=F("stock_level") - Case(
+				*[When(pk=item_id, then=Value(quantity)) for item_id, quantity in stock_changes.items()],
+				output_field=models.IntegerField()
+			),
+			last_updated=timezone.now()
+		)
+		if updated_count == len(stock_changes):
+			stats_changes = {}
+			for item_id, owner_id, stock_level, low_stock_threshold, price in items:
+				quantity = stock_changes[item_id]
+				changes = stats_changes.setdefault(owner_id, {"total_stock_value": 0, "low_stock_count": 0})
+				changes["total_stock_value"] -= quantity * price
+				changes["low_stock_count"] += int(stock_level - quantity <= low_stock_threshold) - int(stock_level <= low_stock_threshold)
+			for owner_id, changes in stats_changes.items():
+				update_tenant_stats(owner_id, **changes)
+			return []
+		transaction.set_rollback(True)
+
+	stock_levels = dict(Inventory.objects.filter(pk__in=stock_changes).values_list("id", "stock_level"))
+	return [
+		item_id for item_id, quantity in stock_changes.items()
+		if stock_levels.get(item_id) is None or stock_levels[item_id] < quantity
+	]
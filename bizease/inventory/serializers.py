@@ -1,8 +1,11 @@
+from django.db import connection
 from rest_framework import serializers
 from .models import Inventory
 
 class InventoryItemSerializer(serializers.ModelSerializer):
     price = serializers.DecimalField(default=0, max_digits=14, decimal_places=2, min_value=0)
+    # fields given an empty value (e.g. a stock level of 0) are reported as unexpected unless this is set
+    accept_empty_values = False
 
     class Meta:
         model = Inventory
@@ -18,7 +21,8 @@ class InventoryItemSerializer(serializers.ModelSerializer):
 
         for field in self.Meta.fields:
             field_value = self.initial_data.get(field)
-            if field_value and (field not in self.Meta.read_only_fields):
+            given = field in self.initial_data if self.accept_empty_values else field_value
+            if given and (field not in self.Meta.read_only_fields):
                 expected_validated_data[field] = field_value
                 del self.initial_data[field]
 
@@ -43,4 +47,36 @@ class InventoryItemSerializer(serializers.ModelSerializer):
         if self.validated_data.get("field_errors"):
             del self.validated_data["field_errors"]
 
-        return super().save()
\ No newline at end of file
+        return super().save()
+
+class InventoryImportSerializer(InventoryItemSerializer):
+    """ Validates one imported row. Rows often have 0 or empty cells, e.g. the stock level of a sold out item """
+    accept_empty_values = True
+
+# the largest value the id and stock_level columns hold, so bigger ones are rejected instead of failing in the db
+ID_MAX = connection.ops.integer_field_range("BigAutoField")[1]
+STOCK_LEVEL_MAX = connection.ops.integer_field_range(Inventory._meta.get_field("stock_level").get_internal_type())[1]
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    """ One entry of a batch stock adjustment. The item is given by id or product_name, the change as a delta or the new stock level """
+    id = serializers.IntegerField(required=False, min_value=1, max_value=ID_MAX)
+    product_name = serializers.CharField(required=False, max_length=100)
+    delta = serializers.IntegerField(required=False, min_value=-STOCK_LEVEL_MAX, max_value=STOCK_LEVEL_MAX)
+    stock_level = serializers.IntegerField(required=False, min_value=0, max_value=STOCK_LEVEL_MAX)
+
+    def to_internal_value(self, data):
+        """ Checks for unwanted fields """
+        if isinstance(data, dict):
+            unexpected = {key: ["Unexpected field"] for key in data if key not in self.fields}
+            if unexpected:
+                raise serializers.ValidationError(unexpected)
+        return super().to_internal_value(data)
+
+    def validate(self, data):
+        if ("id" in data) == ("product_name" in data):
+            raise serializers.ValidationError("Either 'id' or 'product_name' is required")
+        if ("delta" in data) == ("stock_level" in data):
+            raise serializers.ValidationError("Either 'delta' or 'stock_level' is required")
+        if data.get("product_name"):
+            data["product_name"] = data["product_name"].title() # names are stored normalized, see InventoryItemSerializer.save
+        return data
@@ -1,5 +1,5 @@
 from django.test import TransactionTestCase
-from inventory.models import Inventory
+from inventory.models import Inventory, decrement_stock_levels
 from accounts.models import CustomUser
 from django.db.utils import IntegrityError
 
@@ -33,4 +33,18 @@ class InventorModelTest(TransactionTestCase):
 		product_1.save()
 		self.assertEqual(str(product_1), "product 2 - 1500")
 
-		
\ No newline at end of file
+		
+
+	def test_decrement_stock_levels(self):
+		test_user = CustomUser.objects.create(business_name="business 1", full_name="user 1", email="user1@gmail.com", password="12345678")
+		product_1 = Inventory.objects.create(owner=test_user, product_name="product 1", stock_level=10, price=100, date_added="2025-07-20")
+		product_2 = Inventory.objects.create(owner=test_user, product_name="product 2", stock_level=3, price=100, date_added="2025-07-20")
+
+		self.assertEqual(decrement_stock_levels({product_1.id: 4, product_2.id: -2}), [])
+		self.assertEqual(Inventory.objects.get(pk=product_1.id).stock_level, 6)
+		self.assertEqual(Inventory.objects.get(pk=product_2.id).stock_level, 5)
+
+		# Nothing is written if any of the items doesn't have enough stock
+		self.assertEqual(decrement_stock_levels({product_1.id: 6, product_2.id: 6}), [product_2.id])
+		self.assertEqual(Inventory.objects.get(pk=product_1.id).stock_level, 6)
+		self.assertEqual(Inventory.objects.get(pk=product_2.id).stock_level, 5)
@@ -0,0 +1,109 @@
+from rest_framework.test import APITestCase
+from accounts.models import CustomUser
+from bizease.synthetic_data import seed_tenant
+from bizease.testing import QueryBudgetMixin
+from accounts.authentication import VersionedRefreshToken
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework import status
+from unittest.mock import patch
+from bizease.sync import make_sync_token
+from django.utils import timezone
+from datetime import timedelta
+import random
+
+
+@override_settings(TENANT_CACHE_TIMEOUT=0) # budgets are for computing the responses, not reading them from the cache
+class InventoryQueryBudgetTest(QueryBudgetMixin, APITestCase):
+	""" Endpoints must run a fixed number of queries regardless of how much data a user has """
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.test_user = CustomUser.objects.create(business_name="Big Shop", full_name="Big Shop", email="bigshop@gmail.com", password="12345678", is_active=True)
+		other_user = CustomUser.objects.create(business_name="Other Shop", full_name="Other Shop", email="othershop@gmail.com", password="12345678", is_active=True)
+		cls.products, cls.orders = seed_tenant(cls.test_user, product_count=300, order_count=150, lines_per_order=4, rng=random.Random(1))
+		seed_tenant(other_user, product_count=100, order_count=50, rng=random.Random(2))
+
+	def setUp(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(VersionedRefreshToken.for_user(self.test_user).access_token))
+
+	def test_inventory_list_query_budget(self):
+		# user lookup + (count) + page
+		budgets = [
+			({}, 2), ({"page": 3}, 3), ({"cursor": ""}, 2), ({"query": "product 1", "page": 1}, 3),
+			({"category": "Category 1"}, 2), ({"low_stock": "", "order": "price"}, 2)
+		]
+		for params, budget in budgets:
+			with self.assertMaxQueries(budget):
+				response = self.client.get(reverse("inventory", args=["v1"]), query_params=params)
+			self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+	def test_inventory_export_query_budget(self):
+		with patch("inventory.views.EXPORT_CHUNK_SIZE", 100):
+			for params in [{}, {"file_type": "ndjson", "category": "Category 1"}]:
+				# user lookup + the queryset, which the iterator reads in chunks through one cursor
+				with self.assertMaxQueries(2):
+					response = self.client.get(reverse("inventory-export", args=["v1"]), query_params=params)
+					content = b"".join(response.streaming_content)
+				self.assertEqual(response.status_code, status.HTTP_200_OK)
+				self.assertTrue(content)
+
+	def test_inventory_stats_query_budget(self):
+		# user lookup + the tenant stats row
+		with self.assertMaxQueries(2):
+			response = self.client.get(reverse("inventory-stats", args=["v1"]))
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+	def test_inventory_item_query_budget(self):
+		# writes also update the tenant stats row in the same transaction (savepoint + update + release), updates
+		# and deletes first read the stored item to know what to change
+		with self.assertMaxQueries(5):
+			response = self.client.post(
+				reverse("inventory", args=["v1"]), {"product_name": "New Product", "stock_level": 10, "price": 100, "date_added": "2025-07-20"}, format="json"
+			)
+		self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+		item_id = response.data["data"]["id"]
+
+		with self.assertMaxQueries(2):
+			response = self.client.get(reverse("inventory-item", args=["v1", item_id]))
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+		with self.assertMaxQueries(7):
+			response = self.client.put(reverse("inventory-item", args=["v1", item_id]), {"stock_level": 20}, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+		with self.assertMaxQueries(7):
+			response = self.client.delete(reverse("inventory-item", args=["v1", item_id]))
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+	def test_inventory_import_query_budget(self):
+		# user lookup, 10 batches of the existing names, 7 of inserts, 3 of updates and the tenant stats update in a savepoint
+		# transaction (the batch size is lowered below SQLite's limit on query parameters so the count is the same everywhere)
+		rows = [
+			{"product_name": f"Product {i}", "price": 100 + i, "stock_level": i % 20, "date_added": "2025-07-20"}
+			for i in range(1000)
+		]
+		with patch("inventory.imports.IMPORT_BATCH_SIZE", 100), self.assertMaxQueries(24):
+			response = self.client.post(reverse("inventory-import", args=["v1"]) + "?mode=upsert", rows, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["created"], 700)
+		self.assertEqual(response.data["data"]["updated"], 300)
+
+	def test_inventory_stock_adjustment_query_budget(self):
+		# user lookup, reading and locking the items by id then by name, the update and the tenant stats update in a savepoint
+		adjustments = [{"id": product.id, "delta": 3} for product in self.products[:150]]
+		adjustments += [{"product_name": product.product_name, "stock_level": 7} for product in self.products[150:]]
+		with self.assertMaxQueries(7):
+			response = self.client.post(reverse("inventory-stock", args=["v1"]), adjustments, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(len(response.data["data"]), 300)
+
+
+	def test_inventory_sync_query_budget(self):
+		# user lookup, the changed items and the deleted ones
+		self.products[0].delete()
+		for params in [{}, {"since": make_sync_token(timezone.now() - timedelta(days=1))}]:
+			with self.assertMaxQueries(3):
+				response = self.client.get(reverse("inventory-sync", args=["v1"]), query_params=params)
+			self.assertEqual(response.status_code, status.HTTP_200_OK)
+			self.assertEqual(len(response.data["data"]["changed"]), 299)
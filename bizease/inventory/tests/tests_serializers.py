@@ -1,6 +1,6 @@
 from django.test import TestCase
 from inventory.models import Inventory
-from inventory.serializers import InventoryItemSerializer
+from inventory.serializers import InventoryItemSerializer, InventoryImportSerializer
 from django.db.utils import IntegrityError
 from accounts.models import CustomUser
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -85,6 +85,17 @@ class InventorySerializersTest(TestCase):
 		self.assertEqual(item_serializer.validated_data["field_errors"]["id"], ["Unexpected field"])
 		self.assertEqual(item_serializer.validated_data["field_errors"]["invalid_field"], ["Unexpected field"])
 
+	def test_empty_values_are_only_accepted_in_imports(self):
+		data = {"product_name": "Rope", "stock_level": 0, "price": 1500, "date_added": "2025-07-20"}
+		item_serializer = InventoryItemSerializer(data=dict(data))
+		self.assertEqual(item_serializer.is_valid(), True)
+		self.assertEqual(item_serializer.validated_data["field_errors"], {"stock_level": ["Unexpected field"]})
+
+		import_serializer = InventoryImportSerializer(data=dict(data))
+		self.assertEqual(import_serializer.is_valid(), True)
+		self.assertNotIn("field_errors", import_serializer.validated_data)
+		self.assertEqual(import_serializer.validated_data["stock_level"], 0)
+
 	def test_invalid_monetary_data(self):
 		data = {
 			"product_name": "ENIAC", "category": "computers", 
@@ -1,12 +1,21 @@
-from inventory.models import Inventory
-from inventory.serializers import InventoryItemSerializer
+from inventory.models import Inventory, decrement_stock_levels
+from inventory.serializers import InventoryItemSerializer, STOCK_LEVEL_MAX
 from rest_framework.test import APITransactionTestCase
 from datetime import datetime
 from accounts.models import CustomUser
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.urls import reverse
 from rest_framework import status
-from datetime import date
+from datetime import date, timedelta
+from unittest.mock import patch
+from django.core.management import call_command
+from inventory.views import InventoryView
+from bizease.sync import make_sync_token
+from django.utils import timezone
+import base64
+import csv
+import io
+import json
 
 
 class InventoryViewsTest(APITransactionTestCase):
@@ -120,6 +129,19 @@ class InventoryViewsTest(APITransactionTestCase):
 		self.assertEqual(response.data["data"]["products"][0]["product_name"], "Rubbish")
 		self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+	def test_low_stock_flag_follows_stock_changes(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		self.item_2.low_stock_threshold = 100
+		self.item_2.save()
+		Inventory.objects.filter(pk=self.item_3.pk).update(stock_level=50)
+		decrement_stock_levels({self.item_6.pk: 32})
+
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"low_stock": "", "order": "price"}, format='json')
+		self.assertEqual([item["product_name"] for item in response.data["data"]["products"]], ["Biscuits", "Plastic Chair"])
+		call_command("reconcile_stats", stdout=io.StringIO()) # the stats aren't updated by queryset.update()
+		response = self.client.get(reverse("inventory-stats", args=["v1"]), format='json')
+		self.assertEqual(response.data["data"]["low_stock_count"], 2)
+
 	def test_get_inventory_items_with_credentials(self):
 		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
 		response = self.client.get(reverse("inventory", args=["v1"]))
@@ -132,6 +154,72 @@ class InventoryViewsTest(APITransactionTestCase):
 		self.assertEqual(response.data["data"]["products"][1]["product_name"], "Helmet")
 		self.assertEqual(response.data["data"]["products"][2]["product_name"], "Safety Boots")
 
+	@patch.object(InventoryView, "page_size", 4)
+	def test_get_inventory_items_with_cursor(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		Inventory.objects.create(owner=self.test_user, product_name="Hammer", price=8000, stock_level=10, date_added="2025-07-20")
+		expected_names = list(Inventory.objects.filter(owner=self.test_user).order_by("price", "id").values_list("product_name", flat=True))
+
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"order": "price", "cursor": ""})
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["prev_cursor"], None)
+		self.assertNotIn("page_count", response.data["data"])
+		first_page = [item["product_name"] for item in response.data["data"]["products"]]
+		self.assertEqual(first_page, expected_names[:4])
+
+		next_cursor = response.data["data"]["next_cursor"]
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"order": "price", "cursor": next_cursor})
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual([item["product_name"] for item in response.data["data"]["products"]], expected_names[4:])
+		self.assertEqual(response.data["data"]["next_cursor"], None)
+
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"order": "price", "cursor": response.data["data"]["prev_cursor"]})
+		self.assertEqual([item["product_name"] for item in response.data["data"]["products"]], first_page)
+		self.assertEqual(response.data["data"]["prev_cursor"], None)
+		self.assertEqual(response.data["data"]["next_cursor"], next_cursor)
+
+	@patch.object(InventoryView, "page_size", 2)
+	def test_get_inventory_items_with_cursor_default_order(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		expected_names = list(Inventory.objects.filter(owner=self.test_user).order_by("-last_updated", "-id").values_list("product_name", flat=True))
+
+		names = []
+		cursor = ""
+		while cursor is not None:
+			response = self.client.get(reverse("inventory", args=["v1"]), query_params={"cursor": cursor})
+			self.assertEqual(response.status_code, status.HTTP_200_OK)
+			names += [item["product_name"] for item in response.data["data"]["products"]]
+			cursor = response.data["data"]["next_cursor"]
+		self.assertEqual(names, expected_names)
+
+	def test_get_inventory_items_with_invalid_cursor(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"cursor": "not-a-cursor"})
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], "Invalid cursor")
+
+		with patch.object(InventoryView, "page_size", 2):
+			response = self.client.get(reverse("inventory", args=["v1"]), query_params={"order": "price", "cursor": ""})
+		# cursors are only valid for the ordering they were created with
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"order": "-id", "cursor": response.data["data"]["next_cursor"]})
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_get_inventory_items_with_malformed_cursor(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		payloads = [
+			('-id', '{"o":"-id","v":1e999,"id":1e999,"d":"next"}'),
+			('-id', '{"o":"-id","v":1,"id":NaN,"d":"next"}'),
+			('-id', '{"o":"-id","v":%d,"id":%d,"d":"next"}' % (2**63, 2**63)),
+			('price', '{"o":"price","v":"1","id":%d,"d":"next"}' % -2**64),
+			('price', '{"o":"price","v":"Infinity","id":1,"d":"next"}'),
+			('price', '{"o":"price","v":"1e999","id":1,"d":"next"}'),
+		]
+		for order, payload in payloads:
+			cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+			response = self.client.get(reverse("inventory", args=["v1"]), query_params={"order": order, "cursor": cursor})
+			self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, payload)
+			self.assertEqual(response.data["detail"], "Invalid cursor")
+
 	def test_get_inventory_items_without_credentials(self):
 		response = self.client.get(reverse("inventory", args=["v1"]))
 		self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -217,4 +305,312 @@ class InventoryViewsTest(APITransactionTestCase):
 
 	def test_delete_inventory_item_without_credentials(self):
 		response = self.client.delete(reverse("inventory-item", args=["v1", '3']))
-		self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+		self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_export_inventory_as_csv(self):
+		Inventory.objects.create(owner=self.test_user, product_name="Old Helmet", price=5000, stock_level=2, category="ppe", date_added="2024-01-10")
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("inventory-export", args=["v1"]), query_params={"category": "ppe", "order": "price"})
+
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertTrue(response.streaming)
+		self.assertEqual(response["Content-Type"], "text/csv")
+		self.assertIn("attachment;", response["Content-Disposition"])
+		rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+		self.assertEqual(list(rows[0].keys()), InventoryItemSerializer.Meta.fields)
+		self.assertEqual([row["product_name"] for row in rows], ["Old Helmet", "Helmet", "Safety Boots"])
+		self.assertEqual(rows[1]["price"], "8000.00")
+
+		response = self.client.get(reverse("inventory-export", args=["v1"]), query_params={"category": "ppe", "start_date": "2025-01-01"})
+		rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+		self.assertEqual(sorted(row["product_name"] for row in rows), ["Helmet", "Safety Boots"])
+
+	def test_export_inventory_as_ndjson(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		with patch("inventory.views.EXPORT_CHUNK_SIZE", 2):
+			response = self.client.get(reverse("inventory-export", args=["v1"]), query_params={"file_type": "ndjson", "order": "id"})
+
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response["Content-Type"], "application/x-ndjson")
+		rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+		self.assertEqual(
+			[row["product_name"] for row in rows], ["Glasses", "Plastic Chair", "Rubbish", "Safety Boots", "Helmet", "Biscuits"]
+		)
+		self.assertEqual(rows[0], InventoryItemSerializer(Inventory.objects.get(pk=rows[0]["id"])).data)
+
+	def test_export_inventory_with_invalid_params(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("inventory-export", args=["v1"]), query_params={"file_type": "xlsx"})
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], "Invalid value for file_type parameter")
+
+		response = self.client.get(reverse("inventory-export", args=["v1"]), query_params={"end_date": "20-07-2025"})
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], "Invalid date format. Use YYYY-MM-DD")
+
+	def test_export_inventory_without_credentials(self):
+		response = self.client.get(reverse("inventory-export", args=["v1"]))
+		self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_import_inventory_from_json(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		rows = [
+			{"product_name": "rice bag", "price": 30000, "stock_level": 3, "category": "food", "date_added": "2025-08-01"},
+			{"product_name": "Beans", "price": 0, "date_added": "2025-08-01"},
+			{"product_name": "glasses", "price": 500, "date_added": "2025-08-01"},
+			{"product_name": "Rice Bag", "price": 100, "date_added": "2025-08-01"},
+			{"product_name": "Yam", "price": 2000, "stock_level": 10},
+			{"product_name": "Garri", "price": 1500, "stock_level": 20, "date_added": "2025-08-01", "colour": "white"},
+			{"product_name": "Garri", "price": 1500, "stock_level": 20, "date_added": "2025-08-01"},
+		]
+		response = self.client.post(reverse("inventory-import", args=["v1"]), rows, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["created"], 2)
+		self.assertEqual(response.data["data"]["updated"], 0)
+		errors = {error["row"]: error["errors"] for error in response.data["data"]["errors"]}
+		self.assertEqual(sorted(errors), [2, 3, 4, 5, 6])
+		self.assertEqual(errors[2], {"price": ["An inventory item's price must be greater than zero"]})
+		self.assertEqual(errors[3], {"product_name": ["Multiple inventory items with the same 'product_name' are not allowed"]})
+		self.assertEqual(errors[4], {"product_name": ["Duplicate 'product_name' in the imported rows"]})
+		self.assertIn("date_added", errors[5])
+		self.assertEqual(errors[6], {"colour": ["Unexpected field"]})
+
+		rice = Inventory.objects.get(owner=self.test_user, product_name="Rice Bag")
+		self.assertEqual((rice.category, rice.stock_level, rice.price, rice.is_low_stock), ("Food", 3, 30000, True))
+		self.assertTrue(Inventory.objects.filter(owner=self.test_user, product_name="Garri").exists())
+		stats = self.client.get(reverse("inventory-stats", args=["v1"])).data["data"]
+		self.assertEqual(stats["total_products"], 8)
+		self.assertEqual(stats["low_stock_count"], 2)
+
+	def test_import_exported_csv_with_upsert(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("inventory-export", args=["v1"]), query_params={"category": "ppe"})
+		exported = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+		for row in exported:
+			row["stock_level"] = "2"
+		exported.append({"product_name": "Gloves", "price": "1500", "date_added": "2025-08-01", "description": ""})
+		upload = io.StringIO()
+		writer = csv.DictWriter(upload, fieldnames=InventoryItemSerializer.Meta.fields)
+		writer.writeheader()
+		writer.writerows(exported)
+
+		url = reverse("inventory-import", args=["v1"])
+		response = self.client.post(url, upload.getvalue().encode(), content_type="text/csv")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["created"], 1)
+		self.assertEqual(len(response.data["data"]["errors"]), 2) # the exported items already exist
+
+		response = self.client.post(url + "?mode=upsert", upload.getvalue().encode(), content_type="text/csv")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"], {"created": 0, "updated": 3, "errors": []})
+		self.item_4.refresh_from_db()
+		self.assertEqual(self.item_4.stock_level, 2)
+		self.assertTrue(self.item_4.is_low_stock)
+		self.assertGreater(self.item_4.last_updated, self.item_5.last_updated)
+		self.assertEqual(Inventory.objects.get(owner=self.test_user, product_name="Gloves").description, "")
+
+		# upserted rows only change the given fields
+		response = self.client.post(url + "?mode=upsert", [{"product_name": "helmet", "price": 9000}], format="json")
+		self.assertEqual(response.data["data"]["updated"], 1)
+		self.item_5.refresh_from_db()
+		self.assertEqual((self.item_5.price, self.item_5.stock_level), (9000, 2))
+		stats = self.client.get(reverse("inventory-stats", args=["v1"])).data["data"]
+		self.assertEqual(stats["total_products"], 7)
+		self.assertEqual(stats["low_stock_count"], 4) # Rubbish, the 2 exported items and Gloves (stock level 0)
+		self.assertEqual(
+			stats["total_stock_value"], sum(item.price * item.stock_level for item in Inventory.objects.filter(owner=self.test_user))
+		)
+
+	def test_import_inventory_with_invalid_input(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		url = reverse("inventory-import", args=["v1"])
+		response = self.client.post(url + "?mode=replace", [], format="json")
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], "Invalid value for mode parameter")
+
+		response = self.client.post(url, {"product_name": "Rice"}, format="json")
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], "Expected a JSON array or a CSV file of rows")
+
+		response = self.client.post(url, b"product_name,price\n\xff\xfe,100\n", content_type="text/csv")
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], "Invalid CSV file")
+
+		with patch("bizease.imports.IMPORT_MAX_ROWS", 2):
+			response = self.client.post(url, [{"product_name": "A"}] * 3, format="json")
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], "A request can't have more than 2 rows")
+
+		self.client.credentials()
+		response = self.client.post(url, [], format="json")
+		self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_adjust_stock_levels(self):
+		other_user = CustomUser.objects.create(business_name="Business 2", full_name="Other Man", email="other@email.com", password="12345678", is_active=True)
+		other_item = Inventory.objects.create(owner=other_user, product_name="Glasses", price=10000, stock_level=15, date_added="2025-07-20")
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		url = reverse("inventory-stock", args=["v1"])
+
+		adjustments = [
+			{"id": self.item_1.id, "delta": 10}, {"product_name": "plastic chair", "stock_level": 4}, {"id": self.item_3.id, "delta": -1}
+		]
+		response = self.client.post(url, adjustments, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"], [
+			{"id": self.item_1.id, "product_name": "Glasses", "stock_level": 25},
+			{"id": self.item_2.id, "product_name": "Plastic Chair", "stock_level": 4},
+			{"id": self.item_3.id, "product_name": "Rubbish", "stock_level": 0},
+		])
+		self.item_2.refresh_from_db()
+		self.assertEqual(self.item_2.stock_level, 4)
+		self.assertTrue(self.item_2.is_low_stock)
+		self.assertGreater(self.item_2.last_updated, self.item_4.last_updated)
+		other_item.refresh_from_db()
+		self.assertEqual(other_item.stock_level, 15)
+		stats = self.client.get(reverse("inventory-stats", args=["v1"])).data["data"]
+		self.assertEqual(stats["low_stock_count"], 2)
+		self.assertEqual(
+			stats["total_stock_value"], sum(item.price * item.stock_level for item in Inventory.objects.filter(owner=self.test_user))
+		)
+
+		# a stocktake uploaded as csv
+		response = self.client.post(url, b"product_name,stock_level\nHelmet,38\nBiscuits,30\n", content_type="text/csv")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual([item["stock_level"] for item in response.data["data"]], [38, 30])
+
+		# items read and written one batch at a time
+		with patch("inventory.adjustments.IMPORT_BATCH_SIZE", 1):
+			response = self.client.post(url, [{"id": self.item_1.id, "delta": 1}, {"product_name": "Helmet", "delta": 2}, {"id": self.item_3.id, "stock_level": 9}], format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual([item["stock_level"] for item in response.data["data"]], [26, 40, 9])
+
+	def test_adjust_stock_levels_with_invalid_entries(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		url = reverse("inventory-stock", args=["v1"])
+		response = self.client.post(url, [{"id": self.item_1.id, "delta": 1, "stock_level": 3}, {"delta": 2}, {"id": self.item_1.id, "delta": 1, "price": 5}], format="json")
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], [
+			{"row": 1, "errors": {"non_field_errors": ["Either 'delta' or 'stock_level' is required"]}},
+			{"row": 2, "errors": {"non_field_errors": ["Either 'id' or 'product_name' is required"]}},
+			{"row": 3, "errors": {"price": ["Unexpected field"]}},
+		])
+
+		other_user = CustomUser.objects.create(business_name="Business 2", full_name="Other Man", email="other@email.com", password="12345678", is_active=True)
+		other_item = Inventory.objects.create(owner=other_user, product_name="Desk", price=10000, stock_level=15, date_added="2025-07-20")
+		adjustments = [
+			{"id": self.item_1.id, "delta": 5}, {"id": self.item_3.id, "delta": -2}, {"id": other_item.id, "delta": 1},
+			{"product_name": "Glasses", "stock_level": 1}
+		]
+		response = self.client.post(url, adjustments, format="json")
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], [
+			{"row": 2, "errors": {"delta": ["Not enough stock. Only 1 left"]}},
+			{"row": 3, "errors": {"id": ["Item not found"]}},
+			{"row": 4, "errors": {"product_name": ["The item is adjusted more than once"]}},
+		])
+		self.item_1.refresh_from_db()
+		self.assertEqual(self.item_1.stock_level, 15) # nothing is applied
+
+	def test_adjust_stock_levels_with_out_of_range_values(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		url = reverse("inventory-stock", args=["v1"])
+		for adjustments in [
+			[{"id": 2**70, "delta": 1}], [{"id": 0, "delta": 1}], [{"product_name": "Glasses", "delta": 2**70}],
+			[{"product_name": "Glasses", "delta": -2**70}], [{"id": self.item_1.id, "stock_level": 2**64}],
+		]:
+			response = self.client.post(url, adjustments, format="json")
+			self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, adjustments)
+			self.assertEqual(response.data["detail"][0]["row"], 1)
+
+		# both values fit the column but their sum doesn't
+		Inventory.objects.filter(pk=self.item_1.id).update(stock_level=STOCK_LEVEL_MAX - 10)
+		response = self.client.post(url, [{"id": self.item_1.id, "delta": 11}], format="json")
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], [{"row": 1, "errors": {"delta": [f"The stock level can't be more than {STOCK_LEVEL_MAX}"]}}])
+
+	def test_sync_inventory(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		url = reverse("inventory-sync", args=["v1"])
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(len(response.data["data"]["changed"]), 6)
+		self.assertEqual(response.data["data"]["deleted"], [])
+		token = response.data["data"]["next"]
+
+		# records changed shortly before the token are sent again in case their transaction committed after the sync
+		response = self.client.get(url, query_params={"since": token})
+		self.assertEqual(len(response.data["data"]["changed"]), 6)
+
+		with patch("bizease.sync.SYNC_OVERLAP", timedelta(0)):
+			response = self.client.get(url, query_params={"since": token})
+			self.assertEqual(response.data["data"]["changed"], [])
+
+			self.client.put(reverse("inventory-item", args=["v1", self.item_2.id]), {"price": 7500}, format="json")
+			self.client.post(reverse("inventory-stock", args=["v1"]), [{"id": self.item_5.id, "delta": -4}], format="json")
+			self.client.delete(reverse("inventory-item", args=["v1", self.item_3.id]))
+			response = self.client.get(url, query_params={"since": token})
+			self.assertEqual(response.status_code, status.HTTP_200_OK)
+			changed = {item["id"]: item for item in response.data["data"]["changed"]}
+			self.assertEqual(list(changed), [self.item_2.id, self.item_5.id])
+			self.assertEqual(changed[self.item_5.id]["stock_level"], 36)
+			self.assertEqual(response.data["data"]["deleted"], [self.item_3.id])
+
+			response = self.client.get(url, query_params={"since": response.data["data"]["next"]})
+			self.assertEqual(response.data["data"]["changed"], [])
+			self.assertEqual(response.data["data"]["deleted"], [])
+
+	def test_sync_inventory_with_invalid_token(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		url = reverse("inventory-sync", args=["v1"])
+		for since in ["abc", "-5", "1.5", "9" * 30, "²", "١٢٣"]:
+			response = self.client.get(url, query_params={"since": since})
+			self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertEqual(response.data["detail"], "Invalid sync token")
+
+		response = self.client.get(url + "?since=1&since=2")
+		self.assertEqual(response.data["detail"], "Invalid sync token")
+
+		# the deletes before it may have been purged already
+		response = self.client.get(url, query_params={"since": make_sync_token(timezone.now() - timedelta(days=31))})
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], "The sync token has expired. Download the full list again")
+
+		self.client.credentials()
+		self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_search_inventory(self):
+		self.item_2.description = "Stackable chair for outdoor events"
+		self.item_2.save()
+		Inventory.objects.create(owner=self.test_user, product_name="Office Chair", description="Swivel chair", price=20000, stock_level=4, date_added="2025-07-20")
+		Inventory.objects.create(owner=self.test_user, product_name="Desk", description="Goes with the office chair", price=30000, stock_level=4, date_added="2025-07-20")
+		other_user = CustomUser.objects.create(business_name="Business 2", full_name="Other Man", email="otherMan@email.com", password="12345678", is_active=True)
+		Inventory.objects.create(owner=other_user, product_name="Chair", price=20000, stock_level=4, date_added="2025-07-20")
+
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"query": "cha"}, format='json')
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		names = [item["product_name"] for item in response.data["data"]["products"]]
+		# prefix matches, product names rank above descriptions and other users' items aren't included
+		self.assertEqual(sorted(names[:2]), ["Office Chair", "Plastic Chair"])
+		self.assertEqual(names[2], "Desk")
+
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"query": "offic CHAIR"}, format='json')
+		self.assertEqual([item["product_name"] for item in response.data["data"]["products"]], ["Office Chair", "Desk"])
+
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"query": "cha", "order": "price", "page": 1}, format='json')
+		self.assertEqual([item["product_name"] for item in response.data["data"]["products"]], ["Plastic Chair", "Office Chair", "Desk"])
+		self.assertEqual(response.data["data"]["page_count"], 1)
+
+	def test_search_index_follows_updates_and_deletes(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		self.item_5.product_name = "Hard Hat"
+		self.item_5.save()
+		Inventory.objects.filter(pk=self.item_1.pk).update(description="Safety goggles")
+		self.item_4.delete()
+
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"query": "helmet"}, format='json')
+		self.assertEqual(response.data["data"]["products"], [])
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"query": "hat"}, format='json')
+		self.assertEqual([item["product_name"] for item in response.data["data"]["products"]], ["Hard Hat"])
+		response = self.client.get(reverse("inventory", args=["v1"]), query_params={"query": "safety"}, format='json')
+		self.assertEqual([item["product_name"] for item in response.data["data"]["products"]], ["Glasses"])
@@ -4,5 +4,9 @@ from django.urls import path
 urlpatterns = [
 	path('', views.InventoryView.as_view(), name="inventory"),
 	path('stats', views.InventoryStatsView.as_view(), name="inventory-stats"),
+	path('export', views.InventoryExportView.as_view(), name="inventory-export"),
+	path('import', views.InventoryImportView.as_view(), name="inventory-import"),
+	path('sync', views.InventorySyncView.as_view(), name="inventory-sync"),
+	path('stock', views.InventoryStockView.as_view(), name="inventory-stock"),
 	path('<int:item_id>', views.InventoryItemView.as_view(), name="inventory-item"),
 ]
\ No newline at end of file
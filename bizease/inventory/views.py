@@ -1,40 +1,66 @@
 from .models import Inventory
 from rest_framework.views import APIView
-from .serializers import InventoryItemSerializer
+from .serializers import InventoryItemSerializer, StockAdjustmentSerializer
+from .imports import import_inventory_items, DUPLICATE_PRODUCT_ERROR
+from .adjustments import adjust_stock_levels
 from rest_framework.permissions import IsAuthenticated
+from accounts.authentication import ClaimsJWTAuthentication
 from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, F, Q
+from bizease.tenant_cache import cache_tenant_response
+from bizease.fulltext import full_text_search
+from bizease.exports import get_export_file_type, get_export_date_range, export_response, EXPORT_CHUNK_SIZE
+from bizease.imports import CSVParser, read_import_rows
+from bizease.sync import sync_response
+from reports.rollups import get_tenant_stats
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
 from django.db.utils import IntegrityError
+from django.utils.dateparse import parse_datetime
+from decimal import Decimal, InvalidOperation
+import base64
+import binascii
+import json
 import math
 
+# a cursor's ids and prices must fit the columns, the database can't compare them otherwise
+BIGINT_MIN, BIGINT_MAX = -2**63, 2**63 - 1
+price_field = Inventory._meta.get_field("price")
+PRICE_LIMIT = Decimal(10) ** (price_field.max_digits - price_field.decimal_places)
+
 
 class InventoryStatsView(APIView):
+	authentication_classes = [ClaimsJWTAuthentication]
 	permission_classes = [IsAuthenticated]
 	parser_classes = [JSONParser]
 	
+	@cache_tenant_response
 	def get(self, request, **kwargs):
+		stats = get_tenant_stats(request.user.id) # maintained on every inventory write, see reports.rollups
 		data = {
-			"total_stock_value": Inventory.objects.filter(owner=request.user.id).aggregate(total=Sum(F("stock_level") * F("price")))["total"],
-			"low_stock_count": Inventory.objects.filter(owner=request.user.id).filter(stock_level__lte=F("low_stock_threshold")).count(),
-			"total_products":  Inventory.objects.filter(owner=request.user.id).count(),
+			"total_stock_value": stats.total_stock_value if stats.total_products else None,
+			"low_stock_count": stats.low_stock_count,
+			"total_products": stats.total_products,
 		}
 		return Response({"data": data}, status=status.HTTP_200_OK)
 
 class InventoryView(APIView):
+	authentication_classes = [ClaimsJWTAuthentication]
 	permission_classes = [IsAuthenticated]
 	parser_classes = [JSONParser]
 	page_size = 20
 	curr_queryset = None
+	order_key = "-last_updated" # Inventory.Meta.ordering
 
 	def filter_by_query_param(self):
-		# query - searches thru product_name and description (inexact) . Can be usd as a search endpoint
+		# query - full text search thru product_name and description, best matches first. Can be usd as a search endpoint
 		query_str = self.request.GET.get('query')
 		if not query_str or len(self.request.GET.getlist('query')) != 1:
 			return self
-		self.curr_queryset = self.curr_queryset.filter(
-			Q(product_name__icontains=query_str) | Q(description__icontains=query_str)
+		self.curr_queryset = full_text_search(
+			self.curr_queryset, query_str, Inventory.search_fields, "owner", self.request.user.id, weights=[10, 1],
+			then_order_by=[self.order_key]
 		)
 		return self
 
@@ -43,7 +69,8 @@ class InventoryView(APIView):
 		if not category or len(self.request.GET.getlist('category')) != 1:
 			return self
 
-		self.curr_queryset = self.curr_queryset.filter(category__iexact=category)
+		# Same as category__iexact but written so the (owner, Lower(category)) index can be used
+		self.curr_queryset = self.curr_queryset.alias(category_lower=Lower("category")).filter(category_lower=Lower(Value(category)))
 		return self
 
 	def order_by_query(self):
@@ -54,6 +81,7 @@ class InventoryView(APIView):
 			return self
 
 		self.curr_queryset = self.curr_queryset.order_by(order_query)
+		self.order_key = order_query
 		return self
 
 	def get_page_param(self):
@@ -69,17 +97,114 @@ class InventoryView(APIView):
 		if 'low_stock' not in self.request.GET:
 			return self
 
-		self.curr_queryset = self.curr_queryset.filter(stock_level__lte=F("low_stock_threshold"))
+		self.curr_queryset = self.curr_queryset.filter(is_low_stock=True)
 		return self
 
+	def encode_cursor(self, item, direction):
+		field = self.order_key.lstrip("-")
+		value = getattr(item, field)
+		if field == "last_updated":
+			value = value.isoformat()
+		elif field == "price":
+			value = str(value)
+		payload = {"o": self.order_key, "v": value, "id": item.id, "d": direction}
+		return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+	def decode_cursor(self, cursor):
+		""" Returns (sort value, id, direction) or None if the cursor is invalid or was created for another ordering """
+		try:
+			payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+			if payload["o"] != self.order_key or payload["d"] not in ["next", "prev"]:
+				return None
+			field = self.order_key.lstrip("-")
+			value = payload["v"]
+			if field == "last_updated":
+				value = parse_datetime(value)
+			elif field == "price":
+				value = Decimal(value)
+				if not value.is_finite() or abs(value) >= PRICE_LIMIT:
+					return None
+			else:
+				value = int(value)
+				if not BIGINT_MIN <= value <= BIGINT_MAX:
+					return None
+			item_id = int(payload["id"])
+			if value is None or not BIGINT_MIN <= item_id <= BIGINT_MAX:
+				return None
+			return value, item_id, payload["d"]
+		except (ValueError, TypeError, KeyError, OverflowError, InvalidOperation, binascii.Error, UnicodeDecodeError):
+			return None
+
+	def paginate_by_cursor(self, cursor):
+		"""
+		Keyset pagination on the active sort key (plus 'id' as a tie breaker). Only page_size+1 rows are
+		fetched so the cost of a page doesn't depend on how deep into the listing it is.
+		"""
+		field = self.order_key.lstrip("-")
+		descending = self.order_key.startswith("-")
+		direction = "next"
+
+		if cursor:
+			decoded_cursor = self.decode_cursor(cursor)
+			if not decoded_cursor:
+				return None
+			value, item_id, direction = decoded_cursor
+
+			# Walking backwards means flipping the comparison and the ordering, then reversing the fetched rows
+			lookup = "lt" if descending == (direction == "next") else "gt"
+			if field == "id":
+				self.curr_queryset = self.curr_queryset.filter(**{f"id__{lookup}": item_id})
+			else:
+				self.curr_queryset = self.curr_queryset.filter(
+					Q(**{f"{field}__{lookup}": value}) | Q(**{field: value, f"id__{lookup}": item_id})
+				)
+
+		order_fields = [self.order_key] if field == "id" else [self.order_key, "-id" if descending else "id"]
+		if direction == "prev":
+			order_fields = [f[1:] if f.startswith("-") else f"-{f}" for f in order_fields]
+
+		items = list(self.curr_queryset.order_by(*order_fields)[:self.page_size+1])
+		has_more = len(items) > self.page_size
+		items = items[:self.page_size]
+		if direction == "prev":
+			items.reverse()
+
+		next_cursor = None
+		prev_cursor = None
+		if items:
+			if direction == "next":
+				next_cursor = self.encode_cursor(items[-1], "next") if has_more else None
+				prev_cursor = self.encode_cursor(items[0], "prev") if cursor else None
+			else:
+				next_cursor = self.encode_cursor(items[-1], "next")
+				prev_cursor = self.encode_cursor(items[0], "prev") if has_more else None
+		return items, next_cursor, prev_cursor
+
 	def get(self, request, **kwargs):
 		self.curr_queryset = Inventory.objects.filter(owner=request.user.id)
 		self.filter_by_query_param().filter_by_category_param().filter_low_Stock().order_by_query()
 
+		if "cursor" in request.GET:
+			if len(request.GET.getlist('cursor')) != 1:
+				return Response({"detail": "Invalid cursor", "data": None}, status=status.HTTP_400_BAD_REQUEST)
+			cursor_page = self.paginate_by_cursor(request.GET.get('cursor'))
+			if cursor_page is None:
+				return Response({"detail": "Invalid cursor", "data": None}, status=status.HTTP_400_BAD_REQUEST)
+
+			items, next_cursor, prev_cursor = cursor_page
+			inventory_serializer = InventoryItemSerializer(items, many=True)
+			data = {
+				"next_cursor": next_cursor,
+				"prev_cursor": prev_cursor,
+				"length": len(inventory_serializer.data),
+				"products": inventory_serializer.data
+			}
+			return Response({"data": data}, status=status.HTTP_200_OK)
+
 		page_param = self.get_page_param()
 
 		if page_param:
-			page_count = math.ceil(len(self.curr_queryset)/self.page_size)
+			page_count = math.ceil(self.curr_queryset.count()/self.page_size)
 			if (page_count < page_param) or (page_param <= 0):
 				return Response({"detail": "Page Not found", "data": None}, status=status.HTTP_404_NOT_FOUND)
 
@@ -120,11 +245,96 @@ class InventoryView(APIView):
 			try:
 				db_saved_item = serializer.save(request.user)
 			except IntegrityError as err:
-				return Response({"detail": "Multiple inventory items with the same 'product_name' are not allowed"}, status=status.HTTP_400_BAD_REQUEST)
+				if "user_unique_product" in str(err) or "UNIQUE" in str(err):
+					return Response({"detail": "Multiple inventory items with the same 'product_name' are not allowed"}, status=status.HTTP_400_BAD_REQUEST)
+				return Response({"detail": "An inventory item's price must be greater than zero"}, status=status.HTTP_400_BAD_REQUEST)
 
 			return Response({"detail": "New Item added to inventory", "data": InventoryItemSerializer(db_saved_item).data}, status=status.HTTP_201_CREATED)
 
+class InventoryExportView(InventoryView):
+	""" Streams all the inventory items that match the filters of InventoryView as csv or ndjson """
+
+	def get(self, request, **kwargs):
+		file_type = get_export_file_type(request)
+		if file_type is None:
+			return Response({"detail": "Invalid value for file_type parameter"}, status=status.HTTP_400_BAD_REQUEST)
+		date_range = get_export_date_range(request)
+		if date_range.get("error"):
+			return Response({"detail": date_range["error"]}, status=status.HTTP_400_BAD_REQUEST)
+
+		self.curr_queryset = Inventory.objects.filter(owner=request.user.id)
+		self.filter_by_query_param().filter_by_category_param().filter_low_Stock().order_by_query()
+		if date_range.get("start_date"):
+			self.curr_queryset = self.curr_queryset.filter(date_added__gte=date_range["start_date"])
+		if date_range.get("end_date"):
+			self.curr_queryset = self.curr_queryset.filter(date_added__lte=date_range["end_date"])
+
+		serializer = InventoryItemSerializer()
+		rows = (serializer.to_representation(item) for item in self.curr_queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+		return export_response(rows, file_type, InventoryItemSerializer.Meta.fields, "inventory")
+
+class InventorySyncView(APIView):
+	""" The inventory items changed and the ids of the ones deleted since the 'since' token, see bizease/sync.py """
+	authentication_classes = [ClaimsJWTAuthentication]
+	permission_classes = [IsAuthenticated]
+	parser_classes = [JSONParser]
+
+	def get(self, request, **kwargs):
+		queryset = Inventory.objects.filter(owner=request.user.id)
+		return sync_response(request, queryset, "last_updated", "inventory", InventoryItemSerializer)
+
+class InventoryImportView(APIView):
+	"""
+	Creates many inventory items from a JSON array or a CSV file (e.g. an export) in one request. Valid rows are
+	imported and the others reported with their errors. With mode=upsert, rows whose product_name already exists
+	update that item instead of being rejected
+	"""
+	authentication_classes = [ClaimsJWTAuthentication]
+	permission_classes = [IsAuthenticated]
+	parser_classes = [JSONParser, CSVParser]
+
+	def post(self, request, **kwargs):
+		mode = request.GET.get("mode", "insert")
+		if mode not in ("insert", "upsert") or len(request.GET.getlist("mode")) > 1:
+			return Response({"detail": "Invalid value for mode parameter"}, status=status.HTTP_400_BAD_REQUEST)
+		rows, error = read_import_rows(request.data, ignored_fields=("id", "last_updated"))
+		if error:
+			return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+		try:
+			created, updated, errors = import_inventory_items(request.user, rows, upsert=(mode == "upsert"))
+		except IntegrityError: # an item with one of the names was added while the import was running
+			return Response({"detail": DUPLICATE_PRODUCT_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+		return Response(
+			{"detail": "Inventory import finished", "data": {"created": created, "updated": updated, "errors": errors}},
+			status=status.HTTP_200_OK
+		)
+
+class InventoryStockView(APIView):
+	"""
+	Changes the stock levels of many items at once (e.g. after a delivery or a stocktake). Every entry gives an item by
+	id or product_name and either a delta or the new stock level. All entries are applied or none
+	"""
+	authentication_classes = [ClaimsJWTAuthentication]
+	permission_classes = [IsAuthenticated]
+	parser_classes = [JSONParser, CSVParser]
+
+	def post(self, request, **kwargs):
+		rows, error = read_import_rows(request.data)
+		if error:
+			return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+		serializer = StockAdjustmentSerializer(data=rows, many=True)
+		if not serializer.is_valid():
+			errors = [{"row": number, "errors": row_errors} for number, row_errors in enumerate(serializer.errors, start=1) if row_errors]
+			return Response({"detail": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+		items, errors = adjust_stock_levels(request.user.id, serializer.validated_data)
+		if errors:
+			return Response({"detail": errors}, status=status.HTTP_400_BAD_REQUEST)
+		return Response({"detail": "Stock levels updated", "data": items}, status=status.HTTP_200_OK)
+
 class InventoryItemView(APIView):
+	authentication_classes = [ClaimsJWTAuthentication]
 	permission_classes = [IsAuthenticated]
 	parser_classes = [JSONParser]
 
@@ -0,0 +1,5 @@
+from django.contrib import admin
+from .models import AppliedOperation
+
+
+admin.site.register(AppliedOperation)
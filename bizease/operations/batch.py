@@ -0,0 +1,151 @@
+from django.db import transaction
+from django.db.utils import IntegrityError
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from inventory.models import Inventory
+from inventory.views import InventoryItemView
+from orders.views import OrdersView, OrderedProductsView
+from .models import AppliedOperation
+from datetime import timedelta
+
+OPERATIONS_MAX = 100
+OPERATION_RETENTION_DAYS = 30
+OP_ID_MAX_LENGTH = AppliedOperation._meta.get_field("op_id").max_length
+
+
+class OperationRequest:
+	""" The parts of a request the view handlers read, so they can be called with the data of one operation """
+	def __init__(self, user, data):
+		self.user = user
+		self.data = data
+
+
+def error_response(status_code, detail):
+	return Response({"detail": detail}, status=status_code)
+
+
+def create_order(user, operation, order_id):
+	return OrdersView().post(OperationRequest(user, operation["data"]))
+
+def add_ordered_product(user, operation, order_id):
+	return OrderedProductsView().post(OperationRequest(user, operation["data"]), order_id=order_id)
+
+def update_inventory_item(user, operation, order_id):
+	# the item view doesn't check who owns the item
+	if type(operation.get("item_id")) != int or not Inventory.objects.filter(owner=user, pk=operation["item_id"]).exists():
+		return error_response(status.HTTP_404_NOT_FOUND, "Item not found")
+	return InventoryItemView().put(OperationRequest(user, operation["data"]), item_id=operation["item_id"])
+
+# operation type -> handler returning the response of the endpoint the operation stands for
+OPERATION_HANDLERS = {
+	"create_order": create_order,
+	"add_ordered_product": add_ordered_product,
+	"update_inventory_item": update_inventory_item,
+}
+
+
+def validate_operation(operation):
+	""" Returns an error message for an operation that can't be applied or None """
+	if not isinstance(operation, dict):
+		return "Expected an object"
+	op_id = operation.get("op_id")
+	if not isinstance(op_id, str) or not op_id or len(op_id) > OP_ID_MAX_LENGTH:
+		return f"'op_id' must be a string of at most {OP_ID_MAX_LENGTH} characters"
+	if operation.get("type") not in OPERATION_HANDLERS:
+		return "'type' must be one of " + ", ".join(OPERATION_HANDLERS)
+	if not isinstance(operation.get("data"), dict):
+		return "'data' must be an object"
+	return None
+
+
+def apply_operations(user, operations):
+	"""
+	Applies a client's queued operations in order, each in its own transaction along with the record of its result, so
+	an operation is either applied and recorded or neither. Operations whose op_id was already applied (earlier in the
+	batch, in an earlier batch or by a concurrent request) aren't applied again and get the recorded result back.
+	Failed operations are recorded too, except unexpected errors, so those can be retried. An add_ordered_product
+	operation can give the op_id of a create_order operation as its order_id, for orders created offline.
+	Returns a result per operation: its op_id, the status code and body the single endpoint returned and whether it
+	was replayed
+	"""
+	op_ids = set()
+	for operation in operations:
+		if isinstance(operation, dict):
+			op_ids.update(value for value in (operation.get("op_id"), operation.get("order_id")) if isinstance(value, str))
+	applied = {record.op_id: record for record in AppliedOperation.objects.filter(owner=user, op_id__in=op_ids)}
+
+	results = []
+	for operation in operations:
+		error = validate_operation(operation)
+		if error:
+			op_id = operation.get("op_id") if isinstance(operation, dict) else None
+			results.append({"op_id": op_id, "status": status.HTTP_400_BAD_REQUEST, "replayed": False, "response": {"detail": error}})
+			continue
+		op_id = operation["op_id"]
+		record = applied.get(op_id)
+		replayed = record is not None
+		if record is None:
+			record = apply_operation(user, operation, applied)
+			if record is None: # recorded by a concurrent request in the meantime
+				record = AppliedOperation.objects.get(owner=user, op_id=op_id)
+				replayed = True
+			if record.pk is not None:
+				applied[op_id] = record
+		results.append({"op_id": op_id, "status": record.status_code, "replayed": replayed, "response": record.response})
+	return results
+
+
+def resolve_order_id(operation, applied):
+	""" Returns (order id, error response) of an operation, with the op_id of a create_order operation replaced by its order id """
+	order_id = operation.get("order_id")
+	if operation["type"] != "add_ordered_product":
+		return None, None
+	if type(order_id) == int:
+		return order_id, None
+	record = applied.get(order_id) if isinstance(order_id, str) else None
+	if record is None or record.op_type != "create_order":
+		return None, error_response(status.HTTP_400_BAD_REQUEST, "'order_id' must be an order id or the op_id of an earlier create_order operation")
+	if record.status_code != status.HTTP_201_CREATED:
+		return None, error_response(status.HTTP_400_BAD_REQUEST, f"Operation '{order_id}' didn't create an order")
+	return record.response["data"]["id"], None
+
+
+def apply_operation(user, operation, applied):
+	"""
+	Applies one operation and records its result. Returns the saved record, an unsaved one after an unexpected error
+	or None if a concurrent request recorded the same op_id first (its changes are rolled back then)
+	"""
+	op_type = operation["type"]
+	saving = False
+	try:
+		with transaction.atomic():
+			order_id, response = resolve_order_id(operation, applied)
+			if response is None:
+				try:
+					with transaction.atomic(): # the changes of a failed operation are rolled back but its result is recorded
+						response = OPERATION_HANDLERS[op_type](user, operation, order_id)
+						if not status.is_success(response.status_code):
+							transaction.set_rollback(True)
+				except Exception:
+					response = error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, "Something went wrong! Please try again")
+
+			record = AppliedOperation(
+				owner=user, op_id=operation["op_id"], op_type=op_type, status_code=response.status_code, response=response.data
+			)
+			if status.is_server_error(response.status_code):
+				transaction.set_rollback(True)
+				return record
+			saving = True
+			record.save()
+	except IntegrityError:
+		if not saving:
+			raise
+		return None # unique_operation_per_owner
+	return record
+
+
+def purge_applied_operations():
+	""" Deletes the results of operations applied more than OPERATION_RETENTION_DAYS ago. Returns the number deleted """
+	deleted, _ = AppliedOperation.objects.filter(applied_at__lt=timezone.now() - timedelta(days=OPERATION_RETENTION_DAYS)).delete()
+	return deleted
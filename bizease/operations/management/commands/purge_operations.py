@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from operations.batch import purge_applied_operations, OPERATION_RETENTION_DAYS
+
+
+class Command(BaseCommand):
+    help = (
+        f"Deletes the recorded results of offline operations applied more than {OPERATION_RETENTION_DAYS} days ago. "
+        "Operations sent again after that are applied again. Schedule it (e.g. daily from cron)"
+    )
+
+    def handle(self, *args, **options):
+        deleted = purge_applied_operations()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} applied operations"))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:50
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppliedOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('op_id', models.CharField(max_length=100)),
+                ('op_type', models.CharField(max_length=30)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('response', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('applied_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['applied_at'],
+                'indexes': [models.Index(fields=['applied_at'], name='applied_operation_time_idx')],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'op_id'), name='unique_operation_per_owner')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from accounts.models import CustomUser
+
+class AppliedOperation(models.Model):
+	"""
+	The result of an operation applied by the operations endpoint (see operations/batch.py). Sending the same op_id
+	again returns this result instead of applying the operation twice. Removed by the 'purge_operations' command
+	"""
+	owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+	op_id = models.CharField(max_length=100)
+	op_type = models.CharField(max_length=30)
+	status_code = models.PositiveSmallIntegerField()
+	response = models.JSONField(encoder=DjangoJSONEncoder)
+	applied_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ["applied_at"]
+		indexes = [models.Index(fields=["applied_at"], name="applied_operation_time_idx")] # for the purge
+		constraints = [
+			models.UniqueConstraint(fields=["owner", "op_id"], name="unique_operation_per_owner")
+		]
+
+	def __str__(self):
+		return f"{self.owner_id} - {self.op_type} {self.op_id} ({self.status_code})"
@@ -0,0 +1,34 @@
+from rest_framework.test import APITestCase
+from accounts.models import CustomUser
+from bizease.synthetic_data import seed_tenant
+from bizease.testing import QueryBudgetMixin
+from accounts.authentication import VersionedRefreshToken
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework import status
+import random
+
+
+@override_settings(TENANT_CACHE_TIMEOUT=0)
+class OperationsQueryBudgetTest(QueryBudgetMixin, APITestCase):
+	@classmethod
+	def setUpTestData(cls):
+		cls.test_user = CustomUser.objects.create(business_name="Big Shop", full_name="Big Shop", email="bigshop@gmail.com", password="12345678", is_active=True)
+		cls.products, cls.orders = seed_tenant(cls.test_user, product_count=100, order_count=20, rng=random.Random(1))
+
+	def setUp(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(VersionedRefreshToken.for_user(self.test_user).access_token))
+
+	def test_replayed_operations_query_budget(self):
+		operations = [
+			{"op_id": f"op-{product.id}", "type": "update_inventory_item", "item_id": product.id, "data": {"stock_level": 50}}
+			for product in self.products[:50]
+		]
+		response = self.client.post(reverse("operations", args=["v1"]), operations, format="json")
+		self.assertEqual([result["status"] for result in response.data["data"]], [200] * 50)
+
+		# a replayed batch only reads the recorded results: user lookup + the results
+		with self.assertMaxQueries(2):
+			response = self.client.post(reverse("operations", args=["v1"]), operations, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertTrue(all(result["replayed"] for result in response.data["data"]))
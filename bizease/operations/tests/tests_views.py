@@ -0,0 +1,134 @@
+from rest_framework.test import APITransactionTestCase
+from accounts.models import CustomUser
+from inventory.models import Inventory
+from orders.models import Order, OrderedProduct
+from operations.models import AppliedOperation
+from accounts.authentication import VersionedRefreshToken
+from django.urls import reverse
+from rest_framework import status
+from unittest.mock import patch
+
+
+class OperationsViewTest(APITransactionTestCase):
+	def setUp(self):
+		self.test_user = CustomUser.objects.create(
+			business_name="user-biz", full_name="test user", email="testuser123@gmail.com", password="12345678", is_active=True
+		)
+		self.other_user = CustomUser.objects.create(
+			business_name="other-biz", full_name="other user", email="otheruser@gmail.com", password="12345678", is_active=True
+		)
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(VersionedRefreshToken.for_user(self.test_user).access_token))
+		self.url = reverse("operations", args=["v1"])
+
+		self.item_1 = Inventory.objects.create(owner=self.test_user, product_name="Calculator", price=10000, stock_level=100, date_added="2025-05-15")
+		self.item_2 = Inventory.objects.create(owner=self.test_user, product_name="Helmet", price=6000, stock_level=45, date_added="2025-05-15")
+		self.other_item = Inventory.objects.create(owner=self.other_user, product_name="Helmet", price=6000, stock_level=5, date_added="2025-05-15")
+
+		self.operations = [
+			{
+				"op_id": "op-1", "type": "create_order",
+				"data": {"client_name": "bob", "order_date": "2025-07-20", "ordered_products": [{"name": "Calculator", "quantity": 2, "price": 10000}]}
+			},
+			# the order created offline is referenced by the op_id of its create_order operation
+			{"op_id": "op-2", "type": "add_ordered_product", "order_id": "op-1", "data": {"name": "Helmet", "quantity": 5, "price": 6000}},
+			{"op_id": "op-3", "type": "add_ordered_product", "order_id": "op-1", "data": {"name": "Chair", "quantity": 1, "price": 500}},
+			{"op_id": "op-4", "type": "update_inventory_item", "item_id": self.item_1.id, "data": {"price": 12000}},
+		]
+
+	def test_apply_operations(self):
+		response = self.client.post(self.url, self.operations, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		results = response.data["data"]
+		self.assertEqual([result["op_id"] for result in results], ["op-1", "op-2", "op-3", "op-4"])
+		self.assertEqual([result["status"] for result in results], [201, 201, 400, 200])
+		self.assertFalse(any(result["replayed"] for result in results))
+		self.assertEqual(results[2]["response"]["detail"], ["'Chair' doesn't exist in the Inventory."])
+
+		order = Order.objects.get(pk=results[0]["response"]["data"]["id"])
+		self.assertEqual(order.product_owner_id, self.test_user)
+		self.assertEqual(order.total_price, 50000)
+		self.assertEqual(list(order.ordered_products.values_list("name", flat=True)), ["Calculator", "Helmet"])
+		self.item_1.refresh_from_db()
+		self.item_2.refresh_from_db()
+		self.assertEqual((self.item_1.stock_level, self.item_1.price), (98, 12000))
+		self.assertEqual(self.item_2.stock_level, 40)
+		self.assertEqual(AppliedOperation.objects.filter(owner=self.test_user).count(), 4)
+
+	def test_replayed_operations_are_not_applied_again(self):
+		first_results = self.client.post(self.url, self.operations[:2], format="json").data["data"]
+
+		# a retry after a lost response, with the operations queued since then and an op_id sent twice
+		operations = self.operations + [self.operations[3]]
+		response = self.client.post(self.url, operations, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		results = response.data["data"]
+		self.assertEqual([result["replayed"] for result in results], [True, True, False, False, True])
+		self.assertEqual([result["status"] for result in results], [201, 201, 400, 200, 200])
+		self.assertEqual(results[0]["response"]["data"]["id"], first_results[0]["response"]["data"]["id"])
+		self.assertEqual(Order.objects.count(), 1)
+		self.assertEqual(OrderedProduct.objects.count(), 2)
+		self.item_2.refresh_from_db()
+		self.assertEqual(self.item_2.stock_level, 40)
+
+		# op_ids are per user
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(VersionedRefreshToken.for_user(self.other_user).access_token))
+		response = self.client.post(self.url, [{"op_id": "op-4", "type": "update_inventory_item", "item_id": self.other_item.id, "data": {"stock_level": 3}}], format="json")
+		self.assertEqual(response.data["data"][0]["status"], 200)
+		self.assertFalse(response.data["data"][0]["replayed"])
+
+	def test_operations_with_invalid_input(self):
+		for body, detail in [({"op_id": "op-1"}, "Expected a JSON array of operations"), ("op-1", "Expected a JSON array of operations")]:
+			response = self.client.post(self.url, body, format="json")
+			self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertEqual(response.data["detail"], detail)
+		with patch("operations.views.OPERATIONS_MAX", 3):
+			response = self.client.post(self.url, self.operations, format="json")
+			self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertEqual(response.data["detail"], "A request can't have more than 3 operations")
+
+		operations = [
+			"op-1",
+			{"type": "create_order", "data": {}},
+			{"op_id": "x" * 101, "type": "create_order", "data": {}},
+			{"op_id": "op-2", "type": "delete_order", "data": {}},
+			{"op_id": "op-3", "type": "create_order", "data": []},
+			{"op_id": "op-4", "type": "add_ordered_product", "order_id": "op-9", "data": {"name": "Helmet", "quantity": 1, "price": 6000}},
+			# other users' items can't be changed
+			{"op_id": "op-5", "type": "update_inventory_item", "item_id": self.other_item.id, "data": {"stock_level": 0}},
+		]
+		response = self.client.post(self.url, operations, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		results = response.data["data"]
+		self.assertEqual([result["status"] for result in results], [400, 400, 400, 400, 400, 400, 404])
+		self.assertEqual([result["response"]["detail"] for result in results], [
+			"Expected an object",
+			"'op_id' must be a string of at most 100 characters",
+			"'op_id' must be a string of at most 100 characters",
+			"'type' must be one of create_order, add_ordered_product, update_inventory_item",
+			"'data' must be an object",
+			"'order_id' must be an order id or the op_id of an earlier create_order operation",
+			"Item not found",
+		])
+		self.other_item.refresh_from_db()
+		self.assertEqual(self.other_item.stock_level, 5)
+
+		self.client.credentials()
+		response = self.client.post(self.url, self.operations, format="json")
+		self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_failed_operations_can_be_retried_after_unexpected_errors(self):
+		def fail(*args):
+			Inventory.objects.filter(pk=self.item_1.id).update(stock_level=0)
+			raise RuntimeError
+
+		with patch.dict("operations.batch.OPERATION_HANDLERS", {"update_inventory_item": fail}):
+			response = self.client.post(self.url, self.operations[3:], format="json")
+		self.assertEqual(response.data["data"][0]["status"], 500)
+		self.assertFalse(AppliedOperation.objects.exists())
+		self.item_1.refresh_from_db()
+		self.assertEqual((self.item_1.stock_level, self.item_1.price), (100, 10000))
+
+		response = self.client.post(self.url, self.operations[3:], format="json")
+		self.assertEqual(response.data["data"][0]["status"], 200)
+		self.item_1.refresh_from_db()
+		self.assertEqual(self.item_1.price, 12000)
@@ -0,0 +1,6 @@
+from . import views
+from django.urls import path
+
+urlpatterns = [
+	path('', views.OperationsView.as_view(), name="operations"),
+]
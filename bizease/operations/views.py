@@ -0,0 +1,24 @@
+from rest_framework.permissions import IsAuthenticated
+from accounts.authentication import ClaimsJWTAuthentication
+from rest_framework.parsers import JSONParser
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .batch import apply_operations, OPERATIONS_MAX
+
+
+class OperationsView(APIView):
+	"""
+	Applies a batch of operations queued by an offline client, in order, instead of one request per operation.
+	See operations/batch.py
+	"""
+	parser_classes = [JSONParser]
+	authentication_classes = [ClaimsJWTAuthentication]
+	permission_classes = [IsAuthenticated]
+
+	def post(self, request, **kwargs):
+		if not isinstance(request.data, list):
+			return Response({"detail": "Expected a JSON array of operations"}, status=status.HTTP_400_BAD_REQUEST)
+		if len(request.data) > OPERATIONS_MAX:
+			return Response({"detail": f"A request can't have more than {OPERATIONS_MAX} operations"}, status=status.HTTP_400_BAD_REQUEST)
+		return Response({"data": apply_operations(request.user, request.data)}, status=status.HTTP_200_OK)
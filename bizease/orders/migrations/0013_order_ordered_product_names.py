@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from bizease.fulltext import create_search_index, drop_search_index
+
+SEARCH_FIELDS = ["client_name", "client_email", "client_phone", "ordered_product_names"]
+
+
+def fill_ordered_product_names(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderedProduct = apps.get_model("orders", "OrderedProduct")
+
+    names = {}
+    for order_id, name in OrderedProduct.objects.order_by("id").values_list("order_id", "name").iterator(chunk_size=2000):
+        names.setdefault(order_id, []).append(name)
+    Order.objects.bulk_update(
+        [Order(id=order_id, ordered_product_names="\n".join(order_names)) for order_id, order_names in names.items()],
+        ["ordered_product_names"], batch_size=1000
+    )
+
+
+def create_index(apps, schema_editor):
+    create_search_index(schema_editor, apps.get_model("orders", "Order"), SEARCH_FIELDS, "product_owner_id", "order_search_idx")
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor, apps.get_model("orders", "Order"), SEARCH_FIELDS, "product_owner_id", "order_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_alter_orderedproduct_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='ordered_product_names',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(fill_ordered_product_names, migrations.RunPython.noop),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_order_ordered_product_names'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['product_owner_id', '-order_date'], name='order_owner_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['product_owner_id', 'status', 'order_date'], name='order_owner_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['product_owner_id', 'total_price'], name='order_owner_total_price_idx'),
+        ),
+    ]
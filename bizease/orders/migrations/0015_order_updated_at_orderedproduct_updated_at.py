@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:47
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from bizease.fulltext import create_search_index, drop_search_index
+
+SEARCH_FIELDS = ["client_name", "client_email", "client_phone", "ordered_product_names"]
+
+
+# sqlite rebuilds the table to fill the new column with the current time, which drops the search index triggers.
+# The search index is dropped before and recreated (and refilled) after the column is added.
+def create_index(apps, schema_editor):
+    create_search_index(schema_editor, apps.get_model("orders", "Order"), SEARCH_FIELDS, "product_owner_id", "order_search_idx")
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor, apps.get_model("orders", "Order"), SEARCH_FIELDS, "product_owner_id", "order_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0014_order_order_owner_date_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_index, create_index),
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderedproduct',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['product_owner_id', 'updated_at'], name='order_owner_updated_idx'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models, transaction
 from accounts.models import CustomUser
-from django.db.models import Q
-from inventory.models import Inventory
+from django.db.models import Q, F, Value
+from django.db.models.functions import Coalesce
+from inventory.models import Inventory, decrement_stock_levels
+from reports.rollups import SalesDelta, to_date
+from reports.models import Tombstone
+from bizease.tenant_cache import invalidate_tenant
 from django.utils import timezone
 
 class Order(models.Model):
@@ -13,10 +17,20 @@ class Order(models.Model):
 	order_date = models.DateField()
 	delivery_date = models.DateField(null=True)
 	total_price = models.DecimalField(max_digits=14, decimal_places=2, null=True)
+	# Names of the order's ordered products, one per line. Kept on the order so searching orders doesn't need a join
+	ordered_product_names = models.TextField(blank=True, default="")
+	updated_at = models.DateTimeField(auto_now=True) # read by the sync endpoint. Changing an ordered product updates it too
 	ordered_products_objects = []
+	search_fields = ["client_name", "client_email", "client_phone", "ordered_product_names"] # see bizease/fulltext.py
 
 	class Meta:
 		ordering = ["-order_date"]
+		indexes = [
+			models.Index(fields=["product_owner_id", "-order_date"], name="order_owner_date_idx"),
+			models.Index(fields=["product_owner_id", "status", "order_date"], name="order_owner_status_date_idx"),
+			models.Index(fields=["product_owner_id", "total_price"], name="order_owner_total_price_idx"),
+			models.Index(fields=["product_owner_id", "updated_at"], name="order_owner_updated_idx"),
+		]
 		constraints = [
 			models.CheckConstraint(condition=Q(total_price__gt=0), name="total_price_gt_zero")
 		]
@@ -24,14 +38,72 @@ class Order(models.Model):
 	def __str__(self):
 		return f"{self.client_name} - {self.id}"
 
+	def add_product_names(self, names):
+		current_names = self.ordered_product_names.splitlines()
+		self.ordered_product_names = "\n".join(current_names + [name for name in names if name not in current_names])
+
+	def remove_product_name(self, name):
+		self.ordered_product_names = "\n".join(product_name for product_name in self.ordered_product_names.splitlines() if product_name != name)
+
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# The status and order_date currently in the db. Used to know what to change in the sales rollups on save
+		instance._sales_state = (instance.__dict__.get("status"), instance.__dict__.get("order_date"))
+		return instance
+
+	def update_sales_rollups(self, new_ordered_products):
+		"""
+		Applies this order's changes to the daily sales rollups and the tenant stats (reports.models). Only Delivered
+		orders are counted in the sales rollups. 'new_ordered_products' are the ordered products that were just added to the order.
+		"""
+		prev_state = getattr(self, "_sales_state", None)
+		curr_state = (self.status, to_date(self.order_date))
+		self._sales_state = curr_state
+		prev_delivered = prev_state is not None and prev_state[0] == "Delivered"
+		curr_delivered = self.status == "Delivered"
+
+		sales_delta = SalesDelta(self.product_owner_id_id)
+		sales_delta.add_stats(
+			total_orders=int(prev_state is None),
+			pending_orders=int(self.status == "Pending") - int(prev_state is not None and prev_state[0] == "Pending")
+		)
+		if not prev_delivered and not curr_delivered:
+			sales_delta.save()
+			return
+
+		if prev_state == curr_state:
+			for product in new_ordered_products:
+				sales_delta.add_product(self.order_date, product.name, product.quantity, product.cummulative_price)
+		else:
+			if prev_state is None:
+				ordered_products = [(product.id, product.name, product.quantity, product.cummulative_price) for product in new_ordered_products]
+			else:
+				ordered_products = list(self.ordered_products.values_list("id", "name", "quantity", "cummulative_price"))
+
+			if prev_delivered:
+				new_ids = {product.id for product in new_ordered_products}
+				sales_delta.add_order_with_products(
+					prev_state[1], [product[1:] for product in ordered_products if product[0] not in new_ids], sign=-1
+				)
+			if curr_delivered:
+				sales_delta.add_order_with_products(self.order_date, [product[1:] for product in ordered_products])
+		sales_delta.save()
+
 	@transaction.atomic
 	def save_order_to_db(self, products_err_dict, **kwargs):
-		super().save(**kwargs) # Allows the model instance to get a db generated id that's required when saving ordered products that have a foreign key to it
+		"""
+		Saves the order and its new ordered products in a fixed number of queries regardless of the number of
+		ordered products: one query fetches every referenced inventory item, validation runs in memory, then the
+		order row, the ordered products (bulk insert) and the stock levels (a single UPDATE) are written.
+		"""
+		if len(self.ordered_products_objects) == 0:
+			super().save(**kwargs)
+			self.update_sales_rollups([])
+			return
 
-		if len(self.ordered_products_objects) > 0: # new order
-			self.total_price = 0
-			
 		non_unique_order_err = "Ordered products must be unique. Use the quantity field to specify multiple orders of same item."
+		products_to_save = []
 		for product in self.ordered_products_objects:
 			product.name = product.name.title()
 			if products_err_dict.get(product.name) == None:
@@ -43,10 +115,27 @@ class Order(models.Model):
 
 			if product.id != None:
 				raise ValueError(f"Ordered product '{product.name}' has already been added to an order.", "custom")
-			product.order_id = self
-			errors = product.save()
+			products_to_save.append(product)
+
+		inventory_products = {
+			item.product_name: item for item in
+			Inventory.objects.filter(owner_id=self.product_owner_id).filter(product_name__in=[product.name for product in products_to_save])
+		}
+
+		if not self.id: # new order
+			self.total_price = 0
+		for product in products_to_save:
+			inventory_product = inventory_products.get(product.name)
+			if inventory_product is None:
+				products_err_dict[product.name].append(f"'{product.name}' doesn't exist in the Inventory.")
+				continue
+
+			errors = product.validate_data(inventory_product)
 			if errors:
 				products_err_dict[product.name] += errors
+				continue
+			product.order_id = self
+			product.create(inventory_product)
 
 		for k in products_err_dict.copy():
 			if len(products_err_dict[k]) == 0:
@@ -55,9 +144,25 @@ class Order(models.Model):
 		if products_err_dict:
 			raise ValueError("Ordered item has one or more invalid attributes")
 
+		self.add_product_names(product.name for product in products_to_save)
+		super().save(**kwargs)
+		OrderedProduct.objects.bulk_create(products_to_save)
+
+		# Stock is only reserved at the very end so rows locked by the update are held for as short as possible
+		stock_changes = {inventory_products[product.name].id: product.quantity for product in products_to_save}
+		out_of_stock_ids = decrement_stock_levels(stock_changes)
+		if out_of_stock_ids:
+			for product in products_to_save:
+				if inventory_products[product.name].id in out_of_stock_ids:
+					products_err_dict[product.name] = [f"Not enough products in stock to satisfy order for '{product.name}'"]
+			raise ValueError("Ordered item has one or more invalid attributes")
+
+		self.update_sales_rollups(products_to_save)
+
 	@transaction.atomic
 	def update_total_price(self, **kwargs):
-		super().save(update_fields=['total_price'], **kwargs)
+		# the product names change along with the total price when ordered products are added
+		super().save(update_fields=['total_price', 'ordered_product_names', 'updated_at'], **kwargs)
 
 	def save(self, **kwargs):
 		ordered_products = self.ordered_products_objects # An array of OrderedProducts instance whose data haven't been saved to the db
@@ -91,7 +196,55 @@ class Order(models.Model):
 			return products_err_dict
 
 		self.ordered_products_objects = []
-		self.update_total_price()
+
+	@transaction.atomic
+	def delete(self, **kwargs):
+		prev_state = getattr(self, "_sales_state", (self.status, self.order_date))
+		sales_delta = SalesDelta(self.product_owner_id_id)
+		sales_delta.add_stats(total_orders=-1, pending_orders=-int(prev_state[0] == "Pending"))
+		if prev_state[0] == "Delivered":
+			sales_delta.add_order_with_products(prev_state[1], self.ordered_products.values_list("name", "quantity", "cummulative_price"), sign=-1)
+		Tombstone.objects.create(owner_id=self.product_owner_id_id, resource="orders", object_id=self.id)
+		deleted = super().delete(**kwargs)
+		# after the delete, as a missing stats row is computed from the table
+		sales_delta.save()
+		return deleted
+
+
+def deliver_orders(owner_id, order_ids=None, end_date=None):
+	"""
+	Marks a user's Pending orders Delivered with one UPDATE, either the orders in 'order_ids' or every order dated on or
+	before 'end_date'. Orders without a delivery date get today's. The orders are locked while their ordered products
+	are added to the sales rollups and the tenant stats in one SalesDelta, so the number of queries doesn't depend on the
+	number of orders. Returns the ids of the delivered orders
+	"""
+	with transaction.atomic():
+		orders = Order.objects.select_for_update().filter(product_owner_id=owner_id, status="Pending")
+		if order_ids is not None:
+			orders = orders.filter(pk__in=order_ids)
+		if end_date is not None:
+			orders = orders.filter(order_date__lte=end_date)
+		order_dates = dict(orders.order_by("id").values_list("id", "order_date"))
+		if not order_dates:
+			return []
+
+		now = timezone.now()
+		Order.objects.filter(pk__in=list(order_dates)).update(
+			status="Delivered", delivery_date=Coalesce(F("delivery_date"), Value(now.date())), updated_at=now
+		)
+		products = {order_id: [] for order_id in order_dates}
+		for order_id, name, quantity, cummulative_price in (
+			OrderedProduct.objects.filter(order_id__in=list(order_dates)).values_list("order_id", "name", "quantity", "cummulative_price")
+		):
+			products[order_id].append((name, quantity, cummulative_price))
+
+		sales_delta = SalesDelta(owner_id)
+		sales_delta.add_stats(pending_orders=-len(order_dates))
+		for order_id, order_date in order_dates.items():
+			sales_delta.add_order_with_products(order_date, products[order_id])
+		sales_delta.save()
+		invalidate_tenant(owner_id) # queryset.update() doesn't send the signals that invalidate the cached responses
+	return list(order_dates)
 
 
 class OrderedProduct(models.Model):
@@ -100,6 +253,7 @@ class OrderedProduct(models.Model):
 	quantity = models.PositiveIntegerField()
 	price = models.DecimalField(default=0, max_digits=14, decimal_places=2)
 	cummulative_price = models.DecimalField(max_digits=14, decimal_places=2)
+	updated_at = models.DateTimeField(auto_now=True)
 
 	class Meta:
 		ordering = ["id"]
@@ -166,20 +320,35 @@ class OrderedProduct(models.Model):
 		if errors:
 			return errors
 
+		order_total_price = self.order_id.total_price
+		order_product_names = self.order_id.ordered_product_names
+		stock_level = inventory_product.stock_level
 		if self.id == None:
 			self.create(inventory_product)
+			self.order_id.add_product_names([self.name])
 		else:
 			update_errors = self.update(inventory_product)
 			if update_errors:
 				return update_errors
 
-		inventory_product.save()
+		# The stock level read above might be stale by now so the change is applied relative to the current value
+		if decrement_stock_levels({inventory_product.id: stock_level - inventory_product.stock_level}):
+			self.order_id.total_price = order_total_price
+			self.order_id.ordered_product_names = order_product_names
+			return [f"Not enough products in stock to satisfy order for '{self.name}'"]
+
 		super().save(**kwargs)
 		if new_order == False: # this is an existing Order
 			 # Updating the quantity of any of the ordered product of an order
 			 # means the total_price will also increase
 			self.order_id.update_total_price()
 
+		if self.order_id.status == "Delivered":
+			units_sold = stock_level - inventory_product.stock_level
+			sales_delta = SalesDelta(self.order_id.product_owner_id_id)
+			sales_delta.add_product(self.order_id.order_date, self.name, units_sold, units_sold * self.price)
+			sales_delta.save()
+
 	@transaction.atomic
 	def delete(self, **kwargs):
 		item_in_stock = True
@@ -195,12 +364,16 @@ class OrderedProduct(models.Model):
 			raise ValueError("Can't delete item! An Order must have at least one ordered product")
 
 		order_obj.total_price -= (self.price * self.quantity)
+		order_obj.remove_product_name(self.name)
 		order_obj.save()
 		if item_in_stock:
-			inventory_product.stock_level += self.quantity
-			inventory_product.save()
+			decrement_stock_levels({inventory_product.id: -self.quantity})
+		if order_obj.status == "Delivered":
+			sales_delta = SalesDelta(order_obj.product_owner_id_id)
+			sales_delta.add_product(order_obj.order_date, self.name, self.quantity, self.price * self.quantity, sign=-1)
+			sales_delta.save()
 
-		super().delete(**kwargs)
+		return super().delete(**kwargs)
 
 	def __str__(self):
 		return f"{self.name}({self.quantity})"
\ No newline at end of file
@@ -4,6 +4,7 @@ from accounts.models import CustomUser
 from inventory.models import Inventory
 from django.db.utils import IntegrityError
 from datetime import date
+from unittest.mock import patch
 
 
 class OrderModelTest(TestCase):
@@ -83,6 +84,28 @@ class OrderModelTest(TestCase):
 		ordered_product_2 = OrderedProduct(name="Satchet Water", order_id=order, quantity=1, price=30)
 		self.assertRaises(IntegrityError, ordered_product_2.save)
 
+	def test_new_order_query_count_is_independent_of_ordered_products_count(self):
+		products = [
+			Inventory.objects.create(owner=self.test_user, product_name=f"Product {i}", price=10 + i, stock_level=100, date_added="2025-05-15")
+			for i in range(30)
+		]
+
+		small_order = Order(product_owner_id=self.test_user, client_name="small", order_date="2025-07-20")
+		small_order.ordered_products_objects = [OrderedProduct(name=product.product_name, quantity=1, price=product.price) for product in products[:2]]
+		with self.assertNumQueries(11):
+			small_order.save()
+
+		large_order = Order(product_owner_id=self.test_user, client_name="large", order_date="2025-07-20")
+		large_order.ordered_products_objects = [OrderedProduct(name=product.product_name, quantity=2, price=product.price) for product in products]
+		with self.assertNumQueries(11):
+			large_order.save()
+
+		large_order = Order.objects.get(pk=large_order.id)
+		self.assertEqual(large_order.ordered_products.count(), 30)
+		self.assertEqual(large_order.total_price, sum(product.price * 2 for product in products))
+		self.assertEqual(Inventory.objects.get(pk=products[0].id).stock_level, 97)
+		self.assertEqual(Inventory.objects.get(pk=products[29].id).stock_level, 98)
+
 
 class OrderedProductModelTest(TestCase):
 	# data_validation, constraints, max_length e.t.c.
@@ -168,6 +191,27 @@ class OrderedProductModelTest(TestCase):
 		self.assertEqual(update_errors, ["Only 'quantity' field can be updated"])
 		self.assertEqual(existing_ordered_item.name, "Water Melon")
 
+	def test_stale_stock_level_doesnt_oversell(self):
+		# Simulates concurrent orders that all passed validation against the same (now stale) stock level
+		with patch.object(OrderedProduct, "validate_data", return_value=[]):
+			new_order = Order(product_owner_id=self.test_user, client_name="bob", order_date="2025-07-21")
+			new_order.ordered_products_objects = [OrderedProduct(name="Cantaloupe", quantity=150, price=1000)]
+			self.assertEqual(new_order.save(), None)
+
+			new_order = Order(product_owner_id=self.test_user, client_name="alice", order_date="2025-07-21")
+			new_order.ordered_products_objects = [
+				OrderedProduct(name="Winter Melon", quantity=10, price=2000), OrderedProduct(name="Cantaloupe", quantity=100, price=1000)
+			]
+			self.assertEqual(new_order.save(), {"Cantaloupe": ["Not enough products in stock to satisfy order for 'Cantaloupe'"]})
+			self.assertEqual(Order.objects.filter(client_name="alice").count(), 0)
+
+			item = OrderedProduct(name="Cantaloupe", quantity=51, price=1000, order_id=self.test_order)
+			self.assertEqual(item.save(new_order=False), ["Not enough products in stock to satisfy order for 'Cantaloupe'"])
+
+		self.assertEqual(Inventory.objects.get(product_name="Cantaloupe").stock_level, 50)
+		self.assertEqual(Inventory.objects.get(product_name="Winter Melon").stock_level, 200)
+		self.assertEqual(Order.objects.get(pk=self.test_order.id).total_price, 3000)
+
 	def test_delete_only_ordered_item_of_order(self):
 		self.assertRaises(ValueError, OrderedProduct.objects.get(pk=self.item.id).delete)
 
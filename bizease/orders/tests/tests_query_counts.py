@@ -0,0 +1,125 @@
+from rest_framework.test import APITestCase
+from accounts.models import CustomUser
+from orders.models import Order
+from bizease.synthetic_data import seed_tenant
+from bizease.testing import QueryBudgetMixin
+from accounts.authentication import VersionedRefreshToken
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework import status
+from unittest.mock import patch
+from bizease.sync import make_sync_token
+from django.utils import timezone
+from datetime import timedelta
+import random
+
+
+@override_settings(TENANT_CACHE_TIMEOUT=0) # budgets are for computing the responses, not reading them from the cache
+class OrdersQueryBudgetTest(QueryBudgetMixin, APITestCase):
+	""" Endpoints must run a fixed number of queries regardless of how much data a user has """
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.test_user = CustomUser.objects.create(business_name="Big Shop", full_name="Big Shop", email="bigshop@gmail.com", password="12345678", is_active=True)
+		other_user = CustomUser.objects.create(business_name="Other Shop", full_name="Other Shop", email="othershop@gmail.com", password="12345678", is_active=True)
+		cls.products, cls.orders = seed_tenant(cls.test_user, product_count=300, order_count=150, lines_per_order=4, rng=random.Random(1))
+		seed_tenant(other_user, product_count=100, order_count=50, rng=random.Random(2))
+
+	def setUp(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(VersionedRefreshToken.for_user(self.test_user).access_token))
+
+	def test_orders_list_query_budget(self):
+		# user lookup + (count) + orders + ordered products of the orders
+		budgets = [
+			({}, 3), ({"page": 2}, 4), ({"status": "pending", "page": 1}, 4), ({"query": "client 1", "page": 1}, 4), ({"order": "total_price"}, 3)
+		]
+		for params, budget in budgets:
+			with self.assertMaxQueries(budget):
+				response = self.client.get(reverse("orders", args=["v1"]), query_params=params)
+			self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+	def test_orders_export_query_budget(self):
+		# user lookup + orders + ordered products of every chunk of 100 orders (300 orders)
+		with patch("orders.views.EXPORT_CHUNK_SIZE", 100):
+			for params in [{}, {"file_type": "ndjson", "status": "delivered"}, {"query": "client 1"}]:
+				with self.assertMaxQueries(5):
+					response = self.client.get(reverse("orders-export", args=["v1"]), query_params=params)
+					content = b"".join(response.streaming_content)
+				self.assertEqual(response.status_code, status.HTTP_200_OK)
+				self.assertTrue(content)
+
+	def test_orders_stats_query_budget(self):
+		# user lookup + the tenant stats row
+		with self.assertMaxQueries(2):
+			response = self.client.get(reverse("orders-stats", args=["v1"]))
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+	def test_order_query_budget(self):
+		data = {
+			"client_name": "new client",
+			"order_date": "2025-07-20",
+			"ordered_products": [{"name": product.product_name, "quantity": 1, "price": product.price} for product in self.products[:20] if product.stock_level > 0]
+		}
+		with self.assertMaxQueries(13):
+			response = self.client.post(reverse("orders", args=["v1"]), data, format="json")
+		self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+		order_id = response.data["data"]["id"]
+
+		with self.assertMaxQueries(3):
+			response = self.client.get(reverse("order", args=["v1", order_id]))
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+		with self.assertMaxQueries(6):
+			response = self.client.put(reverse("order", args=["v1", order_id]), {"client_name": "renamed client"}, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+		with self.assertMaxQueries(8):
+			response = self.client.delete(reverse("order", args=["v1", order_id]))
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+	def test_ordered_products_query_budget(self):
+		order = Order.objects.filter(product_owner_id=self.test_user, status="Pending").first()
+		ordered_names = set(order.ordered_products.values_list("name", flat=True))
+		product = next(product for product in self.products if product.product_name not in ordered_names and product.stock_level > 2)
+
+		with self.assertMaxQueries(15):
+			response = self.client.post(
+				reverse("ordered-products", args=["v1", order.id]), {"name": product.product_name, "quantity": 1, "price": product.price}, format="json"
+			)
+		self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+		ordered_product = order.ordered_products.get(name=product.product_name)
+
+		with self.assertMaxQueries(3):
+			response = self.client.get(reverse("ordered-product", args=["v1", order.id, ordered_product.id]))
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+		with self.assertMaxQueries(18):
+			response = self.client.put(reverse("ordered-product", args=["v1", order.id, ordered_product.id]), {"quantity": 2}, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+		with self.assertMaxQueries(19):
+			response = self.client.delete(reverse("ordered-product", args=["v1", order.id, ordered_product.id]))
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+	def test_orders_delivery_query_budget(self):
+		pending = list(Order.objects.filter(product_owner_id=self.test_user, status="Pending").values_list("id", flat=True))
+		self.assertGreater(len(pending), 20)
+		# user lookup, reading and locking the orders, the update, their ordered products, the tenant stats and the
+		# sales rollups (a read, an insert and an update per rollup table) in savepoints
+		with self.assertMaxQueries(15):
+			response = self.client.post(reverse("orders-deliver", args=["v1"]), {"ids": pending}, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(len(response.data["data"]["delivered"]), len(pending))
+
+
+	def test_orders_sync_query_budget(self):
+		# user lookup, the changed orders, their ordered products and the deleted orders
+		order = Order.objects.filter(product_owner_id=self.test_user, status="Pending").first()
+		order_id = order.id
+		order.delete()
+		for params in [{}, {"since": make_sync_token(timezone.now() - timedelta(days=1))}]:
+			with self.assertMaxQueries(4):
+				response = self.client.get(reverse("orders-sync", args=["v1"]), query_params=params)
+			self.assertEqual(response.status_code, status.HTTP_200_OK)
+			self.assertEqual(len(response.data["data"]["changed"]), len(self.orders) - 1)
+		self.assertEqual(response.data["data"]["deleted"], [order_id])
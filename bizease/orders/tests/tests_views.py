@@ -3,10 +3,18 @@ from orders.models import Order, OrderedProduct
 from orders.serializers import OrderSerializer
 from accounts.models import CustomUser
 from inventory.models import Inventory
+from reports.models import DailySales, DailyProductSales
+from reports.rollups import rebuild_rollups, reconcile_tenant_stats
 from django.urls import reverse
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
-from datetime import date
+from accounts.authentication import VersionedRefreshToken
+from datetime import date, timedelta
+from unittest.mock import patch
+from django.core.serializers.json import DjangoJSONEncoder
+import csv
+import io
+import json
 
 
 class OrdersViewsTest(APITransactionTestCase):
@@ -366,6 +374,150 @@ class OrdersViewsTest(APITransactionTestCase):
 		self.assertEqual(response.data["data"]["pending_orders"], 1)
 		self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+	def rollups(self):
+		return (
+			sorted(DailySales.objects.filter(owner=self.test_user).values_list("date", "revenue", "order_count")),
+			sorted(DailyProductSales.objects.filter(owner=self.test_user).values_list("date", "product_name", "units_sold", "revenue"))
+		)
+
+	def test_deliver_orders_by_id(self):
+		other_user = CustomUser.objects.create(business_name="other-biz", full_name="other user", email="other@gmail.com", password="12345678", is_active=True)
+		Inventory.objects.create(owner=other_user, product_name="Helmet", price=6000, stock_level=45, date_added="2025-05-15")
+		other_order = Order(product_owner_id=other_user, client_name="eve", order_date="2025-07-20")
+		other_order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=1, price=6000)]
+		other_order.save()
+		order = Order(product_owner_id=self.test_user, client_name="ada", order_date="2025-07-22", delivery_date="2025-07-30")
+		order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=2, price=6000), OrderedProduct(name="Safety Boots", quantity=1, price=65000)]
+		order.save()
+		delivered_order = Order(product_owner_id=self.test_user, client_name="joe", status="Delivered", order_date="2025-07-20")
+		delivered_order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=1, price=6000)]
+		delivered_order.save()
+
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.post(
+			reverse("orders-deliver", args=["v1"]),
+			{"ids": [self.test_order.id, order.id, delivered_order.id, other_order.id, 9999]}, format="json"
+		)
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"], {"delivered": [self.test_order.id, order.id], "skipped": [delivered_order.id, other_order.id, 9999]})
+
+		self.test_order.refresh_from_db()
+		order.refresh_from_db()
+		other_order.refresh_from_db()
+		self.assertEqual((self.test_order.status, self.test_order.delivery_date), ("Delivered", date.today()))
+		self.assertEqual((order.status, order.delivery_date), ("Delivered", date(2025, 7, 30)))
+		self.assertEqual(other_order.status, "Pending")
+
+		response = self.client.get(reverse("orders-stats", args=["v1"]), format="json")
+		self.assertEqual(response.data["data"], {"total_orders": 3, "total_revenue": 123000, "pending_orders": 0})
+		rollups = self.rollups()
+		self.assertEqual(rollups[0], [(date(2025, 7, 20), 46000, 2), (date(2025, 7, 22), 77000, 1)])
+		rebuild_rollups(self.test_user.id)
+		self.assertEqual(self.rollups(), rollups)
+		self.assertEqual(reconcile_tenant_stats(self.test_user.id), [])
+
+	def test_deliver_orders_up_to_a_date(self):
+		order = Order(product_owner_id=self.test_user, client_name="ada", order_date="2025-07-22")
+		order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=2, price=6000)]
+		order.save()
+
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.post(reverse("orders-deliver", args=["v1"]), {"end_date": "2025-07-21"}, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"], {"delivered": [self.test_order.id], "skipped": []})
+		order.refresh_from_db()
+		self.assertEqual(order.status, "Pending")
+
+		response = self.client.post(reverse("orders-deliver", args=["v1"]), {"end_date": "2025-07-21"}, format="json")
+		self.assertEqual(response.data["data"], {"delivered": [], "skipped": []})
+
+	def test_deliver_orders_with_invalid_body(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		url = reverse("orders-deliver", args=["v1"])
+		for body, detail in [
+			({}, "Either 'ids' or 'end_date' is required"),
+			({"ids": [1], "end_date": "2025-07-21"}, "Either 'ids' or 'end_date' is required"),
+			({"ids": "1,2"}, "'ids' must be a list of order ids"),
+			({"ids": [1, "2"]}, "'ids' must be a list of order ids"),
+			({"ids": [2**70]}, "'ids' must be a list of order ids"),
+			({"ids": [0]}, "'ids' must be a list of order ids"),
+			({"ids": list(range(1, 102))}, "A request can't have more than 100 order ids"),
+			({"end_date": "21-07-2025"}, "Invalid date format. Use YYYY-MM-DD"),
+		]:
+			response = self.client.post(url, body, format="json")
+			self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertEqual(response.data["detail"], detail)
+
+		self.client.credentials()
+		response = self.client.post(url, {"ids": [self.test_order.id]}, format="json")
+		self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+	def test_sync_orders(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		url = reverse("orders-sync", args=["v1"])
+		other_order = Order(product_owner_id=self.test_user, client_name="ann", order_date="2025-07-21")
+		other_order.ordered_products_objects = [OrderedProduct(name="Calculator", quantity=2, price=10000)]
+		other_order.save()
+		third_order = Order(product_owner_id=self.test_user, client_name="tim", order_date="2025-07-22")
+		third_order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=1, price=6000)]
+		third_order.save()
+
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual([order["id"] for order in response.data["data"]["changed"]], [self.test_order.id, other_order.id, third_order.id])
+		token = response.data["data"]["next"]
+
+		with patch("bizease.sync.SYNC_OVERLAP", timedelta(0)):
+			response = self.client.get(url, query_params={"since": token})
+			self.assertEqual(response.data["data"]["changed"], [])
+
+			# changing an ordered product returns its order with all its ordered products
+			self.client.post(
+				reverse("ordered-products", args=["v1", self.test_order.id]), {"name": "Safety Boots", "quantity": 1, "price": 65000}, format="json"
+			)
+			self.client.post(reverse("orders-deliver", args=["v1"]), {"ids": [other_order.id]}, format="json")
+			self.client.delete(reverse("order", args=["v1", third_order.id]))
+			response = self.client.get(url, query_params={"since": token})
+			self.assertEqual(response.status_code, status.HTTP_200_OK)
+			changed = response.data["data"]["changed"]
+			self.assertEqual([order["id"] for order in changed], [self.test_order.id, other_order.id])
+			self.assertEqual([product["name"] for product in changed[0]["ordered_products"]], ["Calculator", "Helmet", "Safety Boots"])
+			self.assertEqual(changed[1]["status"], "Delivered")
+			self.assertEqual(response.data["data"]["deleted"], [third_order.id])
+
+			ordered_product = self.test_order.ordered_products.get(name="Helmet")
+			token = response.data["data"]["next"]
+			self.client.delete(reverse("ordered-product", args=["v1", self.test_order.id, ordered_product.id]))
+			response = self.client.get(url, query_params={"since": token})
+			changed = response.data["data"]["changed"]
+			self.assertEqual([order["id"] for order in changed], [self.test_order.id])
+			self.assertEqual([product["name"] for product in changed[0]["ordered_products"]], ["Calculator", "Safety Boots"])
+			self.assertEqual(response.data["data"]["deleted"], [])
+
+		for since in ["yesterday", "²"]:
+			response = self.client.get(url, query_params={"since": since})
+			self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+			self.assertEqual(response.data["detail"], "Invalid sync token")
+
+	def test_search_orders(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		order = Order(product_owner_id=self.test_user, client_name="Helmut", client_phone="08012345678", order_date="2025-07-21")
+		order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=1, price=6000), OrderedProduct(name="Safety Boots", quantity=1, price=65000)]
+		order.save()
+
+		# an order is returned once even if several of its ordered products match
+		response = self.client.get(reverse("orders", args=["v1"]), query_params={"query": "hel", "page": 1}, format='json')
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["page_count"], 1)
+		self.assertCountEqual([order["id"] for order in response.data["data"]["orders"]], [self.test_order.id, order.id])
+
+		response = self.client.get(reverse("orders", args=["v1"]), query_params={"query": "helmut boots"}, format='json')
+		self.assertEqual([order["id"] for order in response.data["data"]["orders"]], [order.id])
+		response = self.client.get(reverse("orders", args=["v1"]), query_params={"query": "08012345678"}, format='json')
+		self.assertEqual([order["id"] for order in response.data["data"]["orders"]], [order.id])
+		response = self.client.get(reverse("orders", args=["v1"]), query_params={"query": "bob@gmail"}, format='json')
+		self.assertEqual([order["id"] for order in response.data["data"]["orders"]], [self.test_order.id])
+
 class OrderedProductViewTest(APITransactionTestCase):
 	def setUp(self):
 		self.user = CustomUser.objects.create(
@@ -459,6 +611,7 @@ class OrderedProductViewTest(APITransactionTestCase):
 		
 		response = self.client.delete(reverse("ordered-product", args=["v1", str(self.order.id), str(self.ordered_product.id)]), format="json")
 		self.assertRaises(OrderedProduct.DoesNotExist, OrderedProduct.objects.get, pk=self.ordered_product.id)
+		self.assertEqual(Order.objects.get(pk=self.order.id).ordered_products.count(), 1)
 		self.assertEqual(response.data["detail"], "Ordered product deleted successfully")
 		self.assertEqual(response.status_code, status.HTTP_200_OK)
 
@@ -469,6 +622,22 @@ class OrderedProductViewTest(APITransactionTestCase):
 		self.assertEqual(response.data["detail"], "The only ordered product of an order can't be deleted. An Order must have at least one ordered product")
 		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+	def test_ordered_product_changes_update_order_search(self):
+		Inventory.objects.create(owner=self.user, product_name="Plate", price=1500, stock_level=100, date_added="2025-05-15")
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.post(reverse("ordered-products", args=["v1", str(self.order.id)]), {"name": "Plate", "quantity": 2, "price": 1500}, format="json")
+		self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(Order.objects.get(pk=self.order.id).ordered_product_names, "Cup\nPlate")
+
+		response = self.client.get(reverse("orders", args=["v1"]), query_params={"query": "plate"}, format='json')
+		self.assertEqual([order["id"] for order in response.data["data"]["orders"]], [self.order.id])
+
+		response = self.client.delete(reverse("ordered-product", args=["v1", str(self.order.id), str(self.ordered_product.id)]), format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(Order.objects.get(pk=self.order.id).ordered_product_names, "Plate")
+		response = self.client.get(reverse("orders", args=["v1"]), query_params={"query": "cup"}, format='json')
+		self.assertEqual(response.data["data"]["orders"], [])
+
 	def test_delete_ordered_product_of_delivered_order(self):
 		self.order.status = "Delivered"
 		self.order.save()
@@ -478,3 +647,64 @@ class OrderedProductViewTest(APITransactionTestCase):
 		response = self.client.delete(reverse("ordered-product", args=["v1", str(self.order.id), str(self.ordered_product.id)]), format="json")
 		self.assertEqual(response.data["detail"], "Only the Ordered products of Pending Orders can be deleted")
 		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrdersExportViewTest(APITransactionTestCase):
+	def setUp(self):
+		self.test_user = CustomUser.objects.create(
+			business_name="user-biz", full_name="test user", email="testuser123@gmail.com", password="12345678", is_active=True
+		)
+		self.access_token = str(VersionedRefreshToken.for_user(self.test_user).access_token)
+
+		Inventory.objects.create(owner=self.test_user, product_name="Calculator", price=10000, stock_level=100, date_added="2025-05-15")
+		Inventory.objects.create(owner=self.test_user, product_name="Helmet", price=6000, stock_level=45, date_added="2025-05-15")
+
+		self.order_1 = Order(product_owner_id=self.test_user, client_name="bob", client_email="bob@gmail.com", order_date="2025-07-20")
+		self.order_1.ordered_products_objects = [OrderedProduct(name="Calculator", quantity=1, price=10000), OrderedProduct(name="Helmet", quantity=5, price=6000)]
+		self.order_1.save()
+		self.order_2 = Order(product_owner_id=self.test_user, client_name="alice", status="Delivered", order_date="2025-06-02")
+		self.order_2.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=2, price=6000)]
+		self.order_2.save()
+
+	def test_export_orders_as_csv(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("orders-export", args=["v1"]))
+
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response["Content-Type"], "text/csv")
+		rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+		self.assertEqual(len(rows), 3) # one row per ordered product
+		self.assertEqual([row["client_name"] for row in rows], ["bob", "bob", "alice"])
+		self.assertEqual({row["product_name"] for row in rows[:2]}, {"Calculator", "Helmet"})
+		self.assertEqual(rows[2]["status"], "Delivered")
+		self.assertEqual(rows[2]["quantity"], "2")
+		self.assertEqual(rows[2]["cummulative_price"], "12000.00")
+		self.assertEqual(rows[2]["order_date"], "2025-06-02")
+
+	def test_export_orders_as_ndjson_with_filters(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("orders-export", args=["v1"]), query_params={"file_type": "ndjson", "query": "helm"})
+		orders = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+		self.assertEqual(response["Content-Type"], "application/x-ndjson")
+		self.assertCountEqual([order["id"] for order in orders], [self.order_1.id, self.order_2.id])
+		self.assertIn(json.loads(json.dumps(OrderSerializer(self.order_1).data, cls=DjangoJSONEncoder)), orders)
+
+		response = self.client.get(
+			reverse("orders-export", args=["v1"]), query_params={"file_type": "ndjson", "status": "pending", "start_date": "2025-07-01", "end_date": "2025-07-31"}
+		)
+		orders = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+		self.assertEqual([order["id"] for order in orders], [self.order_1.id])
+
+		response = self.client.get(reverse("orders-export", args=["v1"]), query_params={"file_type": "ndjson", "end_date": "2025-06-01"})
+		self.assertEqual(b"".join(response.streaming_content), b"")
+
+	def test_export_orders_with_invalid_params(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("orders-export", args=["v1"]), query_params={"file_type": "json"})
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		response = self.client.get(reverse("orders-export", args=["v1"]), query_params={"start_date": "yesterday"})
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_export_orders_without_credentials(self):
+		response = self.client.get(reverse("orders-export", args=["v1"]))
+		self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
@@ -4,6 +4,9 @@ from django.urls import path
 urlpatterns = [
 	path('', views.OrdersView.as_view(), name="orders"),
 	path('stats', views.OrderStatsView.as_view(), name="orders-stats"),
+	path('export', views.OrdersExportView.as_view(), name="orders-export"),
+	path('sync', views.OrdersSyncView.as_view(), name="orders-sync"),
+	path('deliver', views.OrdersDeliveryView.as_view(), name="orders-deliver"),
 	path('<int:order_id>', views.SingleOrderView.as_view(), name="order"),
 	path('<int:order_id>/ordered-products/<int:product_id>', views.SingleOrderedProductView.as_view(), name="ordered-product"),
 	path('<int:order_id>/ordered-products', views.OrderedProductsView.as_view(), name="ordered-products"),
@@ -1,28 +1,42 @@
 from rest_framework.permissions import IsAuthenticated
+from accounts.authentication import ClaimsJWTAuthentication
 from rest_framework.parsers import JSONParser
 from rest_framework.views import APIView
 from .serializers import OrderSerializer, OrderedProductSerializer
 from rest_framework.response import Response
-from .models import Order, OrderedProduct
+from .models import Order, OrderedProduct, deliver_orders
 from rest_framework import status
-from django.db.models import Sum, F, Q
+from bizease.tenant_cache import cache_tenant_response
+from bizease.fulltext import full_text_search
+from bizease.exports import get_export_file_type, get_export_date_range, export_response, EXPORT_CHUNK_SIZE
+from bizease.sync import sync_response
+from datetime import datetime
+from reports.rollups import get_tenant_stats
+from django.db import connection
 import math
 
+DELIVERY_MAX_IDS = 100
+ORDER_ID_MAX = connection.ops.integer_field_range(Order._meta.pk.get_internal_type())[1]
+
 
 class OrderStatsView(APIView):
+	authentication_classes = [ClaimsJWTAuthentication]
 	permission_classes = [IsAuthenticated]
 	parser_classes = [JSONParser]
 
+	@cache_tenant_response
 	def get(self, request, **kwargs):
+		stats = get_tenant_stats(request.user.id) # maintained on every order write, see reports.rollups
 		data = {
-			"total_orders": Order.objects.filter(product_owner_id=request.user.id).count(),
-			"total_revenue": Order.objects.filter(product_owner_id=request.user.id).filter(status="Delivered").aggregate(Sum("total_price"))['total_price__sum'],
-			"pending_orders": Order.objects.filter(product_owner_id=request.user.id).filter(status="Pending").count()
+			"total_orders": stats.total_orders,
+			"total_revenue": stats.total_revenue if stats.total_orders > stats.pending_orders else None, # None without Delivered orders
+			"pending_orders": stats.pending_orders
 		}
 		return Response({"data": data}, status=status.HTTP_200_OK)
 
 class OrdersView(APIView):
 	parser_classes = [JSONParser]
+	authentication_classes = [ClaimsJWTAuthentication]
 	permission_classes = [IsAuthenticated]
 	page_size = 20
 	curr_queryset = None
@@ -41,8 +55,10 @@ class OrdersView(APIView):
 		query_str = self.request.GET.get('query')
 		if not query_str or len(self.request.GET.getlist('query')) != 1:
 			return self
-		self.curr_queryset = self.curr_queryset.filter(
-			Q(ordered_products__name__icontains=query_str) | Q(client_name__icontains=query_str)
+		# Searches the client's details and the names of the ordered products, best matches first
+		self.curr_queryset = full_text_search(
+			self.curr_queryset, query_str, Order.search_fields, "product_owner_id", self.request.user.id, weights=[10, 2, 2, 5],
+			then_order_by=["-order_date", "-id"]
 		)
 		return self
 
@@ -69,13 +85,13 @@ class OrdersView(APIView):
 			return None
 
 	def get(self, request, **kwargs):
-		self.curr_queryset = Order.objects.filter(product_owner_id=request.user.id)
+		self.curr_queryset = Order.objects.filter(product_owner_id=request.user.id).prefetch_related("ordered_products")
 		self.filter_data_by_query().filter_data_by_status().order_data()
 
 		page_param = self.get_page_param()
 
 		if page_param:
-			page_count = math.ceil(len(self.curr_queryset)/self.page_size)
+			page_count = math.ceil(self.curr_queryset.count()/self.page_size)
 			if (page_count < page_param) or (page_param <= 0):
 				return Response({"detail": "Page Not found", "data": None}, status=status.HTTP_404_NOT_FOUND)
 
@@ -125,13 +141,95 @@ class OrdersView(APIView):
 			return Response({"detail": order_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class OrdersExportView(OrdersView):
+	"""
+	Streams all the orders that match the filters of OrdersView as csv or ndjson. Each line of the csv is an ordered
+	product with the details of its order while each ndjson line is an order with its ordered products
+	"""
+	order_fields = ['id', 'client_name', 'client_email', 'client_phone', 'status', 'total_price', 'order_date', 'delivery_date']
+	ordered_product_fields = ['product_id', 'product_name', 'quantity', 'price', 'cummulative_price']
+
+	def csv_rows(self, orders):
+		for order in orders:
+			ordered_products = order.pop("ordered_products")
+			if not ordered_products:
+				yield order
+			for product in ordered_products:
+				yield {
+					**order, "product_id": product["id"], "product_name": product["name"], "quantity": product["quantity"],
+					"price": product["price"], "cummulative_price": product["cummulative_price"]
+				}
+
+	def get(self, request, **kwargs):
+		file_type = get_export_file_type(request)
+		if file_type is None:
+			return Response({"detail": "Invalid value for file_type parameter"}, status=status.HTTP_400_BAD_REQUEST)
+		date_range = get_export_date_range(request)
+		if date_range.get("error"):
+			return Response({"detail": date_range["error"]}, status=status.HTTP_400_BAD_REQUEST)
+
+		self.curr_queryset = Order.objects.filter(product_owner_id=request.user.id).prefetch_related("ordered_products")
+		self.filter_data_by_query().filter_data_by_status().order_data()
+		if date_range.get("start_date"):
+			self.curr_queryset = self.curr_queryset.filter(order_date__gte=date_range["start_date"])
+		if date_range.get("end_date"):
+			self.curr_queryset = self.curr_queryset.filter(order_date__lte=date_range["end_date"])
+
+		serializer = OrderSerializer()
+		orders = (serializer.to_representation(order) for order in self.curr_queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+		if file_type == "csv":
+			return export_response(self.csv_rows(orders), file_type, self.order_fields + self.ordered_product_fields, "orders")
+		return export_response(orders, file_type, None, "orders")
+
+class OrdersSyncView(APIView):
+	"""
+	The orders changed and the ids of the ones deleted since the 'since' token, see bizease/sync.py. Changing an
+	ordered product updates its order, so changed orders come with all their current ordered products
+	"""
+	parser_classes = [JSONParser]
+	authentication_classes = [ClaimsJWTAuthentication]
+	permission_classes = [IsAuthenticated]
+
+	def get(self, request, **kwargs):
+		queryset = Order.objects.filter(product_owner_id=request.user.id).prefetch_related("ordered_products")
+		return sync_response(request, queryset, "updated_at", "orders", OrderSerializer)
+
+class OrdersDeliveryView(APIView):
+	""" Marks many Pending orders Delivered at once: the given 'ids' or all the orders up to 'end_date' """
+	parser_classes = [JSONParser]
+	authentication_classes = [ClaimsJWTAuthentication]
+	permission_classes = [IsAuthenticated]
+
+	def post(self, request, **kwargs):
+		data = request.data if isinstance(request.data, dict) else {}
+		order_ids, end_date = data.get("ids"), data.get("end_date")
+		if (order_ids is None) == (end_date is None) or set(data) - {"ids", "end_date"}:
+			return Response({"detail": "Either 'ids' or 'end_date' is required"}, status=status.HTTP_400_BAD_REQUEST)
+		if order_ids is not None:
+			if not isinstance(order_ids, list) or not all(type(order_id) == int and 0 < order_id <= ORDER_ID_MAX for order_id in order_ids):
+				return Response({"detail": "'ids' must be a list of order ids"}, status=status.HTTP_400_BAD_REQUEST)
+			if len(order_ids) > DELIVERY_MAX_IDS:
+				return Response({"detail": f"A request can't have more than {DELIVERY_MAX_IDS} order ids"}, status=status.HTTP_400_BAD_REQUEST)
+		else:
+			try:
+				end_date = datetime.strptime(str(end_date), "%Y-%m-%d").date()
+			except ValueError:
+				return Response({"detail": "Invalid date format. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+
+		delivered = deliver_orders(request.user.id, order_ids=order_ids, end_date=end_date)
+		# orders that don't exist, belong to someone else or were already Delivered
+		delivered_ids = set(delivered)
+		skipped = list(dict.fromkeys(order_id for order_id in order_ids or [] if order_id not in delivered_ids))
+		return Response({"detail": "Orders delivered", "data": {"delivered": delivered, "skipped": skipped}}, status=status.HTTP_200_OK)
+
 class SingleOrderView(APIView):
 	parser_classes = [JSONParser]
+	authentication_classes = [ClaimsJWTAuthentication]
 	permission_classes = [IsAuthenticated]
 
 	def get(self, request, order_id, **kwargs):
 		try:
-			item = Order.objects.filter(product_owner_id=request.user.id).get(pk=order_id)
+			item = Order.objects.filter(product_owner_id=request.user.id).prefetch_related("ordered_products").get(pk=order_id)
 		except Order.DoesNotExist:
 			return Response({"detail": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
 		except Order.MultipleObjectsReturned: # This shouldn't be possible but it's handled anyways
@@ -182,6 +280,7 @@ class SingleOrderView(APIView):
 
 class OrderedProductsView(APIView):
 	parser_classes = [JSONParser]
+	authentication_classes = [ClaimsJWTAuthentication]
 	permission_classes = [IsAuthenticated]
 
 	def post(self, request, order_id, **kwargs):
@@ -202,6 +301,7 @@ class OrderedProductsView(APIView):
 
 class SingleOrderedProductView(APIView):
 	parser_classes = [JSONParser]
+	authentication_classes = [ClaimsJWTAuthentication]
 	permission_classes = [IsAuthenticated]
 
 	def get(self, request, order_id, product_id, **kwargs):
@@ -255,7 +355,7 @@ class SingleOrderedProductView(APIView):
 				status=status.HTTP_400_BAD_REQUEST
 			)
 
-		del_count, del_dict = item.delete()
+		del_count, del_dict = product.delete()
 		if (del_count > 0):
 			return Response({"detail": "Ordered product deleted successfully"}, status=status.HTTP_200_OK)
 		else: # What could go wrong?
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from bizease.sync import purge_tombstones, SYNC_TOMBSTONE_DAYS
+
+
+class Command(BaseCommand):
+    help = (
+        f"Deletes the records of deleted inventory items and orders older than {SYNC_TOMBSTONE_DAYS} days, which the "
+        "sync endpoints no longer read. Schedule it (e.g. daily from cron)"
+    )
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} tombstones"))
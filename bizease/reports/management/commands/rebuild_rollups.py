@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from reports.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the daily sales rollup tables from the orders tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, help="Only rebuild the rollups of the user with this id")
+
+    def handle(self, *args, **options):
+        rebuild_rollups(options["owner"])
+        target = f"user {options['owner']}" if options["owner"] is not None else "all users"
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt daily sales rollups for {target}"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from reports.rollups import reconcile_tenant_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the inventory and order stats of users from the inventory and orders tables and repairs the ones that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, help="Only reconcile the stats of the user with this id")
+
+    def handle(self, *args, **options):
+        repaired = reconcile_tenant_stats(options["owner"])
+        target = f"user {options['owner']}" if options["owner"] is not None else "all users"
+        self.stdout.write(self.style.SUCCESS(f"Reconciled stats for {target}, {len(repaired)} repaired"))
+        if repaired and options["verbosity"] > 1:
+            self.stdout.write("Repaired users: " + ", ".join(str(owner_id) for owner_id in repaired))
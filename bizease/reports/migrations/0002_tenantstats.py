@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_tenant_stats(apps, schema_editor):
+    """ Same computation as reports.rollups.compute_tenant_stats, with the historical models """
+    CustomUser = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Inventory = apps.get_model("inventory", "Inventory")
+    Order = apps.get_model("orders", "Order")
+    TenantStats = apps.get_model("reports", "TenantStats")
+
+    money = DecimalField(max_digits=20, decimal_places=2)
+    stats = {owner_id: {} for owner_id in CustomUser.objects.values_list("id", flat=True)}
+    for row in Inventory.objects.values("owner_id").order_by().annotate(
+        total_products=Count("id"), low_stock_count=Count("id", filter=Q(is_low_stock=True)),
+        total_stock_value=Coalesce(Sum(F("stock_level") * F("price"), output_field=money), 0, output_field=money)
+    ):
+        stats[row.pop("owner_id")].update(row)
+    for row in Order.objects.values("product_owner_id").order_by().annotate(
+        total_orders=Count("id"), pending_orders=Count("id", filter=Q(status="Pending")),
+        total_revenue=Coalesce(Sum("total_price", filter=Q(status="Delivered"), output_field=money), 0, output_field=money)
+    ):
+        stats[row.pop("product_owner_id")].update(row)
+    TenantStats.objects.bulk_create((TenantStats(owner_id=owner_id, **values) for owner_id, values in stats.items()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('inventory', '0014_inventory_is_low_stock'),
+        ('orders', '0014_order_order_owner_date_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantStats',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_products', models.IntegerField(default=0)),
+                ('low_stock_count', models.IntegerField(default=0)),
+                ('total_stock_value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('total_orders', models.IntegerField(default=0)),
+                ('pending_orders', models.IntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+        ),
+        migrations.RunPython(fill_tenant_stats, migrations.RunPython.noop),
+    ]
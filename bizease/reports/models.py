@@ -1 +1,78 @@
 from django.db import models
+from django.utils import timezone
+from accounts.models import CustomUser
+
+
+class DailySales(models.Model):
+    """ Revenue and number of Delivered orders per owner per order date. Maintained by reports.rollups """
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    date = models.DateField()
+    revenue = models.DecimalField(default=0, max_digits=20, decimal_places=2)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "date"], name="unique_daily_sales_per_owner")
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} - {self.date} - {self.revenue}"
+
+
+class DailyProductSales(models.Model):
+    """ Units sold and revenue per owner per order date per product of Delivered orders. Maintained by reports.rollups """
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    date = models.DateField()
+    product_name = models.CharField(max_length=100)
+    units_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(default=0, max_digits=20, decimal_places=2)
+
+    class Meta:
+        ordering = ["-date", "product_name"]
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "date", "product_name"], name="unique_daily_product_sales_per_owner")
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} - {self.date} - {self.product_name}({self.units_sold})"
+
+
+class TenantStats(models.Model):
+    """
+    Inventory and order totals of one owner, read by the inventory and orders stats endpoints. Updated in the same
+    transaction as the inventory and order writes by reports.rollups and repaired by the 'reconcile_stats' command
+    """
+    owner = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True)
+    total_products = models.IntegerField(default=0)
+    low_stock_count = models.IntegerField(default=0)
+    total_stock_value = models.DecimalField(default=0, max_digits=20, decimal_places=2)
+    total_orders = models.IntegerField(default=0)
+    pending_orders = models.IntegerField(default=0)
+    total_revenue = models.DecimalField(default=0, max_digits=20, decimal_places=2) # of Delivered orders
+
+    def __str__(self):
+        return f"{self.owner_id} - {self.total_products} products - {self.total_orders} orders"
+
+
+class Tombstone(models.Model):
+    """
+    An inventory item or order that was deleted, so the sync endpoints (bizease/sync.py) can tell clients to drop
+    it. Written by the delete() of the models and removed by the 'purge_tombstones' command once it's too old
+    """
+    RESOURCES = {"inventory": "inventory", "orders": "orders"}
+
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    resource = models.CharField(max_length=20, choices=RESOURCES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["deleted_at"]
+        indexes = [
+            models.Index(fields=["owner", "resource", "deleted_at"], name="tombstone_owner_deleted_idx"),
+            models.Index(fields=["deleted_at"], name="tombstone_deleted_idx"), # for the purge
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} - {self.resource} {self.object_id}"
@@ -0,0 +1,235 @@
+from django.db import connections, router, transaction
+from django.db.models import Sum, Count, F, Q, DecimalField
+from django.db.models.functions import Coalesce
+from .models import DailySales, DailyProductSales, TenantStats
+from bizease.tenant_cache import invalidate_tenant, invalidate_all_tenants
+from django.utils.dateparse import parse_date
+from datetime import datetime
+
+
+def to_date(value):
+    """ Order dates can still be strings on instances that haven't been reloaded from the db """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return parse_date(value)
+    return value
+
+
+class SalesDelta:
+    """
+    Collects changes to the daily sales of one owner so that they can be written to the rollup tables
+    in a fixed number of queries. All values can be negative to take sales back out of the rollups.
+    """
+    def __init__(self, owner_id):
+        self.owner_id = owner_id
+        self.daily = {} # date -> [revenue, order_count]
+        self.products = {} # (date, product_name) -> [units_sold, revenue]
+        self.stats = {} # TenantStats field -> change, e.g. {"total_orders": 1}
+
+    def add_stats(self, **changes):
+        for field, change in changes.items():
+            self.stats[field] = self.stats.get(field, 0) + change
+
+    def add_product(self, order_date, product_name, units_sold, revenue, sign=1):
+        order_date = to_date(order_date)
+        self.daily.setdefault(order_date, [0, 0])[0] += sign * revenue
+        totals = self.products.setdefault((order_date, product_name), [0, 0])
+        totals[0] += sign * units_sold
+        totals[1] += sign * revenue
+
+    def add_order_with_products(self, order_date, products, sign=1):
+        """ products - an iterable of (product_name, quantity, cummulative_price) """
+        self.daily.setdefault(to_date(order_date), [0, 0])[1] += sign
+        for name, quantity, cummulative_price in products:
+            self.add_product(order_date, name, quantity, cummulative_price, sign)
+
+    def save(self):
+        """
+        Applies the collected changes. The stats change is a single UPDATE and the rollup changes are added to the rows
+        by the database (see add_to_rows), so concurrent writers can't lose updates or both create the same row
+        """
+        daily = {k: v for k, v in self.daily.items() if v[0] or v[1]}
+        products = {k: v for k, v in self.products.items() if v[0] or v[1]}
+        update_tenant_stats(self.owner_id, total_revenue=sum(revenue for revenue, _ in daily.values()), **self.stats)
+        if daily or products:
+            with transaction.atomic():
+                self.save_rollups(daily, products)
+
+    def save_rollups(self, daily, products):
+        if daily:
+            add_to_rows(DailySales, ["owner", "date"], ["revenue", "order_count"], [
+                {"owner": self.owner_id, "date": sales_date, "revenue": revenue, "order_count": order_count}
+                for sales_date, (revenue, order_count) in daily.items()
+            ])
+            # only a decrease can leave a date without orders
+            if any(order_count < 0 for _, order_count in daily.values()):
+                DailySales.objects.filter(owner_id=self.owner_id, date__in=list(daily), order_count__lte=0).delete()
+
+        if products:
+            add_to_rows(DailyProductSales, ["owner", "date", "product_name"], ["units_sold", "revenue"], [
+                {"owner": self.owner_id, "date": sales_date, "product_name": name, "units_sold": units_sold, "revenue": revenue}
+                for (sales_date, name), (units_sold, revenue) in products.items()
+            ])
+            if any(units_sold < 0 for units_sold, _ in products.values()):
+                DailyProductSales.objects.filter(
+                    owner_id=self.owner_id, date__in={k[0] for k in products}, product_name__in={k[1] for k in products}, units_sold__lte=0
+                ).delete()
+
+
+def add_to_rows(model, unique_fields, added_fields, rows):
+    """
+    Adds the values of added_fields to the rows of model that have the same unique_fields values, inserting the rows that
+    don't exist yet, with 'INSERT ... ON CONFLICT (unique_fields) DO UPDATE SET field = field + EXCLUDED.field'. The
+    database adds the values to the current row, so concurrent writers neither overwrite each other's changes nor fail
+    on the unique constraint when both insert the same new row. rows are dicts of field name -> value
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    fields = [model._meta.get_field(name) for name in unique_fields + added_fields]
+    row_sql = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    conflict = ", ".join(quote(model._meta.get_field(name).column) for name in unique_fields)
+    updates = ", ".join(
+        f"{quote(column)} = {table}.{quote(column)} + EXCLUDED.{quote(column)}"
+        for column in (model._meta.get_field(name).column for name in added_fields)
+    )
+    batch_size = connection.ops.bulk_batch_size(fields, rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(quote(field.column) for field in fields)}) VALUES {', '.join([row_sql] * len(batch))} "
+                f"ON CONFLICT ({conflict}) DO UPDATE SET {updates}",
+                [field.get_db_prep_save(row[field.name], connection) for row in batch for field in fields]
+            )
+
+
+def compute_tenant_stats(owner_ids=None):
+    """ Computes the TenantStats values of the given owners (all owners if None) from the inventory and orders tables """
+    from inventory.models import Inventory
+    from orders.models import Order
+
+    inventory = Inventory.objects.all()
+    orders = Order.objects.all()
+    if owner_ids is not None:
+        inventory = inventory.filter(owner_id__in=owner_ids)
+        orders = orders.filter(product_owner_id__in=owner_ids)
+
+    money = DecimalField(max_digits=20, decimal_places=2)
+    stats = {}
+    for row in (
+        inventory.values("owner_id").order_by()
+        .annotate(
+            total_products=Count("id"), low_stock_count=Count("id", filter=Q(is_low_stock=True)),
+            total_stock_value=Coalesce(Sum(F("stock_level") * F("price"), output_field=money), 0, output_field=money)
+        )
+    ):
+        stats[row.pop("owner_id")] = row
+    for row in (
+        orders.values("product_owner_id").order_by()
+        .annotate(
+            total_orders=Count("id"), pending_orders=Count("id", filter=Q(status="Pending")),
+            total_revenue=Coalesce(Sum("total_price", filter=Q(status="Delivered"), output_field=money), 0, output_field=money)
+        )
+    ):
+        stats.setdefault(row.pop("product_owner_id"), {}).update(row)
+    return stats
+
+
+def update_tenant_stats(owner_id, **changes):
+    """
+    Adds the changes to the owner's TenantStats row in one UPDATE, so concurrent writers can't lose updates.
+    A missing row is computed from the tables, which already include the change when this is called after the write
+    """
+    changes = {field: change for field, change in changes.items() if change}
+    if not changes:
+        return
+    if not TenantStats.objects.filter(owner_id=owner_id).update(**{field: F(field) + change for field, change in changes.items()}):
+        get_tenant_stats(owner_id)
+
+
+def get_tenant_stats(owner_id):
+    """ The owner's TenantStats. Creates it from the inventory and orders tables if it doesn't exist yet """
+    try:
+        return TenantStats.objects.get(owner_id=owner_id)
+    except TenantStats.DoesNotExist:
+        stats, _ = TenantStats.objects.update_or_create(owner_id=owner_id, defaults=compute_tenant_stats([owner_id]).get(owner_id, {}))
+        return stats
+
+
+@transaction.atomic
+def reconcile_tenant_stats(owner_id=None):
+    """
+    Recomputes the TenantStats of an owner (every owner if no owner_id is given) and repairs the rows that drifted,
+    e.g. after writes with QuerySet.update(). Returns the ids of the owners whose stats were created or repaired.
+    The rows are locked before the tables are read, so writes that commit meanwhile are added on top of the new values
+    """
+    from accounts.models import CustomUser
+
+    owners = CustomUser.objects.all() if owner_id is None else CustomUser.objects.filter(pk=owner_id)
+    owner_ids = list(owners.values_list("id", flat=True))
+    existing = {row.owner_id: row for row in TenantStats.objects.select_for_update().filter(owner_id__in=owner_ids)}
+    computed = compute_tenant_stats(None if owner_id is None else owner_ids)
+    fields = [field.name for field in TenantStats._meta.concrete_fields if not field.primary_key]
+
+    to_create, to_update = [], []
+    for pk in owner_ids:
+        expected = TenantStats(owner_id=pk, **computed.get(pk, {}))
+        row = existing.get(pk)
+        if row is None:
+            to_create.append(expected)
+        elif any(getattr(row, field) != getattr(expected, field) for field in fields):
+            for field in fields:
+                setattr(row, field, getattr(expected, field))
+            to_update.append(row)
+    TenantStats.objects.bulk_create(to_create, batch_size=1000)
+    TenantStats.objects.bulk_update(to_update, fields, batch_size=1000)
+
+    repaired = [row.owner_id for row in to_create + to_update]
+    for pk in repaired:
+        invalidate_tenant(pk)
+    return repaired
+
+
+@transaction.atomic
+def rebuild_rollups(owner_id=None):
+    """ Recomputes the rollup tables from the orders tables. Rebuilds every owner's rollups if no owner_id is given """
+    from orders.models import Order, OrderedProduct
+
+    daily_sales = DailySales.objects.all()
+    product_sales = DailyProductSales.objects.all()
+    orders = Order.objects.filter(status="Delivered")
+    ordered_products = OrderedProduct.objects.filter(order_id__status="Delivered")
+    if owner_id is not None:
+        daily_sales = daily_sales.filter(owner_id=owner_id)
+        product_sales = product_sales.filter(owner_id=owner_id)
+        orders = orders.filter(product_owner_id=owner_id)
+        ordered_products = ordered_products.filter(order_id__product_owner_id=owner_id)
+
+    daily_sales.delete()
+    product_sales.delete()
+
+    DailySales.objects.bulk_create(
+        (
+            DailySales(owner_id=row["product_owner_id"], date=row["order_date"], revenue=row["revenue"], order_count=row["order_count"])
+            for row in orders.values("product_owner_id", "order_date").annotate(revenue=Sum("total_price"), order_count=Count("id")).order_by()
+        ),
+        batch_size=1000
+    )
+    DailyProductSales.objects.bulk_create(
+        (
+            DailyProductSales(
+                owner_id=row["order_id__product_owner_id"], date=row["order_id__order_date"], product_name=row["name"],
+                units_sold=row["units_sold"], revenue=row["revenue"]
+            )
+            for row in ordered_products.values("order_id__product_owner_id", "order_id__order_date", "name")
+            .annotate(units_sold=Sum("quantity"), revenue=Sum("cummulative_price")).order_by()
+        ),
+        batch_size=1000
+    )
+    # the rollups are written in bulk so no signal invalidates the cached reports
+    if owner_id is not None:
+        invalidate_tenant(owner_id)
+    else:
+        invalidate_all_tenants()
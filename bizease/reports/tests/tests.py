@@ -72,6 +72,16 @@ class ReportsViewsTest(APITransactionTestCase):
 		self.assertIn({"name": "Wheelbarrow", "quantity_sold": 1}, response.data["data"]["product_sales_chart_data"])
 		self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+	def test_all_time_top_selling_product_counts_only_delivered_orders(self):
+		pending_order = Order(product_owner_id=self.test_user, client_name="customer 2", client_phone="08045342896", order_date="2025-03-21")
+		pending_order.ordered_products_objects = [OrderedProduct(name="Tape", quantity=30, price=4000)]
+		pending_order.save()
+
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("reports", args=["v1"]), format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["top_selling_product"], "Helmet")
+
 	def test_get_reports_summary_without_credentials(self):
 		response = self.client.get(reverse("reports-summary", args=["v1"]), format="json")
 		self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -245,3 +255,109 @@ class ReportsViewsTest(APITransactionTestCase):
 		self.assertIn({'name': 'Tape', 'quantity_sold': 4, 'revenue': 16000.00, 'stock_status': 'in stock'}, response.data["data"]["summary"])
 		self.assertIn({'name': 'Wheelbarrow', 'quantity_sold': 1, 'revenue': 150000.00, 'stock_status': 'low stock'}, response.data["data"]["summary"])
 		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+	def test_get_reports_summary_out_of_stock_product(self):
+		self.item_3.delete()
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("reports-summary", args=["v1"]), format="json")
+
+		self.assertIn({'name': 'Tape', 'quantity_sold': 4, 'revenue': 16000.00, 'stock_status': 'out of stock'}, response.data["data"]["summary"])
+		self.assertIn({'name': 'Wheelbarrow', 'quantity_sold': 1, 'revenue': 150000.00, 'stock_status': 'low stock'}, response.data["data"]["summary"])
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+	@patch("reports.views.ReportDataSummaryView.page_size", 3)
+	def test_get_paginated_reports_summary(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("reports-summary", args=["v1"]), query_params={"page": 1}, format="json")
+
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["page_count"], 2)
+		self.assertEqual(response.data["data"]["next_page"], 2)
+		self.assertEqual(response.data["data"]["prev_page"], None)
+		self.assertEqual([row["name"] for row in response.data["data"]["summary"]], ["Helmet", "Safety Boots", "Tape"])
+
+		response = self.client.get(reverse("reports-summary", args=["v1"]), query_params={"page": 2}, format="json")
+		self.assertEqual(response.data["data"]["next_page"], None)
+		self.assertEqual(response.data["data"]["prev_page"], 1)
+		self.assertEqual(list(response.data["data"]["summary"]), [{'name': 'Wheelbarrow', 'quantity_sold': 1, 'revenue': 150000.00, 'stock_status': 'low stock'}])
+
+		response = self.client.get(reverse("reports-summary", args=["v1"]), query_params={"page": 3}, format="json")
+		self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+		# without a page parameter the first page is returned
+		response = self.client.get(reverse("reports-summary", args=["v1"]), format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["page_count"], 2)
+		self.assertEqual(response.data["data"]["next_page"], 2)
+		self.assertEqual(response.data["data"]["prev_page"], None)
+		self.assertEqual([row["name"] for row in response.data["data"]["summary"]], ["Helmet", "Safety Boots", "Tape"])
+
+		# a period without sales still has an (empty) first page
+		query_params = {"start_date": "2000-01-01", "end_date": "2000-01-31"}
+		response = self.client.get(reverse("reports-summary", args=["v1"]), query_params=query_params, format="json")
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(list(response.data["data"]["summary"]), [])
+		self.assertEqual(response.data["data"]["page_count"], 0)
+		self.assertEqual(response.data["data"]["next_page"], None)
+
+	def test_get_reports_with_month_granularity(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("reports", args=["v1"]), query_params={"granularity": "month"}, format="json")
+
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["chart_granularity"], "month")
+		self.assertEqual(response.data["data"]["date_revenue_chart_data"], [
+			{"date": date(2025, 3, 1), "revenue": 150000},
+			{"date": date(2025, 2, 1), "revenue": 0},
+			{"date": date(2025, 1, 1), "revenue": 0},
+			{"date": date(2024, 12, 1), "revenue": 206000},
+		])
+
+	@patch("reports.views.timezone", mock_django_timezone)
+	def test_get_reports_with_auto_granularity(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("reports", args=["v1"]), query_params={"period": "last-year", "granularity": "auto"}, format="json")
+
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["chart_granularity"], "week")
+		chart_data = response.data["data"]["date_revenue_chart_data"]
+		self.assertEqual(len(chart_data), 53)
+		self.assertTrue(all(point["date"].weekday() == 0 for point in chart_data))
+		self.assertEqual(chart_data[0], {"date": date(2025, 3, 17), "revenue": 150000})
+		self.assertIn({"date": date(2024, 12, 2), "revenue": 206000}, chart_data)
+		self.assertEqual(sum(point["revenue"] for point in chart_data), 356000)
+
+	def test_get_reports_with_day_granularity_in_date_range(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(
+			reverse("reports", args=["v1"]), query_params={"start_date": "2024-11-30", "end_date": "2025-01-05", "granularity": "day"}, format="json"
+		)
+
+		self.assertEqual(response.status_code, status.HTTP_200_OK)
+		self.assertEqual(response.data["data"]["period"], "2024-11-30 to 2025-01-05")
+		self.assertEqual(response.data["data"]["chart_granularity"], "day")
+		chart_data = response.data["data"]["date_revenue_chart_data"]
+		self.assertEqual(len(chart_data), 37)
+		self.assertEqual(chart_data[0], {"date": date(2025, 1, 5), "revenue": 0})
+		self.assertEqual(chart_data[-1], {"date": date(2024, 11, 30), "revenue": 0})
+		self.assertIn({"date": date(2024, 12, 2), "revenue": 206000}, chart_data)
+
+	def test_get_reports_granularity_is_capped(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		# 109 days of history is more than the allowed number of points so weeks are used
+		response = self.client.get(reverse("reports", args=["v1"]), query_params={"granularity": "day"}, format="json")
+		self.assertEqual(response.data["data"]["chart_granularity"], "week")
+		self.assertEqual(len(response.data["data"]["date_revenue_chart_data"]), 16)
+
+		with patch("reports.views.MAX_CHART_POINTS", 3):
+			response = self.client.get(reverse("reports", args=["v1"]), query_params={"granularity": "auto"}, format="json")
+		self.assertEqual(response.data["data"]["chart_granularity"], "month")
+		self.assertEqual(
+			[point["date"] for point in response.data["data"]["date_revenue_chart_data"]], [date(2025, 3, 1), date(2025, 2, 1), date(2025, 1, 1)]
+		)
+
+	def test_get_reports_with_invalid_granularity(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+		response = self.client.get(reverse("reports", args=["v1"]), query_params={"granularity": "hour"}, format="json")
+		self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(response.data["detail"], "Invalid value for granularity parameter")
@@ -0,0 +1,47 @@
+from rest_framework.test import APITestCase
+from accounts.models import CustomUser
+from bizease.synthetic_data import seed_tenant
+from bizease.testing import QueryBudgetMixin
+from accounts.authentication import VersionedRefreshToken
+from django.urls import reverse
+from django.test import override_settings
+from rest_framework import status
+from django.utils import timezone
+from datetime import timedelta
+import random
+
+
+@override_settings(TENANT_CACHE_TIMEOUT=0) # budgets are for computing the responses, not reading them from the cache
+class ReportsQueryBudgetTest(QueryBudgetMixin, APITestCase):
+	""" Endpoints must run a fixed number of queries regardless of how much data a user has """
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.test_user = CustomUser.objects.create(business_name="Big Shop", full_name="Big Shop", email="bigshop@gmail.com", password="12345678", is_active=True)
+		other_user = CustomUser.objects.create(business_name="Other Shop", full_name="Other Shop", email="othershop@gmail.com", password="12345678", is_active=True)
+		seed_tenant(cls.test_user, product_count=300, order_count=300, lines_per_order=4, rng=random.Random(1))
+		seed_tenant(other_user, product_count=100, order_count=50, rng=random.Random(2))
+
+	def setUp(self):
+		self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(VersionedRefreshToken.for_user(self.test_user).access_token))
+
+	def test_reports_query_budget(self):
+		budgets = [
+			({}, 9), ({"period": "last-month"}, 11), ({"period": "last-year"}, 11),
+			({"granularity": "auto"}, 10), ({"period": "last-year", "granularity": "day"}, 11)
+		]
+		for params, budget in budgets:
+			with self.assertMaxQueries(budget):
+				response = self.client.get(reverse("reports", args=["v1"]), query_params=params)
+			self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+	def test_reports_summary_query_budget(self):
+		today = timezone.now().date()
+		budgets = [
+			({}, 3), ({"period": "last-6-months"}, 3), ({"start_date": (today - timedelta(days=90)).isoformat(), "end_date": today.isoformat()}, 3),
+			({"page": 2}, 3), ({"period": "last-year", "page": 1}, 3)
+		]
+		for params, budget in budgets:
+			with self.assertMaxQueries(budget):
+				response = self.client.get(reverse("reports-summary", args=["v1"]), query_params=params)
+			self.assertEqual(response.status_code, status.HTTP_200_OK)
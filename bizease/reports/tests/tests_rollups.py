@@ -0,0 +1,87 @@
+from django.test import TestCase
+from django.core.management import call_command
+from orders.models import Order, OrderedProduct
+from orders.serializers import OrderSerializer
+from accounts.models import CustomUser
+from inventory.models import Inventory
+from reports.models import DailySales, DailyProductSales
+from datetime import date
+from io import StringIO
+
+
+class SalesRollupsTest(TestCase):
+	def setUp(self):
+		self.test_user = CustomUser.objects.create(business_name="Rollup inc.", full_name="Roll Up", email="rollup@gmail.com", password="12345678")
+		Inventory.objects.create(owner=self.test_user, product_name="Helmet", price=6000, stock_level=45, date_added="2025-01-20")
+		Inventory.objects.create(owner=self.test_user, product_name="Tape", price=4000, stock_level=60, date_added="2025-02-19")
+
+		self.order = Order(product_owner_id=self.test_user, client_name="bob", order_date="2025-03-14")
+		self.order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=5, price=6000), OrderedProduct(name="Tape", quantity=1, price=4000)]
+		self.order.save()
+
+		self.delivered_order = Order(product_owner_id=self.test_user, client_name="ann", status="Delivered", order_date="2025-03-14")
+		self.delivered_order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=2, price=6000)]
+		self.delivered_order.save()
+
+	def get_rollups(self):
+		return (
+			list(DailySales.objects.filter(owner=self.test_user).order_by("date").values_list("date", "revenue", "order_count")),
+			list(DailyProductSales.objects.filter(owner=self.test_user).order_by("date", "product_name").values_list("date", "product_name", "units_sold", "revenue")),
+		)
+
+	def assert_rollups_match_rebuild(self):
+		rollups = self.get_rollups()
+		call_command("rebuild_rollups", owner=self.test_user.id, stdout=StringIO())
+		self.assertEqual(rollups, self.get_rollups())
+
+	def test_only_delivered_orders_are_rolled_up(self):
+		self.assertEqual(self.get_rollups(), (
+			[(date(2025, 3, 14), 12000, 1)],
+			[(date(2025, 3, 14), "Helmet", 2, 12000)]
+		))
+		self.assert_rollups_match_rebuild()
+
+	def test_order_becoming_delivered(self):
+		order_update = OrderSerializer(Order.objects.get(pk=self.order.id), data={"status": "Delivered"}, partial=True)
+		order_update.is_valid()
+		order_update.save(self.test_user)
+
+		self.assertEqual(self.get_rollups(), (
+			[(date(2025, 3, 14), 46000, 2)],
+			[(date(2025, 3, 14), "Helmet", 7, 42000), (date(2025, 3, 14), "Tape", 1, 4000)]
+		))
+		self.assert_rollups_match_rebuild()
+
+	def test_delivered_order_added_to_existing_rollups(self):
+		order = Order(product_owner_id=self.test_user, client_name="cid", status="Delivered", order_date="2025-03-14")
+		order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=3, price=6000), OrderedProduct(name="Tape", quantity=2, price=4000)]
+		order.save()
+
+		self.assertEqual(self.get_rollups(), (
+			[(date(2025, 3, 14), 38000, 2)],
+			[(date(2025, 3, 14), "Helmet", 5, 30000), (date(2025, 3, 14), "Tape", 2, 8000)]
+		))
+		self.assert_rollups_match_rebuild()
+
+	def test_ordered_products_of_delivered_order_change(self):
+		OrderedProduct(name="Tape", quantity=3, price=4000, order_id=self.delivered_order).save(new_order=False)
+		item = self.delivered_order.ordered_products.get(name="Helmet")
+		item.quantity = 1
+		item.save(new_order=False)
+		self.assertEqual(self.get_rollups(), (
+			[(date(2025, 3, 14), 18000, 1)],
+			[(date(2025, 3, 14), "Helmet", 1, 6000), (date(2025, 3, 14), "Tape", 3, 12000)]
+		))
+		self.assert_rollups_match_rebuild()
+
+		OrderedProduct.objects.get(order_id=self.delivered_order, name="Tape").delete()
+		self.assertEqual(self.get_rollups(), (
+			[(date(2025, 3, 14), 6000, 1)],
+			[(date(2025, 3, 14), "Helmet", 1, 6000)]
+		))
+		self.assert_rollups_match_rebuild()
+
+	def test_delivered_order_deleted(self):
+		Order.objects.get(pk=self.delivered_order.id).delete()
+		self.assertEqual(self.get_rollups(), ([], []))
+		self.assert_rollups_match_rebuild()
@@ -0,0 +1,98 @@
+from django.test import TestCase
+from django.core.management import call_command
+from orders.models import Order, OrderedProduct
+from orders.serializers import OrderSerializer
+from accounts.models import CustomUser
+from inventory.models import Inventory
+from reports.models import TenantStats
+from reports.rollups import compute_tenant_stats
+from io import StringIO
+
+
+class TenantStatsTest(TestCase):
+	def setUp(self):
+		self.test_user = CustomUser.objects.create(business_name="Stats inc.", full_name="Stat Man", email="stats@gmail.com", password="12345678")
+		self.helmet = Inventory.objects.create(owner=self.test_user, product_name="Helmet", price=6000, stock_level=45, date_added="2025-01-20")
+		self.tape = Inventory.objects.create(owner=self.test_user, product_name="Tape", price=4000, stock_level=8, low_stock_threshold=10, date_added="2025-02-19")
+
+		self.order = Order(product_owner_id=self.test_user, client_name="bob", order_date="2025-03-14")
+		self.order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=5, price=6000), OrderedProduct(name="Tape", quantity=1, price=4000)]
+		self.order.save()
+
+		self.delivered_order = Order(product_owner_id=self.test_user, client_name="ann", status="Delivered", order_date="2025-03-14")
+		self.delivered_order.ordered_products_objects = [OrderedProduct(name="Helmet", quantity=2, price=6000)]
+		self.delivered_order.save()
+
+	def get_stats(self):
+		stats = TenantStats.objects.get(owner=self.test_user)
+		return {
+			"total_products": stats.total_products, "low_stock_count": stats.low_stock_count, "total_stock_value": stats.total_stock_value,
+			"total_orders": stats.total_orders, "pending_orders": stats.pending_orders, "total_revenue": stats.total_revenue,
+		}
+
+	def assert_stats_match_tables(self):
+		self.assertEqual(self.get_stats(), compute_tenant_stats([self.test_user.id])[self.test_user.id])
+
+	def test_stats_follow_orders(self):
+		self.assertEqual(self.get_stats(), {
+			"total_products": 2, "low_stock_count": 1, "total_stock_value": 38 * 6000 + 7 * 4000,
+			"total_orders": 2, "pending_orders": 1, "total_revenue": 12000,
+		})
+		self.assert_stats_match_tables()
+
+		order_update = OrderSerializer(Order.objects.get(pk=self.order.id), data={"status": "Delivered"}, partial=True)
+		order_update.is_valid()
+		order_update.save(self.test_user)
+		self.assertEqual(self.get_stats()["pending_orders"], 0)
+		self.assertEqual(self.get_stats()["total_revenue"], 46000)
+
+		OrderedProduct(name="Tape", quantity=3, price=4000, order_id=self.delivered_order).save(new_order=False)
+		item = self.delivered_order.ordered_products.get(name="Helmet")
+		item.quantity = 1
+		item.save(new_order=False)
+		self.assert_stats_match_tables()
+
+		self.order.ordered_products.get(name="Tape").delete()
+		Order.objects.get(pk=self.delivered_order.id).delete()
+		self.assertEqual(self.get_stats()["total_orders"], 1)
+		self.assert_stats_match_tables()
+
+	def test_stats_follow_inventory_changes(self):
+		self.helmet.stock_level = 3
+		self.helmet.price = 5000
+		self.helmet.save()
+		Inventory.objects.create(owner=self.test_user, product_name="Gloves", price=1500, stock_level=20, date_added="2025-03-01")
+		Inventory.objects.get(pk=self.tape.id).delete()
+
+		self.assertEqual(self.get_stats()["total_products"], 2)
+		self.assertEqual(self.get_stats()["low_stock_count"], 1)
+		self.assertEqual(self.get_stats()["total_stock_value"], 3 * 5000 + 20 * 1500)
+		self.assert_stats_match_tables()
+
+	def test_delete_without_stats_row(self):
+		TenantStats.objects.filter(owner=self.test_user).delete()
+		Inventory.objects.get(pk=self.tape.id).delete()
+		self.assertEqual(self.get_stats()["total_products"], 1)
+		self.assert_stats_match_tables()
+
+		TenantStats.objects.filter(owner=self.test_user).delete()
+		Order.objects.get(pk=self.delivered_order.id).delete()
+		self.assertEqual(self.get_stats()["total_orders"], 1)
+		self.assertEqual(self.get_stats()["total_revenue"], 0)
+		self.assert_stats_match_tables()
+
+	def test_reconcile_stats_repairs_drift(self):
+		Inventory.objects.filter(pk=self.helmet.id).update(stock_level=1) # bypasses the stats
+		other_user = CustomUser.objects.create(business_name="Other", full_name="Other", email="other@gmail.com", password="12345678")
+		TenantStats.objects.filter(owner=other_user).delete()
+
+		output = StringIO()
+		call_command("reconcile_stats", stdout=output)
+		self.assertIn("2 repaired", output.getvalue())
+		self.assertEqual(self.get_stats()["low_stock_count"], 2)
+		self.assert_stats_match_tables()
+		self.assertEqual(TenantStats.objects.get(owner=other_user).total_products, 0)
+
+		output = StringIO()
+		call_command("reconcile_stats", owner=self.test_user.id, stdout=output)
+		self.assertIn("0 repaired", output.getvalue())
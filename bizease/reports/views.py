@@ -1,12 +1,18 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from accounts.authentication import ClaimsJWTAuthentication
 from inventory.models import Inventory
-from orders.models import Order, OrderedProduct
-from django.db.models import Sum, F
+from orders.models import Order
+from .models import DailySales, DailyProductSales
+from bizease.tenant_cache import cache_tenant_response
+from bizease.concurrency import run_queries
+from django.db.models import Sum, F, Case, When, Value, OuterRef, Subquery, Min, Max, Count
+from django.db.models.functions import Coalesce, TruncWeek, TruncMonth
 from rest_framework import status
 from django.utils  import timezone
-from datetime import timedelta, datetime
+from datetime import timedelta, datetime, date
+import math
 
 
 def process_GET_parameters(request):
@@ -48,10 +54,111 @@ def process_GET_parameters(request):
     return {} 
 
 
+CHART_GRANULARITIES = ["auto", "day", "week", "month"]
+MAX_CHART_POINTS = 60
+
+
+def get_granularity_param(request):
+    """ Returns the chart granularity, None if the parameter is absent or "error" if it's invalid """
+    granularity = request.GET.get('granularity')
+    if granularity is None:
+        return None
+    if granularity not in CHART_GRANULARITIES or len(request.GET.getlist('granularity')) != 1:
+        return "error"
+    return granularity
+
+
+def month_start(value, months_to_add=0):
+    month_index = value.year * 12 + value.month - 1 + months_to_add
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def bucket_start(value, granularity):
+    if granularity == "week":
+        return value - timedelta(days=value.weekday())
+    elif granularity == "month":
+        return month_start(value)
+    return value
+
+
+def next_bucket(value, granularity):
+    if granularity == "week":
+        return value + timedelta(weeks=1)
+    elif granularity == "month":
+        return month_start(value, 1)
+    return value + timedelta(days=1)
+
+
+def count_buckets(start_date, end_date, granularity):
+    start = bucket_start(start_date, granularity)
+    end = bucket_start(end_date, granularity)
+    if granularity == "week":
+        return (end - start).days // 7 + 1
+    elif granularity == "month":
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return (end - start).days + 1
+
+
+def get_revenue_chart_data(owner_id, granularity, start_date=None, end_date=None):
+    """
+    Returns the revenue of every day/week/month in the date range (newest first) and the granularity that was used.
+    Buckets without sales are included with a revenue of 0 so the number of points only depends on the length of the
+    range. Requested granularities that would produce more than MAX_CHART_POINTS points are replaced by a coarser one
+    and only the latest MAX_CHART_POINTS months are returned for very long ranges. "auto" picks the finest granularity
+    that fits. Without a range, it spans from the first to the last day with sales.
+    """
+    sales = DailySales.objects.filter(owner=owner_id)
+    if start_date is None or end_date is None:
+        bounds = sales.aggregate(start_date=Min("date"), end_date=Max("date"))
+        start_date, end_date = bounds["start_date"], bounds["end_date"]
+        if start_date is None:
+            return [], ("day" if granularity == "auto" else granularity)
+    if start_date > end_date:
+        return [], ("day" if granularity == "auto" else granularity)
+
+    levels = CHART_GRANULARITIES[1:]
+    first_level = 0 if granularity == "auto" else levels.index(granularity)
+    for granularity in levels[first_level:]:
+        if count_buckets(start_date, end_date, granularity) <= MAX_CHART_POINTS:
+            break
+    else:
+        start_date = month_start(end_date, -(MAX_CHART_POINTS - 1))
+
+    sales = sales.filter(date__range=(start_date, end_date))
+    if granularity == "week":
+        sales = sales.annotate(bucket=TruncWeek("date"))
+    elif granularity == "month":
+        sales = sales.annotate(bucket=TruncMonth("date"))
+    else:
+        sales = sales.annotate(bucket=F("date"))
+    revenue_per_bucket = {
+        row["bucket"]: row["revenue"] for row in sales.values("bucket").annotate(revenue=Sum("revenue")).order_by("bucket")
+    }
+
+    chart_data = []
+    current_bucket = bucket_start(start_date, granularity)
+    while current_bucket <= end_date:
+        chart_data.append({"date": current_bucket, "revenue": revenue_per_bucket.get(current_bucket, 0)})
+        current_bucket = next_bucket(current_bucket, granularity)
+    chart_data.reverse()
+    return chart_data, granularity
+
+
+def get_page_param(request):
+    page_param = request.GET.get('page')
+    if not page_param or len(request.GET.getlist('page')) != 1:
+        return None
+    try:
+        return int(page_param)
+    except ValueError:
+        return None
+
 
 class ReportDataView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @cache_tenant_response
     def get(self, request, **kwargs):
         range_dict = process_GET_parameters(self.request)
         if (range_dict.get("error")):
@@ -60,140 +167,123 @@ class ReportDataView(APIView):
         start_date = range_dict.get("start_date")
         end_date = range_dict.get("end_date")
 
-        report_data = {}
-        report_data["total_products"] = Inventory.objects.filter(owner=request.user.id).count()
-        report_data["low_stock_items"] = Inventory.objects.filter(owner=request.user.id).filter(stock_level__lte=F("low_stock_threshold")).count()
+        granularity = get_granularity_param(self.request)
+        if granularity == "error":
+            return Response({"detail": "Invalid value for granularity parameter"}, status=status.HTTP_400_BAD_REQUEST)
+
+        inventory = Inventory.objects.filter(owner=request.user.id)
+        sales = DailySales.objects.filter(owner=request.user.id)
+        product_sales = DailyProductSales.objects.filter(owner=request.user.id)
+        pending_orders = Order.objects.filter(product_owner_id=request.user.id).filter(status="Pending")
+        # the queries don't depend on each other so they can run concurrently, see bizease/concurrency.py.
+        # They all return evaluated results so none is left to run while the response is rendered
+        queries = {
+            "total_products": inventory.count,
+            "low_stock_items": inventory.filter(is_low_stock=True).count,
+        }
 
+        report_data = {}
         period = self.request.GET.get('period')
         if not start_date and not end_date:
             report_data["period"] = "All time"
-
-            top_product = (
-                OrderedProduct.objects
-                .filter(order_id__product_owner_id=request.user)
-                .values("name")
-                .annotate(total_sold=Sum("quantity"))
-                .order_by("-total_sold")
-                .first()
+            queries["top_product"] = (
+                product_sales
+                .values(name=F("product_name"))
+                .annotate(total_sold=Sum("units_sold"))
+                .order_by("-total_sold", "name")
+                .first
             )
-            report_data["top_selling_product"] = top_product["name"] if top_product else None
-            report_data["pending_orders"] = Order.objects.filter(product_owner_id=request.user.id).filter(status="Pending").count()
-            report_data["total_stock_value"] = Inventory.objects.filter(owner=request.user.id).annotate(value=F("price")*F("stock_level")).aggregate(Sum("value"))["value__sum"]
-            report_data["stock_value_change"] = None
-            if report_data["total_stock_value"] is None:
-                report_data["total_stock_value"] = 0
-
-            report_data["total_revenue"] = (
-                Order.objects.filter(product_owner_id=request.user.id).filter(status="Delivered").aggregate(Sum("total_price"))["total_price__sum"]
-            )
-            if report_data["total_revenue"] is None:
-                report_data["total_revenue"] = 0
-            report_data["revenue_change"] = None
-
-            date_revenue_chart_data = (
-                Order.objects.filter(product_owner_id=request.user.id).filter(status="Delivered").values("order_date")
-                .annotate(date=F("order_date"), revenue=Sum("total_price")).order_by("-order_date").values("date", "revenue")
+            queries["pending_orders"] = pending_orders.count
+            queries["total_stock_value"] = lambda: inventory.annotate(value=F("price")*F("stock_level")).aggregate(Sum("value"))["value__sum"]
+            queries["total_revenue"] = lambda: sales.aggregate(Sum("revenue"))["revenue__sum"]
+            if granularity:
+                queries["chart"] = lambda: get_revenue_chart_data(request.user.id, granularity)
+            else:
+                queries["date_revenue_chart_data"] = lambda: list(sales.order_by("-date").values("date", "revenue"))
+            queries["product_sales_chart_data"] = lambda: list(
+                product_sales.values(name=F("product_name")).annotate(quantity_sold=Sum("units_sold")).order_by("name")
             )
-            report_data["date_revenue_chart_data"] = date_revenue_chart_data
-            product_sales_chart_data = OrderedProduct.objects.filter(order_id__product_owner_id=request.user.id).filter(order_id__status="Delivered").values('name').annotate(quantity_sold=Sum("quantity"))
-            report_data["product_sales_chart_data"] = product_sales_chart_data
         else:
             report_data["period"] = range_dict["time_period"]
-            top_product = (
-                OrderedProduct.objects
-                .filter(order_id__product_owner_id=request.user.id)
-                .filter(order_id__order_date__range=(start_date, end_date))
-                .filter(order_id__status="Delivered")
-                .values("name")
-                .annotate(total_sold=Sum("quantity"))
-                .order_by("-total_sold")
-                .first()
-            )
-            report_data["top_selling_product"] = top_product["name"] if top_product else None
-            
-            report_data["pending_orders"] = (
-                Order.objects.filter(product_owner_id=request.user.id)
-                .filter(order_date__range=(start_date, end_date))
-                .filter(status="Pending").count()
-            )
+            sales_in_range = sales.filter(date__range=(start_date, end_date))
+            product_sales_in_range = product_sales.filter(date__range=(start_date, end_date))
 
             prev_period_offsets = {"last-week": 8, "last-month": 31, "last-6-months": 182, "last-year": 366}
-            prev_cutoff_date = start_date - timedelta(days=prev_period_offsets[period])
-
+            # a start_date/end_date range is compared with the range of the same length right before it
+            prev_period_offset = prev_period_offsets.get(period, (end_date - start_date).days + 1)
+            prev_cutoff_date = start_date - timedelta(days=prev_period_offset)
             cutoff_date = end_date
-            report_data["total_stock_value"] = (
-                Inventory.objects.filter(owner=request.user.id).filter(date_added__lte=cutoff_date).annotate(value=F("price")*F("stock_level")).aggregate(Sum("value"))["value__sum"]
+            prev_start_date = start_date - timedelta(days=prev_period_offset)
+            prev_end_date = start_date - timedelta(days=1)
+
+            queries["top_product"] = (
+                product_sales_in_range
+                .values(name=F("product_name"))
+                .annotate(total_sold=Sum("units_sold"))
+                .order_by("-total_sold", "name")
+                .first
             )
-            prev_period_stock_value = (
-                Inventory.objects.filter(owner=request.user.id).filter(date_added__lte=prev_cutoff_date).annotate(value=F("price")*F("stock_level")).aggregate(Sum("value"))["value__sum"]
+            queries["pending_orders"] = pending_orders.filter(order_date__range=(start_date, end_date)).count
+            queries["total_stock_value"] = lambda: (
+                inventory.filter(date_added__lte=cutoff_date).annotate(value=F("price")*F("stock_level")).aggregate(Sum("value"))["value__sum"]
+            )
+            queries["prev_period_stock_value"] = lambda: (
+                inventory.filter(date_added__lte=prev_cutoff_date).annotate(value=F("price")*F("stock_level")).aggregate(Sum("value"))["value__sum"]
+            )
+            queries["total_revenue"] = lambda: sales_in_range.aggregate(Sum("revenue"))["revenue__sum"]
+            queries["prev_revenue"] = lambda: (
+                sales.filter(date__range=(prev_start_date, prev_end_date)).aggregate(Sum("revenue"))['revenue__sum']
+            )
+            if granularity:
+                queries["chart"] = lambda: get_revenue_chart_data(request.user.id, granularity, start_date, end_date)
+            else:
+                queries["date_revenue_chart_data"] = lambda: list(sales_in_range.order_by("-date").values("date", "revenue"))
+            queries["product_sales_chart_data"] = lambda: list(
+                product_sales_in_range.values(name=F("product_name")).annotate(quantity_sold=Sum("units_sold")).order_by("name")
             )
 
-            if (report_data["total_stock_value"] is None):
-                report_data["total_stock_value"] = 0
-            if prev_period_stock_value is None:
-                prev_period_stock_value = 0
+        results = run_queries(queries)
+        report_data["total_products"] = results["total_products"]
+        report_data["low_stock_items"] = results["low_stock_items"]
+        report_data["top_selling_product"] = results["top_product"]["name"] if results["top_product"] else None
+        report_data["pending_orders"] = results["pending_orders"]
 
+        report_data["total_stock_value"] = results["total_stock_value"] or 0
+        report_data["total_revenue"] = results["total_revenue"] or 0
+        if not start_date and not end_date:
+            report_data["stock_value_change"] = None
+            report_data["revenue_change"] = None
+        else:
+            prev_period_stock_value = results["prev_period_stock_value"] or 0
             change = report_data["total_stock_value"] - prev_period_stock_value
             if prev_period_stock_value == 0:
                 change_percentage = None
             else:
                 change_percentage = round((change/prev_period_stock_value) * 100, 2)
-
             report_data["stock_value_change"] = change_percentage
 
-            report_data["total_revenue"] = (
-                Order.objects.filter(product_owner_id=request.user.id)
-                .filter(order_date__range=(start_date, end_date))
-                .filter(status="Delivered")
-                .aggregate(Sum("total_price"))["total_price__sum"]
-            )
-
-            prev_start_date = start_date - timedelta(days=prev_period_offsets[period])
-            prev_end_date = start_date - timedelta(days=1)
-
-            prev_revenue = (
-                Order.objects
-                .filter(product_owner_id=request.user.id)
-                .filter(order_date__range=(prev_start_date, prev_end_date))
-                .filter(status="Delivered")
-                .aggregate(Sum("total_price"))['total_price__sum']
-            )
-
-            if (report_data["total_revenue"] is None):
-                report_data["total_revenue"] = 0
-            if prev_revenue is None:
-                prev_revenue = 0
-
+            prev_revenue = results["prev_revenue"] or 0
             change = report_data["total_revenue"] - prev_revenue
             if prev_revenue == 0:
                 change_percentage = None
             else:
                 change_percentage = round((change/prev_revenue) * 100, 2)
-
             report_data["revenue_change"] = change_percentage
 
-            date_revenue_chart_data = (
-                Order.objects
-                .filter(product_owner_id=request.user.id)
-                .filter(order_date__range=(start_date, end_date))
-                .filter(status="Delivered")
-                .annotate(revenue=Sum("total_price"), date=F("order_date")).values("date", "revenue")
-            )
-            report_data["date_revenue_chart_data"] = date_revenue_chart_data
-            product_sales_chart_data = (
-                OrderedProduct.objects
-                .filter(order_id__product_owner_id=request.user.id)
-                .filter(order_id__order_date__range=(start_date, end_date))
-                .filter(order_id__status="Delivered")
-                .values('name').annotate(quantity_sold=Sum("quantity"))
-            )
-            report_data["product_sales_chart_data"] = product_sales_chart_data
+        if granularity:
+            report_data["date_revenue_chart_data"], report_data["chart_granularity"] = results["chart"]
+        else:
+            report_data["date_revenue_chart_data"] = results["date_revenue_chart_data"]
+        report_data["product_sales_chart_data"] = results["product_sales_chart_data"]
 
         return Response({"data": report_data}, status=status.HTTP_200_OK)
 
 class ReportDataSummaryView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    page_size = 50
 
+    @cache_tenant_response
     def get(self, request, **kwargs):
         range_dict = process_GET_parameters(self.request)
         if (range_dict.get("error")):
@@ -202,34 +292,44 @@ class ReportDataSummaryView(APIView):
         start_date = range_dict.get("start_date")
         end_date = range_dict.get("end_date")
 
-        if not start_date and not end_date:
-            summary = (
-                OrderedProduct.objects
-                .filter(order_id__product_owner_id=request.user.id)
-                .filter(order_id__status="Delivered")
-                .order_by("name").values('name')
-                .annotate(quantity_sold=Sum("quantity"), revenue=Sum("cummulative_price"))
-            )
-        else:
-            summary = (
-                OrderedProduct.objects
-                .filter(order_id__product_owner_id=request.user.id)
-                .filter(order_id__order_date__range=(start_date, end_date))
-                .filter(order_id__status="Delivered")
-                .order_by("name").values('name')
-                .annotate(quantity_sold=Sum("quantity"), revenue=Sum("cummulative_price"))
+        product_sales = DailyProductSales.objects.filter(owner=request.user.id)
+        if start_date or end_date:
+            product_sales = product_sales.filter(date__range=(start_date, end_date))
+        summary = (
+            product_sales
+            .values(name=F("product_name")).order_by("name")
+            .annotate(quantity_sold=Sum("units_sold"), revenue=Sum("revenue"))
+        )
+
+        # stock status of each product is looked up in the same query instead of matching every row against the inventory in python
+        inventory_status = (
+            Inventory.objects
+            .filter(owner=request.user.id, product_name=OuterRef("product_name"))
+            .annotate(
+                status=Case(When(stock_level__lt=F("low_stock_threshold"), then=Value("low stock")), default=Value("in stock"))
             )
-
-        inventory_items = Inventory.objects.filter(owner=request.user.id).filter(owner=self.request.user).order_by("product_name")
-
-        for obj in summary:
-            for item in inventory_items:
-                if obj["name"] == item.product_name:
-                    obj["stock_status"] = "low stock" if item.stock_level < item.low_stock_threshold else "in stock"
-                    
-            if not obj.get("stock_status"):
-                obj["stock_status"] = "out of stock"
+            .order_by().values("status")[:1]
+        )
+        summary = summary.annotate(stock_status=Coalesce(Subquery(inventory_status), Value("out of stock")))
+
+        # the summary has a row per product sold, so it's always paginated. Without a page parameter the first page is
+        # returned, even when there are no rows
+        page_param = get_page_param(self.request)
+        # counting the grouped summary would group every row in a subquery first
+        row_count = product_sales.aggregate(count=Count("product_name", distinct=True))["count"]
+        page_count = math.ceil(row_count/self.page_size)
+        if page_param is not None and ((page_count < page_param) or (page_param <= 0)):
+            return Response({"detail": "Page Not found", "data": None}, status=status.HTTP_404_NOT_FOUND)
+
+        page = page_param or 1
+        offset = (page-1) * self.page_size
+        summary = summary[offset:offset+self.page_size]
+        page_data = {
+            "page_count": page_count,
+            "next_page": page + 1 if page + 1 <= page_count else None,
+            "prev_page": page - 1 if page - 1 >= 1 else None,
+        }
 
         time_period = "All time" if not range_dict.get("time_period") else range_dict["time_period"]
-        return Response({"data": {"summary": summary, "period": time_period}}, status=status.HTTP_200_OK)
+        return Response({"data": {"summary": summary, "period": time_period, **page_data}}, status=status.HTTP_200_OK)
 